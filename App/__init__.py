@@ -1,4 +1,13 @@
-from App.models import *
-from App.views import *
-from App.controllers import *
-from App.main import *
\ No newline at end of file
+import importlib
+
+# Names are resolved from these modules on first use, so importing one
+# submodule (e.g. App.main for the CLI) does not load views and Flask-Admin
+LAZY_MODULES = ("App.models", "App.controllers", "App.main", "App.views")
+
+
+def __getattr__(name):
+    for module_name in LAZY_MODULES:
+        module = importlib.import_module(module_name)
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module 'App' has no attribute '{name}'")
@@ -16,4 +16,19 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
     for key in overrides:
-        app.config[key] = overrides[key]
\ No newline at end of file
+        app.config[key] = overrides[key]
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = pool_options(app.config)
+
+def pool_options(config):
+    # Connection pool settings for server databases; SQLite keeps SQLAlchemy's defaults
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(config.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(config.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(config.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(config.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": bool(config.get("DB_POOL_PRE_PING", True)),
+    }
\ No newline at end of file
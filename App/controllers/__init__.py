@@ -1,6 +1,12 @@
 from App.controllers.user import *
+from App.controllers.identity import *
 from App.controllers.auth import *
 from App.controllers.initialize import *
 from App.controllers.admin import *
 from App.controllers.staff import *
 from App.controllers.report import *
+from App.controllers.rollup import *
+from App.controllers.kiosk import *
+from App.controllers.bulk_import import *
+from App.controllers.bulk_export import *
+from App.controllers.jobs import *
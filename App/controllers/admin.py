@@ -1,12 +1,15 @@
 from App.models import Shift, Schedule
 from App.database import db
-from App.controllers.user import get_user
+from App.controllers.identity import get_identity, get_identities
 from App.controllers.schedule import generate_report
+from App.controllers.rollup import mark_rollup_days, mark_shift_rollup
 from App.services.scheduler import Scheduler
+from App.services.report_cache import report_cache
+from App.services.profiler import profile_store
 
 
 def create_schedule(start_date, end_date, admin_id):        #create an empty schedule with start and end date
-    admin = get_user(admin_id)
+    admin = get_identity(admin_id)
     
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can create schedules")
@@ -18,8 +21,8 @@ def create_schedule(start_date, end_date, admin_id):        #create an empty sch
     return new_schedule
 
 
-def schedule_week(strategy, schedule_id, staff_list, admin_id):     #assign all staff to a weekly schedule using a scheduler
-    admin = get_user(admin_id)
+def schedule_week(strategy, schedule_id, staff_list, admin_id, on_batch=None):     #assign all staff to a weekly schedule using a scheduler
+    admin = get_identity(admin_id)
 
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can create schedules")
@@ -28,9 +31,10 @@ def schedule_week(strategy, schedule_id, staff_list, admin_id):     #assign all
     if not schedule:
         raise ValueError("Invalid schedule ID")
 
+    identities = get_identities(staff_list)     #one query for the whole list
     valid_staff = []
     for staff_id in staff_list:
-        staff = get_user(staff_id)
+        staff = identities.get(staff_id)
         if staff and staff.role == "staff":
             valid_staff.append(staff)
         else:
@@ -40,8 +44,15 @@ def schedule_week(strategy, schedule_id, staff_list, admin_id):     #assign all
         raise ValueError("No valid staff members to schedule")
    
     
+    filled_days = set()
+    def track_days(batch):
+        filled_days.update(row["start_time"] for row in batch)
+        if on_batch:
+            on_batch(batch)     #background jobs report progress and commit per batch
+
     scheduler = Scheduler(strategy)     #use Scheduler wrapper instead of calling strategy directly
-    scheduler.fill_schedule(valid_staff, schedule)
+    scheduler.bulk_fill_schedule(valid_staff, schedule, on_batch=track_days, with_ids=on_batch is not None)     #bulk INSERT, ORM path only as fallback
+    mark_rollup_days(schedule.id, filled_days)
     
     db.session.commit()
     return schedule
@@ -50,8 +61,8 @@ def schedule_week(strategy, schedule_id, staff_list, admin_id):     #assign all
 
 
 def schedule_shift(schedule_id, start_time, end_time, staff_id, admin_id):      #create a shift and add it to a schedule
-    admin = get_user(admin_id)
-    staff = get_user(staff_id)
+    admin = get_identity(admin_id)
+    staff = get_identity(staff_id)
     schedule = db.session.get(Schedule, schedule_id)
 
     if not admin or admin.role != "admin":
@@ -69,13 +80,14 @@ def schedule_shift(schedule_id, start_time, end_time, staff_id, admin_id):
     )
 
     db.session.add(new_shift)
+    mark_shift_rollup(new_shift)
     db.session.commit()
 
     return new_shift
 
 #view the shift report for a given schedule
 def view_report(schedule_id, admin_id):
-    admin = get_user(admin_id)
+    admin = get_identity(admin_id)
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can view shift reports")
 
@@ -83,4 +95,32 @@ def view_report(schedule_id, admin_id):
     if not schedule:
         raise ValueError("Invalid schedule ID")
 
-    return generate_report(schedule_id, admin_id)
\ No newline at end of file
+    return generate_report(schedule_id, admin_id)
+
+
+#hit/miss counters of the report cache, used to size REPORT_CACHE_SIZE
+def view_report_cache_stats(admin_id):
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view report cache stats")
+
+    return report_cache.stats()
+
+
+def view_profiles(admin_id, endpoint=None):
+    # Collapsed stacks of sampled requests in this worker, for flamegraphs
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view request profiles")
+
+    return profile_store.collapsed(endpoint)
+
+
+def clear_profiles(admin_id):
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can clear request profiles")
+
+    summary = profile_store.summary()
+    profile_store.clear()
+    return summary
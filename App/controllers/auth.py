@@ -1,16 +1,25 @@
 from flask_jwt_extended import (
     create_access_token, jwt_required, JWTManager,
-    get_jwt_identity, verify_jwt_in_request
+    get_jwt_identity, verify_jwt_in_request, get_current_user
 )
+from flask import g
 from App.models import User
 from App.database import db
+from App.controllers.identity import token_claims, identity_from_claims
+
+def upgrade_password(user, password):
+  # Rehash with the configured method after a successful login
+  if user.password_needs_rehash():
+    user.set_password(password)
+    db.session.commit()
 
 def login(username, password):
   result = db.session.execute(db.select(User).filter_by(username=username))
   user = result.scalar_one_or_none()
   if user and user.check_password(password):
-    # Store ONLY the user id as a string in JWT 'sub'
-    return create_access_token(identity=str(user.id))
+    upgrade_password(user, password)
+    # user id as a string in JWT 'sub'; role/username/version as claims
+    return create_access_token(identity=str(user.id), additional_claims=token_claims(user))
   return None
 
 def loginCLI(username, password):
@@ -18,11 +27,12 @@ def loginCLI(username, password):
     user = result.scalar_one_or_none()
 
     if user and user.check_password(password):
-        
+        upgrade_password(user, password)
+
         if user.active_token:
             return {"message": "User already logged in", "token": user.active_token}
 
-        token = create_access_token(identity=str(user.id))
+        token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
         user.active_token = token
         db.session.commit()
         return {"message": "Login successful", "token": token}
@@ -52,14 +62,16 @@ def setup_jwt(app):
         user_id = getattr(identity, "id", identity)
         return str(user_id) if user_id is not None else None
 
+    # current_user is a UserIdentity (id, username, role) built from the
+    # token claims; the database is only read when the claims are stale
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        identity = jwt_data["sub"]
-        try:
-            user_id = int(identity)
-        except (TypeError, ValueError):
-            return None
-        return db.session.get(User, user_id)
+        return identity_from_claims(jwt_data)
+
+    # identities cached on g must not outlive the request
+    @app.teardown_request
+    def clear_request_identities(exception=None):
+        g.pop("identities", None)
 
     return jwt
 
@@ -69,9 +81,7 @@ def add_auth_context(app):
     def inject_user():
         try:
             verify_jwt_in_request()
-            identity = get_jwt_identity()
-            user_id = int(identity) if identity is not None else None
-            current_user = db.session.get(User, user_id) if user_id is not None else None
+            current_user = get_current_user()   #already loaded by user_lookup_callback
             is_authenticated = current_user is not None
         except Exception as e:
             print(e)
@@ -0,0 +1,106 @@
+import csv, io, json
+from datetime import date, datetime
+from enum import Enum
+from sqlalchemy import select
+from App.database import db
+from App.models import User, Schedule, Shift
+from App.controllers.identity import get_identity
+from App.controllers.report import summary_query
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_SIZE = 1000    # rows fetched per round trip from a server-side cursor
+
+
+def schedules_query(schedule_id=None):
+    stmt = select(Schedule.id, Schedule.start_date, Schedule.end_date, Schedule.admin_id).order_by(Schedule.id)
+    if schedule_id is not None:
+        stmt = stmt.where(Schedule.id == schedule_id)
+    return stmt
+
+
+def shifts_query(schedule_id=None):
+    stmt = (
+        select(Shift.id, Shift.schedule_id, Shift.staff_id, User.username, Shift.start_time,
+               Shift.end_time, Shift.clock_in, Shift.clock_out, Shift.current_status.label("status"))
+        .join(User, User.id == Shift.staff_id)
+        .order_by(Shift.schedule_id, Shift.start_time, Shift.id)
+    )
+    if schedule_id is not None:
+        stmt = stmt.where(Shift.schedule_id == schedule_id)
+    return stmt
+
+
+def attendance_query(schedule_id=None):
+    if schedule_id is None:
+        raise ValueError("schedule_id is required to export attendance")
+    return summary_query(schedule_id)
+
+
+# kind -> query builder taking an optional schedule id
+EXPORT_QUERIES = {
+    "schedules": schedules_query,
+    "shifts": shifts_query,
+    "attendance": attendance_query,
+}
+
+
+def export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(stmt):
+    # Column rows (no ORM identity map) fetched in batches from a server-side cursor
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    columns = list(result.keys())
+    yield columns
+    for partition in result.partitions():
+        for row in partition:
+            yield [export_value(value) for value in row]
+
+
+def format_rows(rows, fmt):
+    """
+    Turn stream_rows() output into text chunks: one chunk per batch of rows,
+    so a response body or file is written incrementally.
+    """
+    columns = next(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        if fmt == "csv":
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row))) + "\n")
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_records(kind, admin_id, fmt="csv", schedule_id=None):
+    """
+    Stream schedules, shifts or attendance ("attendance" needs a schedule id)
+    as CSV or NDJSON text chunks in constant memory.
+    Permissions and arguments are checked before the first chunk is produced.
+    """
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can export data")
+    if kind not in EXPORT_QUERIES:
+        raise ValueError(f"Kind must be one of {', '.join(EXPORT_QUERIES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    stmt = EXPORT_QUERIES[kind](schedule_id)
+    return format_rows(stream_rows(stmt), fmt)
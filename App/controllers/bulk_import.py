@@ -0,0 +1,258 @@
+import csv, json, time
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from App.database import db
+from App.models import User, Schedule, Shift
+from App.controllers.identity import get_identity
+from App.controllers.rollup import mark_rollup_days
+from App.controllers.user import VALID_ROLES
+from App.services.passwords import hash_passwords
+from App.services.scheduler import iter_shift_batches, insert_shift_batch
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = 1000    # rows validated, inserted and committed together
+MAX_REPORTED_ERRORS = 100
+
+
+def read_records(lines, fmt):
+    """
+    Lazily turn lines of CSV (with a header row) or NDJSON into dicts, so
+    files of any size are never held in memory at once.
+    """
+    if fmt == "csv":
+        for record in csv.DictReader(lines):
+            yield record
+    elif fmt == "ndjson":
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # surfaces as a per-row error instead of ending the import
+                yield f"Line {number} is not valid JSON"
+    else:
+        raise ValueError(f"Format must be one of {', '.join(IMPORT_FORMATS)}")
+
+
+def iter_chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_datetime(value, field):
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an ISO date or datetime")
+
+
+def required(record, field):
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        raise ValueError(f'"{field}" is required')
+    return str(value).strip()
+
+
+def parse_int(record, field):
+    value = required(record, field)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{field} must be an integer")
+
+
+def validate_chunk(chunk, parse):
+    # Returns [(index, row)] that parsed and {index: error} for the rest
+    rows, errors = [], {}
+    for index, record in chunk:
+        try:
+            if not isinstance(record, dict):
+                raise ValueError(record if isinstance(record, str) else "Row must be an object")
+            rows.append((index, parse(record)))
+        except ValueError as e:
+            errors[index] = str(e)
+    return rows, errors
+
+
+def parse_user(record):
+    username = required(record, "username")
+    if len(username) > 20:
+        raise ValueError("username must be at most 20 characters")
+    role = (record.get("role") or "staff").lower().strip()
+    if role not in VALID_ROLES:
+        raise ValueError(f"role must be one of {', '.join(sorted(VALID_ROLES))}")
+    return {"username": username, "password": required(record, "password"), "role": role}
+
+
+def import_users(rows, errors, admin_id, seen):
+    usernames = [row["username"] for _, row in rows]
+    existing = set(db.session.scalars(select(User.username).where(User.username.in_(usernames))))
+
+    accepted = []
+    for index, row in rows:
+        if row["username"] in existing or row["username"] in seen["usernames"]:
+            errors[index] = f"User {row['username']} already exists"
+        else:
+            seen["usernames"].add(row["username"])
+            accepted.append(row)
+    if not accepted:
+        return 0
+
+    # the expensive part of onboarding; spread over the hashing threads
+    hashes = hash_passwords(row["password"] for row in accepted)
+    db.session.execute(insert(User.__table__), [
+        {"username": row["username"], "password": password_hash, "role": row["role"], "token_version": 0}
+        for row, password_hash in zip(accepted, hashes)
+    ])
+    return len(accepted)
+
+
+def parse_schedule(record):
+    start_date = parse_datetime(required(record, "start_date"), "start_date")
+    end_date = parse_datetime(required(record, "end_date"), "end_date")
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+    admin_id = parse_int(record, "admin_id") if record.get("admin_id") not in (None, "") else None
+    return {"start_date": start_date, "end_date": end_date, "admin_id": admin_id}
+
+
+def import_schedules(rows, errors, admin_id, seen):
+    for _, row in rows:
+        row["admin_id"] = row["admin_id"] or admin_id
+    admins = set(db.session.scalars(
+        select(User.id).where(User.id.in_({row["admin_id"] for _, row in rows}), func.lower(User.role) == "admin")
+    ))
+
+    accepted = []
+    for index, row in rows:
+        if row["admin_id"] in admins:
+            accepted.append(row)
+        else:
+            errors[index] = f"User {row['admin_id']} is not an admin"
+    if not accepted:
+        return 0
+
+    ids = db.session.scalars(
+        insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+        accepted,
+    ).all()
+    seen["schedule_ids"].extend(ids)
+    return len(accepted)
+
+
+def parse_shift(record):
+    if record.get("staff_id") not in (None, ""):
+        staff = parse_int(record, "staff_id")
+    else:
+        staff = required(record, "username")    # staff imported in the same onboarding run
+    start_time = parse_datetime(required(record, "start_time"), "start_time")
+    end_time = parse_datetime(required(record, "end_time"), "end_time")
+    if end_time <= start_time:
+        raise ValueError("end_time must be after start_time")
+    return {"schedule_id": parse_int(record, "schedule_id"), "staff": staff, "start_time": start_time, "end_time": end_time}
+
+
+def import_shifts(rows, errors, admin_id, seen):
+    staff_refs = {row["staff"] for _, row in rows}
+    staff_rows = db.session.execute(
+        select(User.id, User.username).where(
+            func.lower(User.role) == "staff",
+            User.id.in_({ref for ref in staff_refs if isinstance(ref, int)})
+            | User.username.in_({ref for ref in staff_refs if isinstance(ref, str)}),
+        )
+    ).all()
+    staff_ids = {row.id: row.id for row in staff_rows}
+    staff_ids.update({row.username: row.id for row in staff_rows})
+    schedules = set(db.session.scalars(
+        select(Schedule.id).where(Schedule.id.in_({row["schedule_id"] for _, row in rows}))
+    ))
+
+    by_schedule = {}
+    for index, row in rows:
+        if row["staff"] not in staff_ids:
+            errors[index] = f"{row['staff']} is not a staff member"
+        elif row["schedule_id"] not in schedules:
+            errors[index] = f"Schedule {row['schedule_id']} not found"
+        else:
+            by_schedule.setdefault(row["schedule_id"], []).append(
+                (staff_ids[row["staff"]], row["start_time"], row["end_time"])
+            )
+
+    count = 0
+    for schedule_id, shifts in by_schedule.items():
+        for batch in iter_shift_batches(schedule_id, shifts):
+            insert_shift_batch(batch)
+            count += len(batch)
+        mark_rollup_days(schedule_id, [start_time for _, start_time, _ in shifts])
+    return count
+
+
+# kind -> (parse one record, write a validated chunk)
+IMPORTERS = {
+    "users": (parse_user, import_users),
+    "schedules": (parse_schedule, import_schedules),
+    "shifts": (parse_shift, import_shifts),
+}
+
+
+def import_records(kind, records, admin_id, start=0, chunk_size=IMPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    Stream records of one kind ("users", "schedules" or "shifts") into the
+    database. Each chunk is validated with a few IN queries, written with bulk
+    INSERTs and committed, so a failed import keeps every earlier chunk and
+    can be resumed by passing the returned resume_from as start.
+    Rows before start are skipped; on_chunk, if given, gets the running result.
+    """
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can import data")
+    if kind not in IMPORTERS:
+        raise ValueError(f"Kind must be one of {', '.join(IMPORTERS)}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if start < 0:
+        raise ValueError("start must not be negative")
+    parse, write = IMPORTERS[kind]
+
+    result = {
+        "kind": kind, "start": start, "processed": 0, "imported": 0,
+        "rejected": 0, "errors": [], "resume_from": start, "done": False,
+    }
+    seen = {"usernames": set(), "schedule_ids": []}
+    started = time.perf_counter()
+    numbered = islice(enumerate(records), start, None)
+
+    try:
+        for chunk in iter_chunks(numbered, chunk_size):
+            rows, errors = validate_chunk(chunk, parse)
+            imported = write(rows, errors, admin.id, seen) if rows else 0
+            db.session.commit()
+
+            result["processed"] += len(chunk)
+            result["imported"] += imported
+            result["rejected"] += len(errors)
+            for index in sorted(errors):
+                if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                    result["errors"].append({"row": index, "error": errors[index]})
+            result["resume_from"] = chunk[-1][0] + 1
+            if on_chunk:
+                on_chunk(result)
+        result["done"] = True
+    except (SQLAlchemyError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        result["failure"] = str(e).splitlines()[0]
+
+    if kind == "schedules":
+        result["schedule_ids"] = seen["schedule_ids"]
+    elapsed = time.perf_counter() - started
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_second"] = round(result["processed"] / elapsed, 1) if elapsed else 0.0
+    return result
@@ -0,0 +1,170 @@
+import time
+from collections import namedtuple
+from threading import Lock
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import select
+from App.database import db
+from App.models import User
+
+# The parts of a user that controllers need to authorize a request
+UserIdentity = namedtuple("UserIdentity", ["id", "username", "role"])
+
+process_identities = {}     # user id -> (expires, UserIdentity)
+token_versions = {}         # user id -> (expires, token_version)
+process_lock = Lock()
+DEFAULT_TOKEN_VERSION_TTL = 60
+
+
+def identity_ttl():
+    # Seconds identities may be reused across requests; 0 disables the process cache
+    if not has_app_context():
+        return 0
+    return float(current_app.config.get("IDENTITY_CACHE_TTL", 0))
+
+
+def request_identities():
+    # Per-request cache on flask.g; None outside a request (CLI, tests)
+    if not has_request_context():
+        return None
+    if "identities" not in g:
+        g.identities = {}
+    return g.identities
+
+
+def token_version_ttl():
+    if not has_app_context():
+        return 0
+    return float(current_app.config.get("TOKEN_VERSION_TTL", DEFAULT_TOKEN_VERSION_TTL))
+
+
+def cache_token_version(user_id, version):
+    ttl = token_version_ttl()
+    if ttl > 0:
+        with process_lock:
+            token_versions[user_id] = (time.monotonic() + ttl, version)
+
+
+def known_token_version(user_id):
+    with process_lock:
+        entry = token_versions.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def cache_identity(identity):
+    cache = request_identities()
+    if cache is not None:
+        cache[identity.id] = identity
+    ttl = identity_ttl()
+    if ttl > 0:
+        with process_lock:
+            process_identities[identity.id] = (time.monotonic() + ttl, identity)
+
+
+def cached_identity(user_id):
+    cache = request_identities()
+    if cache is not None and user_id in cache:
+        return cache[user_id]
+    if identity_ttl() <= 0:
+        return None
+    with process_lock:
+        entry = process_identities.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        if cache is not None:
+            cache[user_id] = entry[1]
+        return entry[1]
+    return None
+
+
+def forget_identity(user_id=None):
+    # Drop a user (or everyone) after their username or role changes
+    cache = request_identities()
+    with process_lock:
+        if user_id is None:
+            process_identities.clear()
+            token_versions.clear()
+        else:
+            process_identities.pop(int(user_id), None)
+            token_versions.pop(int(user_id), None)
+    if cache is not None:
+        if user_id is None:
+            cache.clear()
+        else:
+            cache.pop(int(user_id), None)
+
+
+def get_identities(user_ids):
+    """
+    Look up several users at once, with one query for any not already cached.
+    Returns {user_id: UserIdentity}; unknown ids are left out.
+    """
+    identities = {}
+    missing = []
+    for user_id in user_ids:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            continue
+        identity = cached_identity(user_id)
+        if identity is None:
+            missing.append(user_id)
+        else:
+            identities[user_id] = identity
+
+    if missing:
+        rows = db.session.execute(
+            select(User.id, User.username, User.role, User.token_version).where(User.id.in_(missing))
+        )
+        for row in rows:
+            identities[row.id] = UserIdentity(row.id, row.username, row.role)
+            cache_identity(identities[row.id])
+            cache_token_version(row.id, row.token_version)
+    return identities
+
+
+def get_identity(user_id):
+    """
+    id, username and role of a user, loaded at most once per request.
+    Controllers use this instead of get_user() for permission checks.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    return get_identities([user_id]).get(user_id)
+
+
+def token_claims(user):
+    # Extra JWT claims that let requests authorize without loading the user
+    return {"role": user.role, "username": user.username, "ver": user.token_version}
+
+
+def identity_from_claims(jwt_data):
+    """
+    Build the identity for a verified JWT. Claims are trusted when their
+    token version matches the one this worker last saw for the user, so the
+    hot path runs no query; stale or claim-less tokens fall back to the database.
+    """
+    try:
+        user_id = int(jwt_data["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    identity = cached_identity(user_id)
+    if identity is not None:
+        return identity
+
+    version = jwt_data.get("ver")
+    if version is not None and "role" in jwt_data and "username" in jwt_data:
+        if known_token_version(user_id) is None:
+            get_identity(user_id)     # learn the current version (one query per TTL)
+        if known_token_version(user_id) == version:
+            identity = UserIdentity(user_id, jwt_data["username"], jwt_data["role"])
+            cache = request_identities()
+            if cache is not None:
+                cache[user_id] = identity
+            return identity
+
+    return get_identity(user_id)
+
@@ -1,10 +1,14 @@
 from .user import create_user
 from App.database import db
+from App.services.report_cache import report_cache
+from App.controllers.identity import forget_identity
 
 
 def initialize():
     db.drop_all()
     db.create_all()
+    report_cache.clear()
+    forget_identity()
     create_user('bob', 'bobpass', 'admin')
     create_user('jane', 'janepass', 'staff')
     create_user('alice', 'alicepass', 'staff')
@@ -0,0 +1,325 @@
+import json, logging, os, socket, time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select, update
+from App.database import db
+from App.models import Job, Schedule, Shift
+from App.controllers.identity import get_identity
+from App.controllers.user import get_all_users_by_role
+from App.controllers.admin import schedule_week, view_report
+from App.controllers.rollup import mark_rollup_days
+from App.services.report_cache import mark_schedule_changed
+from App.services.strategies.day_night_scheduler import DayNightScheduler
+from App.services.strategies.even_scheduler import EvenScheduler
+from App.services.strategies.minimum_scheduler import MinimumScheduler
+
+logger = logging.getLogger("App.jobs")
+
+DEFAULT_POLL_SECONDS = 1
+DEFAULT_STALE_SECONDS = 300
+UNDO_RANGES_PER_DELETE = 100
+
+SCHEDULE_STRATEGIES = {
+    "day_night_scheduler": DayNightScheduler,
+    "even_scheduler": EvenScheduler,
+    "minimum_scheduler": MinimumScheduler,
+}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobLost(Exception):
+    # The job row is no longer this worker's running job (failed as stale meanwhile)
+    pass
+
+
+def get_strategy(name):
+    if name not in SCHEDULE_STRATEGIES:
+        raise ValueError("Invalid strategy type")
+    return SCHEDULE_STRATEGIES[name]()
+
+
+def require_admin(admin_id, action):
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError(f"Only admins can {action}")
+    return admin
+
+
+def require_schedule(params):
+    # Checked when the job is submitted so bad requests fail with 400, not as a failed job
+    schedule_id = params.get("schedule_id")
+    if not isinstance(schedule_id, int) or db.session.get(Schedule, schedule_id) is None:
+        raise ValueError("Invalid schedule ID")
+
+
+def check_schedule_week(params):
+    get_strategy(params.get("strategy"))
+    require_schedule(params)
+
+
+class JobProgress():
+    """
+    Handed to a running job: records progress, a heartbeat and what to undo
+    on the job row, commits them with the work done so far and raises
+    JobCancelled once a cancel has been requested, or JobLost if the row was
+    failed as stale meanwhile (its work then belongs to whoever failed it).
+    """
+
+    def __init__(self, job_id, worker):
+        self.job_id = job_id
+        self.worker = worker
+
+    def update(self, done, total=None, checkpoint=None):
+        values = {"progress": done, "heartbeat_at": datetime.now()}
+        if total is not None:
+            values["total"] = total
+        if checkpoint is not None:
+            values["checkpoint"] = checkpoint
+        updated = db.session.execute(
+            update(Job).where(Job.id == self.job_id, Job.status == "running", Job.worker == self.worker)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.rollback()       # drop the batch; it was never recorded as the job's
+            raise JobLost()
+        cancelled = db.session.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+        db.session.commit()
+        if cancelled:
+            raise JobCancelled()
+
+
+def add_id_ranges(ranges, ids):
+    # Extend [[first, last], ...] with sorted ids, merging consecutive ones
+    for shift_id in ids:
+        if ranges and ranges[-1][1] + 1 == shift_id:
+            ranges[-1][1] = shift_id
+        else:
+            ranges.append([shift_id, shift_id])
+    return ranges
+
+
+def run_schedule_week(job, progress):
+    params = job.params
+    strategy = get_strategy(params["strategy"])
+    staff_list = [user.id for user in get_all_users_by_role("staff")]
+
+    # the exact ids the job inserted, committed with each batch, so undoing
+    # it never touches shifts other writers added to the schedule meanwhile
+    shift_ids = []
+    written = 0
+    def on_batch(batch):
+        nonlocal written
+        written += len(batch)
+        add_id_ranges(shift_ids, sorted(row["id"] for row in batch))
+        mark_rollup_days(params["schedule_id"], [row["start_time"] for row in batch])
+        progress.update(written, checkpoint={"shift_ids": shift_ids})
+
+    schedule_week(strategy, params["schedule_id"], staff_list, job.admin_id, on_batch=on_batch)
+    return {"schedule_id": params["schedule_id"], "shifts": written}
+
+
+def undo_schedule_week(job):
+    ranges = (job.checkpoint or {}).get("shift_ids") or []
+    schedule_id = job.params["schedule_id"]
+    removed = 0
+    for start in range(0, len(ranges), UNDO_RANGES_PER_DELETE):
+        criteria = (
+            Shift.schedule_id == schedule_id,
+            or_(*(Shift.id.between(first, last) for first, last in ranges[start:start + UNDO_RANGES_PER_DELETE])),
+        )
+        days = db.session.scalars(select(Shift.start_time).where(*criteria)).all()
+        removed += db.session.execute(delete(Shift).where(*criteria).execution_options(synchronize_session=False)).rowcount
+        mark_rollup_days(schedule_id, days)
+    if removed:
+        mark_schedule_changed(db.session, schedule_id)
+    db.session.commit()
+    return removed
+
+
+def run_report(job, progress):
+    progress.update(0, 1)
+    report = view_report(job.params["schedule_id"], job.admin_id)
+    progress.update(1)
+    return report.get_json()
+
+
+# kind -> (check params at submit, run, undo partial work)
+JOB_KINDS = {
+    "schedule_week": (check_schedule_week, run_schedule_week, undo_schedule_week),
+    "report": (require_schedule, run_report, None),
+}
+
+
+def submit_job(kind, params, admin_id):
+    require_admin(admin_id, "submit jobs")
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    check, _, _ = JOB_KINDS[kind]
+    check(params)
+
+    job = Job(kind=kind, params=params, admin_id=int(admin_id))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_job(job_id, admin_id):
+    require_admin(admin_id, "view jobs")
+    # workers update the row behind the session's back
+    job = db.session.get(Job, job_id, populate_existing=True)
+    if job is None:
+        raise LookupError("Job not found")
+    return job
+
+
+def list_jobs(admin_id, limit=20):
+    require_admin(admin_id, "view jobs")
+    return db.session.scalars(select(Job).order_by(Job.id.desc()).limit(limit)).all()
+
+
+def cancel_job(job_id, admin_id):
+    """
+    A queued job is cancelled outright; a running one is asked to stop and
+    does so at its next progress update, undoing what it wrote.
+    """
+    job = get_job(job_id, admin_id)
+    if job.is_finished():
+        raise ValueError(f"Job already {job.status}")
+
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == "queued")
+        .values(status="cancelled", cancel_requested=True, finished_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not cancelled:
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == "running")
+            .values(cancel_requested=True)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return get_job(job_id, admin_id)
+
+
+def claim_job(worker, now=None):
+    """
+    Take the oldest queued job. The conditional UPDATE means two workers
+    racing for the same row cannot both get it; the loser tries the next one.
+    """
+    while True:
+        job_id = db.session.scalar(select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(1))
+        if job_id is None:
+            db.session.commit()
+            return None
+        now = now or datetime.now()
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", worker=worker, started_at=now, heartbeat_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id, populate_existing=True)
+
+
+def finish_job(job_id, status, result=None, error=None, criteria=()):
+    """
+    Move a running job to its final status. Only one caller can win: the
+    worker running it or a stale sweep, whichever updates the row first.
+    Returns whether this caller did.
+    """
+    finished = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == "running", *criteria)
+        .values(status=status, result=result, error=error, finished_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return bool(finished)
+
+
+def abandon_job(job, status, error=None, criteria=()):
+    # Roll back the job's partial work, then claim the row and undo what it committed
+    db.session.rollback()
+    if not finish_job(job.id, status, error=error, criteria=criteria):
+        return False
+    undo = JOB_KINDS[job.kind][2] if job.kind in JOB_KINDS else None
+    if undo:
+        undo(db.session.get(Job, job.id, populate_existing=True))
+    return True
+
+
+def run_job(job):
+    started = time.perf_counter()
+    owned = (Job.worker == job.worker,)
+    try:
+        if job.kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        _, run, _ = JOB_KINDS[job.kind]
+        result = run(job, JobProgress(job.id, job.worker))
+        status = "succeeded" if finish_job(job.id, "succeeded", result=result, criteria=owned) else "lost"
+    except JobLost:
+        status = "lost"
+    except JobCancelled:
+        status = "cancelled" if abandon_job(job, "cancelled", criteria=owned) else "lost"
+    except Exception as e:
+        logger.exception("Job %s failed", job.id)
+        status = "failed" if abandon_job(job, "failed", error=f"{type(e).__name__}: {e}", criteria=owned) else "lost"
+    if status == "lost":
+        logger.warning("Job %s was failed as stale while it ran; its result is discarded", job.id)
+    logger.info(json.dumps({
+        "event": "job", "id": job.id, "kind": job.kind, "status": status,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }))
+    return db.session.get(Job, job.id, populate_existing=True)
+
+
+def fail_stale_jobs(stale_seconds=DEFAULT_STALE_SECONDS, now=None):
+    """
+    Running jobs whose worker stopped sending heartbeats (killed, machine
+    lost) are failed and their partial work undone, so they can be resubmitted.
+    """
+    cutoff = (now or datetime.now()) - timedelta(seconds=stale_seconds)
+    stale = db.session.scalars(select(Job).where(Job.status == "running", Job.heartbeat_at < cutoff)).all()
+    failed = 0
+    for job in stale:
+        # re-checked in the UPDATE: another sweep, or a late heartbeat, may have got there first
+        criteria = (Job.worker == job.worker, Job.heartbeat_at < cutoff)
+        failed += abandon_job(job, "failed", error="Worker stopped responding", criteria=criteria)
+    return failed
+
+
+def run_worker(app, worker=None, burst=False, stop=None):
+    """
+    Poll the job table and run jobs one at a time until `stop` is set (or,
+    with burst, until the queue is empty). Returns the number of jobs run.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    poll = float(app.config.get("JOB_POLL_SECONDS", DEFAULT_POLL_SECONDS))
+    stale_seconds = float(app.config.get("JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+    ran = 0
+    while stop is None or not stop.is_set():
+        job, failed = None, False
+        try:
+            fail_stale_jobs(stale_seconds)
+            job = claim_job(worker)
+            if job is not None:
+                run_job(job)
+                ran += 1
+        except Exception:
+            # e.g. "database is locked"; a stranded claim is failed by fail_stale_jobs later
+            logger.exception("Job worker poll failed")
+            db.session.rollback()
+            failed = True
+        finally:
+            db.session.remove()
+        if job is None:
+            if burst and not failed:
+                break
+            if stop is not None:
+                stop.wait(poll)
+            else:
+                time.sleep(poll)
+    return ran
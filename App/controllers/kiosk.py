@@ -0,0 +1,214 @@
+import json
+from datetime import datetime
+from sqlalchemy import bindparam, func, select, update
+from App.database import db
+from App.models import Shift, User
+from App.models.shift import ShiftStatus
+from App.controllers.identity import get_identity
+from App.controllers.rollup import mark_rollup_days
+from App.services.report_cache import mark_schedule_changed
+
+CLOCK_ACTIONS = ("clock_in", "clock_out")
+MAX_CLOCK_EVENTS = 10000
+LOOKUP_CHUNK_SIZE = 500     # ids per IN (...) list
+APPLY_ATTEMPTS = 3
+
+
+class ClockEventConflict(Exception):
+    # A shift changed between validation and the batched UPDATE
+    pass
+
+
+def read_clock_events(lines):
+    # Parse NDJSON lines into event dicts; blank lines are skipped
+    events = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            raise ValueError(f"Line {number} is not valid JSON")
+    return events
+
+
+def parse_clock_event(event):
+    # Returns (shift_id, staff_id, action, timestamp) or raises ValueError
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+    try:
+        shift_id = int(event["shift_id"])
+        staff_id = int(event["staff_id"])
+        action = event["action"]
+    except KeyError as e:
+        raise ValueError(f'"{e.args[0]}" is required')
+    except (TypeError, ValueError):
+        raise ValueError("shift_id and staff_id must be integers")
+
+    if action not in CLOCK_ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(CLOCK_ACTIONS)}")
+
+    timestamp = event.get("timestamp")
+    try:
+        timestamp = datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be an ISO datetime")
+    if timestamp.tzinfo is not None:
+        # shift times are naive local times
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return shift_id, staff_id, action, timestamp
+
+
+def chunked(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def load_shift_states(shift_ids):
+    # One locked SELECT per chunk of ids (FOR UPDATE is a no-op on SQLite)
+    states = {}
+    for chunk in chunked(shift_ids):
+        rows = db.session.execute(
+            select(Shift.id, Shift.staff_id, Shift.schedule_id, Shift.start_time, Shift.clock_in, Shift.clock_out)
+            .where(Shift.id.in_(chunk))
+            .with_for_update()
+        )
+        for row in rows:
+            states[row.id] = row._asdict()
+    return states
+
+
+def load_staff_ids(staff_ids):
+    staff = set()
+    for chunk in chunked(staff_ids):
+        staff.update(db.session.scalars(select(User.id).where(User.id.in_(chunk), func.lower(User.role) == "staff")))
+    return staff
+
+
+def plan_clock_events(parsed, states, staff):
+    """
+    Validate events against current shift state in timestamp order.
+    Returns per-event results, {shift_id: final state} for changed shifts and
+    the {shift_id: (clock_in, clock_out)} values they were validated against.
+    """
+    results = [None] * len(parsed)
+    original = {shift_id: (state["clock_in"], state["clock_out"]) for shift_id, state in states.items()}
+    changed = {}
+
+    order = sorted((i for i, event in enumerate(parsed) if isinstance(event, tuple)), key=lambda i: parsed[i][3])
+    for i in order:
+        shift_id, staff_id, action, timestamp = parsed[i]
+        result = {"index": i, "shift_id": shift_id, "action": action}
+        results[i] = result
+        state = states.get(shift_id)
+
+        if staff_id not in staff:
+            result.update(ok=False, error="Only staff can clock in or out")
+        elif not state or state["staff_id"] != staff_id:
+            result.update(ok=False, error="Invalid shift for staff")
+        elif action == "clock_in" and state["clock_in"] is not None:
+            result.update(ok=False, error="Staff member has already clocked in for this shift")
+        elif action == "clock_out" and state["clock_in"] is None:
+            result.update(ok=False, error="Cannot clock out before clocking in")
+        elif action == "clock_out" and state["clock_out"] is not None:
+            result.update(ok=False, error="Staff member has already clocked out for this shift")
+        elif action == "clock_out" and timestamp < state["clock_in"]:
+            result.update(ok=False, error="Cannot clock out before clocking in")
+        else:
+            state[action] = timestamp
+            status = ShiftStatus.COMPLETED if state["clock_out"] else ShiftStatus.ONGOING
+            state["status"] = status
+            changed[shift_id] = state
+            result.update(ok=True, status=status.value)
+
+    for i, event in enumerate(parsed):
+        if results[i] is None:
+            results[i] = {"index": i, "ok": False, "error": event}
+    return results, changed, original
+
+
+def apply_clock_changes(changed, original):
+    """
+    Write all changed shifts with executemany UPDATEs. Each row is guarded on
+    the clock values it was validated against; a mismatch means another
+    worker got there first and the whole batch is retried.
+    """
+    table = Shift.__table__
+    stmt = (
+        update(table)
+        .where(
+            table.c.id == bindparam("b_id"),
+            table.c.clock_in.is_not_distinct_from(bindparam("b_old_in", type_=table.c.clock_in.type)),
+            table.c.clock_out.is_not_distinct_from(bindparam("b_old_out", type_=table.c.clock_out.type)),
+        )
+        .values(
+            clock_in=bindparam("b_clock_in"),
+            clock_out=bindparam("b_clock_out"),
+            status=bindparam("b_status"),
+        )
+    )
+    params = [
+        {
+            "b_id": shift_id,
+            "b_old_in": original[shift_id][0],
+            "b_old_out": original[shift_id][1],
+            "b_clock_in": state["clock_in"],
+            "b_clock_out": state["clock_out"],
+            "b_status": state["status"],
+        }
+        for shift_id, state in changed.items()
+    ]
+    if not params:
+        return
+    matched = db.session.execute(stmt, params).rowcount
+    # drivers without reliable executemany rowcounts rely on the FOR UPDATE locks
+    if db.session.get_bind().dialect.supports_sane_multi_rowcount and matched != len(params):
+        raise ClockEventConflict()
+
+
+def ingest_clock_events(events, admin_id):
+    """
+    Validate and apply a batch of kiosk clock events in one transaction.
+    Each event is {"shift_id", "staff_id", "action": "clock_in"|"clock_out",
+    "timestamp": optional ISO datetime of the swipe}.
+    Returns one result dict per event, in input order.
+    """
+    admin = get_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can ingest clock events")
+    if len(events) > MAX_CLOCK_EVENTS:
+        raise ValueError(f"At most {MAX_CLOCK_EVENTS} events can be ingested at once")
+
+    parsed = []
+    for event in events:
+        try:
+            parsed.append(parse_clock_event(event))
+        except ValueError as e:
+            parsed.append(str(e))
+
+    valid = [event for event in parsed if isinstance(event, tuple)]
+    shift_ids = {event[0] for event in valid}
+    staff = load_staff_ids({event[1] for event in valid})
+
+    for attempt in range(APPLY_ATTEMPTS):
+        states = load_shift_states(shift_ids)
+        results, changed, original = plan_clock_events(parsed, states, staff)
+        try:
+            apply_clock_changes(changed, original)
+            break
+        except ClockEventConflict:
+            db.session.rollback()
+            if attempt == APPLY_ATTEMPTS - 1:
+                raise ValueError("Shifts kept changing during ingestion, please retry")
+
+    days_by_schedule = {}
+    for state in changed.values():
+        days_by_schedule.setdefault(state["schedule_id"], set()).add(state["start_time"])
+    for schedule_id, days in days_by_schedule.items():
+        mark_rollup_days(schedule_id, days)
+        mark_schedule_changed(db.session, schedule_id)
+
+    db.session.commit()
+    return results
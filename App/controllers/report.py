@@ -1,45 +1,95 @@
+from datetime import datetime
+from sqlalchemy import Date, case, cast, func, select
+from App.database import db
 from App.models.schedule import Schedule
-from App.models.shift import ShiftStatus
+from App.models.shift import Shift, ShiftStatus
+from App.models.user import User
+
+
+# Date truncation per database backend. Each entry turns a DateTime column
+# into a "YYYY-MM-DD" day bucket that can be grouped on in SQL.
+DAY_BUCKETS = {
+    "sqlite": lambda column: func.strftime("%Y-%m-%d", column),
+    "postgresql": lambda column: func.to_char(func.date_trunc("day", column), "YYYY-MM-DD"),
+}
+
+STATUS_KEYS = {
+    ShiftStatus.SCHEDULED: "scheduled",
+    ShiftStatus.COMPLETED: "completed",
+    ShiftStatus.LATE: "late",
+    ShiftStatus.MISSED: "missed",
+    ShiftStatus.ONGOING: "ongoing",
+}
+
+
+def day_bucket(column):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in DAY_BUCKETS:
+        return DAY_BUCKETS[dialect](column)
+    return cast(column, Date)    # generic fallback, normalised in Python
+
+
+def empty_day():
+    return {key: [] for key in STATUS_KEYS.values()}
+
+
+def summary_query(schedule_id, *criteria, now=None):
+    # One grouped query: day bucket x status (as of now) x staff username, joined once
+    day = day_bucket(Shift.start_time).label("day")
+    status = Shift.status_expression(now or datetime.now()).label("status")
+    return (
+        select(day, status, User.username)
+        .join(User, User.id == Shift.staff_id)
+        .where(Shift.schedule_id == schedule_id, *criteria)
+        .group_by(day, status, User.username)
+        .order_by(day, User.username)
+    )
+
+
+def summary_rows(schedule_id, *criteria, now=None):
+    return db.session.execute(summary_query(schedule_id, *criteria, now=now))
+
+
+def status_changes(schedule_id, now, *criteria):
+    """
+    {day: when the computed status of one of that day's shifts next changes}
+    Only shifts nobody clocked in to change with time: at their start, then
+    at their end. Days whose shifts are all settled are left out.
+    """
+    day = day_bucket(Shift.start_time).label("day")
+    change = case((Shift.start_time >= now, Shift.start_time), (Shift.end_time >= now, Shift.end_time))
+    rows = db.session.execute(
+        select(day, func.min(change))
+        .where(Shift.schedule_id == schedule_id, Shift.clock_in.is_(None), *criteria)
+        .group_by(day)
+    )
+    return {
+        (day if isinstance(day, str) else day.strftime("%Y-%m-%d")): change
+        for day, change in rows if change is not None
+    }
+
+
+def build_days(rows):
+    days = {}
+    for day, status, username in rows:
+        if not isinstance(day, str):
+            day = day.strftime("%Y-%m-%d")
+        record = days.setdefault(day, empty_day())
+
+        # every staff member with a shift that day counts as scheduled
+        if username not in record["scheduled"]:
+            record["scheduled"].append(username)
+
+        key = STATUS_KEYS.get(status)
+        if key and key != "scheduled" and username not in record[key]:
+            record[key].append(username)
+    return days
 
 
 # This controller summarises the attendance of staff for a given schedule
 def get_summary(scheduleID):
-    schedule = Schedule.query.get(scheduleID)
-    if not schedule:
+    schedule_id = db.session.scalar(select(Schedule.id).where(Schedule.id == scheduleID))
+    if schedule_id is None:
         raise ValueError("Schedule not found")
 
-    days = {}
-    for shift in schedule.shifts:
-        day = shift.start_time.strftime("%Y-%m-%d")
-
-        if day not in days:
-            days[day] = {
-                "scheduled": set(),
-                "completed": set(),
-                "late": set(),
-                "missed": set(),
-                "ongoing": set(),
-            }
-
-        staff = shift.staff
-        days[day]["scheduled"].add(staff.username)
-
-        status = shift.status
-        
-        if status == ShiftStatus.SCHEDULED:
-            days[day]["scheduled"].add(staff.username)
-        elif status == ShiftStatus.COMPLETED:
-            days[day]["completed"].add(staff.username)
-        elif status == ShiftStatus.LATE:
-            days[day]["late"].add(staff.username)
-        elif status == ShiftStatus.MISSED:
-            days[day]["missed"].add(staff.username)
-        elif status == ShiftStatus.ONGOING:
-            days[day]["ongoing"].add(staff.username)
-
-    # Convert sets to lists
-    for day, record in days.items():
-        for key in record:
-            record[key] = list(record[key])
-
-    return {"schedule_id": schedule.id, "days": days}
+    return {"schedule_id": schedule_id, "days": build_days(summary_rows(schedule_id))}
@@ -0,0 +1,168 @@
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from App.database import db
+from App.models import AttendanceRollup, Schedule, Shift
+from App.controllers.report import summary_rows, build_days, status_changes
+from App.services.replicas import use_primary
+from App.services.report_cache import mark_schedule_changed
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def to_day(value):
+    # Shift times may be datetimes or plain dates
+    return value.date() if isinstance(value, datetime) else value
+
+
+def mark_rollup_days(schedule_id, days):
+    """
+    Mark the rollup rows for the given days of a schedule as stale so the
+    next read rebuilds just those days. Missing rows are created.
+    """
+    days = sorted({to_day(day) for day in days})
+    if not days:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in UPSERT_INSERTS:
+        stmt = UPSERT_INSERTS[dialect](AttendanceRollup.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["schedule_id", "day"],
+            set_={"version": stmt.table.c.version + 1},
+        )
+        db.session.execute(stmt, [{"schedule_id": schedule_id, "day": day, "version": 1, "built_version": 0} for day in days])
+        return
+
+    for day in days:
+        result = db.session.execute(
+            update(AttendanceRollup)
+            .where(AttendanceRollup.schedule_id == schedule_id, AttendanceRollup.day == day)
+            .values(version=AttendanceRollup.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.add(AttendanceRollup(schedule_id=schedule_id, day=day))
+    db.session.flush()
+
+
+def mark_shift_rollup(shift):
+    mark_rollup_days(shift.schedule_id, [shift.start_time])
+
+
+def day_range(first, last):
+    # Shift criteria covering every shift that starts between two days
+    return (
+        Shift.start_time >= datetime.combine(first, time.min),
+        Shift.start_time < datetime.combine(last + timedelta(days=1), time.min),
+    )
+
+
+def refresh_rollup(schedule_id):
+    """
+    Rebuild only the stale days of a schedule's rollup from its shifts.
+    Returns {day: summary} for every rolled-up day of the schedule.
+    """
+    now = datetime.now()
+    rollups = db.session.execute(
+        select(AttendanceRollup.id, AttendanceRollup.day, AttendanceRollup.summary,
+               AttendanceRollup.version, AttendanceRollup.built_version, AttendanceRollup.valid_until)
+        .where(AttendanceRollup.schedule_id == schedule_id)
+        .order_by(AttendanceRollup.day)
+    ).all()
+
+    summaries = {rollup.day.isoformat(): rollup.summary for rollup in rollups}
+    # plain rows carry the columns is_stale reads, without loading each day as an entity
+    stale = [rollup for rollup in rollups if AttendanceRollup.is_stale(rollup, now)]
+    if not stale:
+        return summaries
+
+    use_primary()   # the rebuilt days are written back, so read the shifts from the primary
+    criteria = day_range(stale[0].day, stale[-1].day)
+    days = build_days(summary_rows(schedule_id, *criteria, now=now))
+    changes = status_changes(schedule_id, now, *criteria)
+    for rollup in stale:
+        summary = days.get(rollup.day.isoformat())
+        summaries[rollup.day.isoformat()] = summary
+        # only mark as built if no writer bumped the version meanwhile
+        db.session.execute(
+            update(AttendanceRollup)
+            .where(AttendanceRollup.id == rollup.id, AttendanceRollup.version == rollup.version)
+            .values(summary=summary, built_version=rollup.version, valid_until=changes.get(rollup.day.isoformat()))
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return summaries
+
+
+def rebuild_rollup(schedule_id=None):
+    """
+    Recompute rollups from scratch for one schedule, or all schedules when
+    schedule_id is None. Returns the number of days written.
+    """
+    if schedule_id is None:
+        schedule_ids = db.session.scalars(select(Schedule.id)).all()
+    else:
+        schedule_ids = [schedule_id]
+
+    now = datetime.now()
+    written = 0
+    for sid in schedule_ids:
+        db.session.execute(delete(AttendanceRollup).where(AttendanceRollup.schedule_id == sid))
+        days = build_days(summary_rows(sid, now=now))
+        changes = status_changes(sid, now)
+        for day, summary in days.items():
+            db.session.add(AttendanceRollup(
+                schedule_id=sid,
+                day=date.fromisoformat(day),
+                summary=summary,
+                version=1,
+                built_version=1,
+                valid_until=changes.get(day),
+            ))
+        written += len(days)
+    db.session.commit()
+    return written
+
+
+def materialize_status(schedule_id=None, now=None):
+    """
+    Write the computed status into Shift.status with one UPDATE, for
+    consumers that read the column directly. Reports and get_json compute it
+    at read time and do not need this. Returns the number of shifts changed.
+    """
+    status = Shift.status_expression(now or datetime.now())
+    criteria = [Shift.status != status]
+    if schedule_id is not None:
+        criteria.append(Shift.schedule_id == schedule_id)
+    # a Core UPDATE skips the flush hooks, so drop the cached reports here
+    for changed_id in db.session.scalars(select(Shift.schedule_id).where(*criteria).distinct()).all():
+        mark_schedule_changed(db.session, changed_id)
+    changed = db.session.execute(
+        update(Shift).where(*criteria).values(status=status).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return changed
+
+
+def get_rollup_summary(schedule_id):
+    """
+    Same shape as get_summary(), read from the per-day rollup table.
+    Reads are O(days); only stale days are recomputed from shifts.
+    """
+    schedule_id = db.session.scalar(select(Schedule.id).where(Schedule.id == schedule_id))
+    if schedule_id is None:
+        raise ValueError("Schedule not found")
+
+    summaries = refresh_rollup(schedule_id)
+    if not summaries and db.session.scalar(select(Shift.id).where(Shift.schedule_id == schedule_id).limit(1)):
+        # schedule predates rollups; build it once
+        rebuild_rollup(schedule_id)
+        summaries = refresh_rollup(schedule_id)
+
+    days = {day: summary for day, summary in summaries.items() if summary}
+    return {"schedule_id": schedule_id, "days": days}
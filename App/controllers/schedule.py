@@ -1,20 +1,25 @@
-from App.controllers.report import get_summary
+from App.controllers.rollup import get_rollup_summary
 from App.models.report import Report
 from datetime import datetime
 from App.database import db
-from App.models.user import User
+from App.controllers.identity import get_identity
+from App.services.report_cache import report_cache
 
 def generate_report(scheduleID, adminID):
     """
     Generate a Report object for a given schedule.
-    Calls get_summary() from report controller and formats the result.
+    Reads the persisted per-day rollup (same shape as get_summary()),
+    served from the report cache when the schedule has not changed.
     """
 
-    user = db.session.get(User, adminID)
+    user = get_identity(adminID)
     if not user or user.role.lower() != "admin":
         raise PermissionError("Only admins can generate shift reports")
                               
-    summary_dict = get_summary(scheduleID)
+    summary_dict = report_cache.get(int(scheduleID))
+    if summary_dict is None:
+        summary_dict = get_rollup_summary(scheduleID)
+        report_cache.set(int(scheduleID), summary_dict)
 
     report = Report(
         #schedule_id=scheduleID,
@@ -1,7 +1,53 @@
-from App.models import Shift
-from App.database import db
+import base64
+from sqlalchemy import case, exists, func, literal, select, tuple_, update
+from App.models import Shift, User
+from App.models.shift import ShiftStatus
+from App.database import db, retry_on_locked
 from datetime import datetime
-from App.controllers.user import get_user
+from App.controllers.identity import get_identity
+from App.controllers.rollup import mark_shift_rollup
+from App.services.report_cache import mark_schedule_changed
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def status_literal(status):
+    # Bind a ShiftStatus with the column's Enum type so it can be used in SQL
+    return literal(status, Shift.status.type)
+
+
+def encode_cursor(shift):
+    # Opaque keyset cursor: the (start_time, id) of the last shift on a page
+    key = f"{shift.start_time.isoformat()}|{shift.id}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start_time, shift_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(start_time), int(shift_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def paginate_shifts(stmt, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Keyset pagination over shifts ordered by (start_time, id).
+    Returns {"shifts": [...], "next_cursor": str or None}.
+    """
+    limit = DEFAULT_PAGE_SIZE if limit is None else limit
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    if cursor:
+        stmt = stmt.where(tuple_(Shift.start_time, Shift.id) > tuple_(*decode_cursor(cursor)))
+
+    # fetch one extra row to know whether another page exists
+    shifts = db.session.scalars(stmt.order_by(Shift.start_time, Shift.id).limit(limit + 1)).all()
+    next_cursor = encode_cursor(shifts[limit - 1]) if len(shifts) > limit else None
+    return {"shifts": [s.get_json() for s in shifts[:limit]], "next_cursor": next_cursor}
+
 
 def view_shifts(staff_id, schedule_id):
     """
@@ -10,7 +56,7 @@ def view_shifts(staff_id, schedule_id):
         - Include schedule_id in filter (was showing ALL the staff’s shifts)
     """
     
-    staff = get_user(staff_id)
+    staff = get_identity(staff_id)
     
     if not staff or staff.role.lower() != "staff":
         raise PermissionError("Only staff can view their shifts")
@@ -27,7 +73,7 @@ def view_schedule(staff_id, schedule_id):
     # Combined view of all shifts in a schedule for staff members
     # Replaces get_combined_roster()
     
-    staff = get_user(staff_id)
+    staff = get_identity(staff_id)
     
     if not staff or staff.role.lower() != "staff":
         raise PermissionError("Only staff can view schedule rosters")
@@ -39,56 +85,110 @@ def view_schedule(staff_id, schedule_id):
     return [s.get_json() for s in shifts]
     
     
+def view_shifts_page(staff_id, schedule_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    # Paginated view_shifts()
+    staff = get_identity(staff_id)
+
+    if not staff or staff.role.lower() != "staff":
+        raise PermissionError("Only staff can view their shifts")
+
+    stmt = select(Shift).where(Shift.staff_id == staff_id, Shift.schedule_id == schedule_id)
+    return paginate_shifts(stmt, limit, cursor)
+
+
+def view_schedule_page(staff_id, schedule_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    # Paginated view_schedule()
+    staff = get_identity(staff_id)
+
+    if not staff or staff.role.lower() != "staff":
+        raise PermissionError("Only staff can view schedule rosters")
+
+    stmt = select(Shift).where(Shift.schedule_id == schedule_id)
+    return paginate_shifts(stmt, limit, cursor)
+
+
+def clock_event(staff_id, shift_id, values, *conditions):
+    """
+    Apply a clock event as one conditional UPDATE ... RETURNING.
+    The staff role check, shift ownership and the clock state checks all
+    live in the WHERE clause, so concurrent taps cannot both succeed.
+    Returns the updated Shift, or None if no row matched.
+    """
+    is_staff = exists().where(User.id == staff_id, func.lower(User.role) == "staff")
+    stmt = (
+        update(Shift)
+        .where(Shift.id == shift_id, Shift.staff_id == staff_id, is_staff, *conditions)
+        .values(**values)
+    )
+
+    if db.session.get_bind().dialect.update_returning:
+        shift = db.session.scalars(
+            stmt.returning(Shift), execution_options={"populate_existing": True}
+        ).first()
+    else:
+        matched = db.session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+        shift = db.session.get(Shift, shift_id, populate_existing=True) if matched else None
+
+    if shift:
+        mark_shift_rollup(shift)
+        mark_schedule_changed(db.session, shift.schedule_id)
+        db.session.commit()
+    return shift
+
+
+def explain_failed_clock_event(staff_id, shift_id, action):
+    # Slow path only: work out why the conditional UPDATE matched nothing
+    staff = get_identity(staff_id)
+    if not staff or staff.role.lower() != "staff":
+        raise PermissionError(f"Only staff can clock {action}")
+
+    shift = Shift.get_shift(shift_id)
+    if not shift or shift.staff_id != staff_id:
+        raise ValueError("Invalid shift for staff")
+    return shift
+
+
+@retry_on_locked
 def clock_in(staff_id, shift_id):
     """
     Staff clocks in to a shift
     fixed:
         - Prevent clock-in if already clocked in.
+        - Single conditional UPDATE, safe under concurrent workers.
     """
-    staff = get_user(staff_id)
-    if not staff or staff.role.lower() != "staff":
-        raise PermissionError("Only staff can clock in")
-    
-    shift = Shift.get_shift(shift_id)
+    shift = clock_event(staff_id, shift_id, {
+        "clock_in": datetime.now(),
+        "status": case(
+            (Shift.clock_out.is_not(None), status_literal(ShiftStatus.COMPLETED)),
+            else_=status_literal(ShiftStatus.ONGOING)
+        ),
+    }, Shift.clock_in.is_(None))
+    if shift:
+        return shift
 
-    if not shift or shift.staff_id != staff_id:
-        raise ValueError("Invalid shift for staff")
-    
+    explain_failed_clock_event(staff_id, shift_id, "in")
     # --- FIX: prevent double clock-in ---
-    if shift.clock_in is not None:
-        raise ValueError("Staff member has already clocked in for this shift")
-
-    shift.clock_in = datetime.now()
-    shift.updateStatus()     #automatically updates the status for the clock in
-    db.session.commit()
-    return shift
+    raise ValueError("Staff member has already clocked in for this shift")
 
 
+@retry_on_locked
 def clock_out(staff_id, shift_id):
     """ 
     Staff clocks out of a shift
     fixed:
         - Prevent clock-out if not clocked in yet.  
+        - Single conditional UPDATE, safe under concurrent workers.
     """
-    staff = get_user(staff_id)
-    if not staff or staff.role.lower() != "staff":
-        raise PermissionError("Only staff can clock out")
-
-    shift = Shift.get_shift(shift_id)
+    shift = clock_event(staff_id, shift_id, {
+        "clock_out": datetime.now(),
+        "status": status_literal(ShiftStatus.COMPLETED),
+    }, Shift.clock_in.is_not(None), Shift.clock_out.is_(None))
+    if shift:
+        return shift
 
-    if not shift or shift.staff_id != staff_id:
-        raise ValueError("Invalid shift for staff")
-    
-     # --- FIX: prevent clock-out before clock-in ---
+    shift = explain_failed_clock_event(staff_id, shift_id, "out")
+    # --- FIX: prevent clock-out before clock-in ---
     if shift.clock_in is None:
         raise ValueError("Cannot clock out before clocking in")
-    
     # Prevent double clock-out
-    if shift.clock_out is not None:
-        raise ValueError("Staff member has already clocked out for this shift")
-
-    shift.clock_out = datetime.now()
-    shift.updateStatus()     #automatically updates the status for the clock out
-    db.session.commit()
-    
-    return shift
\ No newline at end of file
+    raise ValueError("Staff member has already clocked out for this shift")
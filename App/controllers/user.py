@@ -1,5 +1,6 @@
 from App.models import User, Admin, Staff, Shift
 from App.database import db
+from App.controllers.identity import forget_identity
 
 VALID_ROLES = {"user", "staff", "admin"}
 
@@ -47,6 +48,8 @@ def update_user(id, username):
     user = get_user(id)
     if user:
         user.username = username
+        user.token_version += 1     #tokens carrying the old username claim are re-checked
         db.session.commit()
+        forget_identity(id)
         return user
     return None
@@ -1,14 +1,163 @@
+import random, sys, time
+from functools import wraps
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError
+from App.services.query_stats import setup_query_stats
+from App.services.replicas import RoutingSession, app_engines, setup_replicas
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 def get_migrate(app):
+    # alembic is slow to import; only load it when migrations are wired up
+    from flask_migrate import Migrate
     return Migrate(app, db)
 
 def create_db():
     db.create_all()
-    
+
+def create_indexes():
+    # Add model indexes missing from an existing database (create_all skips existing tables)
+    names = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+            names.append(index.name)
+    return names
+
+def add_column(table, column):
+    # ALTER TABLE ... ADD COLUMN for a model column the table does not have yet
+    if not column.nullable and column.server_default is None:
+        raise ValueError(f"{table.name}.{column.name} is NOT NULL without a server default; add it by hand")
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect)}"
+    if column.server_default is not None:
+        default = column.server_default.arg
+        ddl += f" DEFAULT {default.text if hasattr(default, 'text') else repr(str(default))}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    with db.engine.begin() as conn:
+        conn.execute(text(ddl))
+
+def upgrade_db():
+    """
+    Bring an existing database up to the models without dropping data:
+    create missing tables, add missing columns and indexes. Safe to run
+    again; returns what it added.
+    """
+    added = []
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            table.create(db.engine)     # with its indexes
+            added.append(f"table {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                add_column(table, column)
+                added.append(f"column {table.name}.{column.name}")
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(db.engine)
+                added.append(f"index {index.name}")
+    return added
+
+def gevent_wait_callback(conn, timeout=None):
+    # Wait for psycopg2 I/O through the gevent hub instead of blocking the worker
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+def gevent_patched():
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("socket")
+
+def make_psycopg2_cooperative(app):
+    """
+    Under gevent workers, make psycopg2 yield to other greenlets while a
+    query waits on the network. Returns True if the callback was installed.
+    """
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+    if not app.config.get("DB_GEVENT_WAIT", True) or not uri.startswith("postgres") or not gevent_patched():
+        return False
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(gevent_wait_callback)
+    return True
+
+def sqlite_pragmas(config):
+    """
+    PRAGMAs run on every new SQLite connection. The busy timeout makes a
+    writer wait for the lock instead of failing at once. SQLITE_TUNING (off
+    unless a deployment opts in) adds WAL, which lets readers run while a
+    worker writes, and synchronous=NORMAL, durable under WAL except for the
+    last transactions on power loss.
+    """
+    pragmas = [f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}"]
+    if config.get("SQLITE_TUNING", False):
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+            f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}",
+            f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        ]
+    return pragmas
+
+def configure_sqlite(app):
+    pragmas = sqlite_pragmas(app.config)
+    engines = [engine for engine in app_engines(app, db) if engine.dialect.name == "sqlite"]
+    for engine in engines:
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+def is_locked_error(error):
+    return "database is locked" in str(error.orig) or "database table is locked" in str(error.orig)
+
+def retry_on_locked(func):
+    """
+    Retry a controller that commits when SQLite reports the database locked
+    (the busy timeout ran out, or WAL could not upgrade a read to a write).
+    The session is rolled back and the whole function runs again, so it must
+    be safe to repeat. DB_LOCK_RETRIES attempts with jittered backoff.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = int(current_app.config.get("DB_LOCK_RETRIES", 3))
+        backoff = float(current_app.config.get("DB_LOCK_RETRY_BACKOFF_MS", 50)) / 1000
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == retries or not is_locked_error(e):
+                    raise
+                time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
 def init_db(app):
-    db.init_app(app)
\ No newline at end of file
+    make_psycopg2_cooperative(app)
+    db.init_app(app)
+    setup_replicas(app)
+    configure_sqlite(app)
+    setup_query_stats(app, db)
\ No newline at end of file
@@ -1,2 +1,36 @@
 SQLALCHEMY_DATABASE_URI="sqlite:///temp-database.db"
-SECRET_KEY="secret key"
\ No newline at end of file
+SECRET_KEY="secret key"
+REPORT_CACHE_SIZE=128
+REPORT_CACHE_TTL=30
+IDENTITY_CACHE_TTL=0
+TOKEN_VERSION_TTL=60
+PASSWORD_HASH_METHOD="scrypt"
+PASSWORD_HASH_THREADS=4
+QUERY_STATS=True
+SLOW_QUERY_MS=200
+REPEATED_QUERY_THRESHOLD=5
+PROFILE_SAMPLE_RATE=0
+PROFILE_INTERVAL_MS=5
+DB_POOL_SIZE=10
+DB_MAX_OVERFLOW=20
+DB_POOL_TIMEOUT=30
+DB_POOL_RECYCLE=1800
+DB_POOL_PRE_PING=True
+DB_GEVENT_WAIT=True
+REPLICA_DATABASE_URIS=[]
+REPLICA_MAX_LAG_SECONDS=5
+REPLICA_LAG_CHECK_SECONDS=5
+SQLITE_TUNING=False
+SQLITE_SYNCHRONOUS="NORMAL"
+SQLITE_CACHE_SIZE_KB=65536
+SQLITE_MMAP_SIZE=268435456
+SQLITE_BUSY_TIMEOUT_MS=5000
+DB_LOCK_RETRIES=3
+DB_LOCK_RETRY_BACKOFF_MS=50
+STATUS_WORKER=True
+STATUS_TICK_SECONDS=1
+STATUS_HORIZON_SECONDS=3600
+STATUS_RELOAD_SECONDS=30
+STATUS_LEASE_SECONDS=30
+JOB_POLL_SECONDS=1
+JOB_STALE_SECONDS=300
@@ -1,12 +1,11 @@
-import os
+import os, time
 from flask import Flask, render_template
-from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
-from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.datastructures import  FileStorage
 
-from App.database import init_db
+from App.database import db, init_db
 from App.config import load_config
+from App.services.report_cache import configure_report_cache
+from App.services.metrics import setup_metrics
+from App.services.profiler import setup_profiler
 
 
 from App.controllers import (
@@ -14,31 +13,70 @@ from App.controllers import (
     add_auth_context
 )
 
-from App.views import views, setup_admin
+# "web" builds the full site; "cli" skips views, admin, uploads and CORS so
+# one-shot commands (kiosk scripts shelling out to flask) start quickly
+PROFILES = ("web", "cli")
+DEFAULT_PROFILE = "web"
 
 
+def app_profile(profile=None):
+    profile = profile or os.environ.get("ROSTRAPP_PROFILE", DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown app profile '{profile}'. Must be one of {PROFILES}")
+    return profile
+
 
 def add_views(app):
+    from App.views import views
     for view in views:
         app.register_blueprint(view)
 
-def create_app(overrides={}):
-    app = Flask(__name__, static_url_path='/static')
-    load_config(app, overrides)
+
+def add_web_extensions(app):
+    from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
+    from flask_cors import CORS
     CORS(app)
     add_auth_context(app)
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
     add_views(app)
+
+
+def create_app(overrides={}, profile=None, push_context=True):
+    timings = {}
+    started = last = time.perf_counter()
+    def phase(name):
+        nonlocal last
+        now = time.perf_counter()
+        timings[name] = now - last
+        last = now
+
+    profile = app_profile(profile)
+    app = Flask(__name__, static_url_path='/static')
+    load_config(app, overrides)
+    phase("config")
+    if profile == "web":
+        add_web_extensions(app)
+        phase("views")
     init_db(app)
+    configure_report_cache(app)
     jwt = setup_jwt(app)
-    setup_admin(app)
-    @jwt.invalid_token_loader
-    @jwt.unauthorized_loader
-    def custom_unauthorized_response(error):
-        return render_template('401.html', error=error), 401
+    phase("database and jwt")
+    if profile == "web":
+        setup_metrics(app, db)
+        setup_profiler(app)
+        from App.views import setup_admin
+        setup_admin(app)
+        @jwt.invalid_token_loader
+        @jwt.unauthorized_loader
+        def custom_unauthorized_response(error):
+            return render_template('401.html', error=error), 401
+        phase("admin")
     @app.route("/healthcheck")
     def healthcheck():
         return {"status": "ok"}, 200
-    app.app_context().push()
-    return app
\ No newline at end of file
+    timings["total"] = time.perf_counter() - started
+    app.extensions["startup"] = {"profile": profile, "timings": timings}
+    if push_context:
+        app.app_context().push()
+    return app
@@ -4,3 +4,6 @@ from App.models.staff import Staff
 from App.models.schedule import Schedule
 from App.models.shift import Shift
 from App.models.report import Report
+from App.models.attendance_rollup import AttendanceRollup
+from App.models.worker_lease import WorkerLease
+from App.models.job import Job
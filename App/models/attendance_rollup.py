@@ -0,0 +1,33 @@
+from datetime import datetime
+from App.database import db
+
+
+class AttendanceRollup(db.Model):
+    # One row per schedule per day holding that day's attendance summary.
+    # Writers bump `version`; the row is stale until it is rebuilt and
+    # `built_version` catches up. Statuses also change with time (a shift
+    # nobody clocked in to turns late, then missed), so a built row is only
+    # valid until `valid_until`, the next such change on that day.
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id", ondelete="CASCADE"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    summary = db.Column(db.JSON, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    built_version = db.Column(db.Integer, nullable=False, default=0)
+    valid_until = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("schedule_id", "day", name="uq_attendance_rollup_schedule_day"),
+    )
+
+    def is_stale(self, now=None):
+        if self.version != self.built_version:
+            return True
+        return self.valid_until is not None and self.valid_until <= (now or datetime.now())
+
+    def get_json(self):
+        return {
+            "schedule_id": self.schedule_id,
+            "day": self.day.isoformat(),
+            "summary": self.summary,
+        }
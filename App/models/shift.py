@@ -1,6 +1,8 @@
 from App.database import db
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import and_, case, literal, type_coerce
+from sqlalchemy.ext.hybrid import hybrid_property
 
 class ShiftStatus(Enum):
     SCHEDULED = "Scheduled"
@@ -9,6 +11,10 @@ class ShiftStatus(Enum):
     MISSED = "Missed"
     LATE = "Late"
 
+# Shifts whose status still changes with time; partial indexes on this
+# predicate keep the status worker's range scans to pending shifts only
+PENDING_SHIFTS = "clock_in IS NULL AND status IN ('SCHEDULED', 'LATE')"
+
 #class ShiftStatus(PyEnum):
 #    SCH = "scheduled"
 #    COM = "completed"
@@ -35,6 +41,18 @@ class Shift(db.Model):
     staff = db.relationship("User", backref="shifts", foreign_keys=[staff_id])
     schedule = db.relationship("Schedule", back_populates="shifts")# added this
 
+    __table_args__ = (
+        # view_shifts: filter staff_id + schedule_id, ordered by start_time
+        db.Index("ix_shift_staff_schedule_start", "staff_id", "schedule_id", "start_time"),
+        # view_schedule / reports: filter schedule_id, ordered by start_time
+        db.Index("ix_shift_schedule_start", "schedule_id", "start_time"),
+        # status worker: pending shifts starting / ending in a time window
+        db.Index("ix_shift_pending_start", "start_time",
+                 sqlite_where=db.text(PENDING_SHIFTS), postgresql_where=db.text(PENDING_SHIFTS)),
+        db.Index("ix_shift_pending_end", "end_time",
+                 sqlite_where=db.text(PENDING_SHIFTS), postgresql_where=db.text(PENDING_SHIFTS)),
+    )
+
     def __init__(self, staff_id, schedule_id, start_time, end_time, clock_in=None, clock_out=None):
         self.staff_id = staff_id
         self.schedule_id = schedule_id
@@ -68,31 +86,56 @@ class Shift(db.Model):
         return round(hours, 2)    
         
         
-    def updateStatus(self):
-        # Update shift status based on timing and presence of clock-in/out.
-        
-        now = datetime.now()
+    def status_at(self, now):
+        # Status from timing and presence of clock-in/out; same rules as status_expression()
 
         # Completed -> has both clock-in and clock-out
         if self.clock_in and self.clock_out:
-            self.status = ShiftStatus.COMPLETED
+            return ShiftStatus.COMPLETED
 
         # Ongoing -> clocked in but not out yet
-        elif self.clock_in and not self.clock_out:
-            self.status = ShiftStatus.ONGOING
-            
-        # Late -> start_time passed, but staff hasn't clocked in, but clock-in still possible
-        elif now > self.start_time and not self.clock_in and now < self.end_time:
-            self.status = ShiftStatus.LATE
+        if self.clock_in:
+            return ShiftStatus.ONGOING
 
         # Missed -> end_time passed and no clock-in
-        elif now > self.end_time and not self.clock_in:
-            self.status = ShiftStatus.MISSED
+        if now > self.end_time:
+            return ShiftStatus.MISSED
+
+        # Late -> start_time passed, but staff hasn't clocked in, but clock-in still possible
+        if now > self.start_time:
+            return ShiftStatus.LATE
 
         # Scheduled -> future shift not yet started
-        elif now < self.start_time:
-            self.status = ShiftStatus.SCHEDULED 
-        
+        return ShiftStatus.SCHEDULED
+
+    @classmethod
+    def status_expression(cls, now):
+        """
+        status_at() as a SQL CASE with `now` bound as a parameter, so reports
+        and filters see the current status without the column being rewritten.
+        """
+        def status(value):
+            return literal(value, cls.status.type)
+        return type_coerce(case(
+            (and_(cls.clock_in.is_not(None), cls.clock_out.is_not(None)), status(ShiftStatus.COMPLETED)),
+            (cls.clock_in.is_not(None), status(ShiftStatus.ONGOING)),
+            (cls.end_time < now, status(ShiftStatus.MISSED)),
+            (cls.start_time < now, status(ShiftStatus.LATE)),
+            else_=status(ShiftStatus.SCHEDULED),
+        ), cls.status.type)
+
+    @hybrid_property
+    def current_status(self):
+        return self.status_at(datetime.now())
+
+    @current_status.expression
+    def current_status(cls):
+        return cls.status_expression(datetime.now())
+
+    def updateStatus(self):
+        # Store the current status in the status column (see materialize_status for many shifts)
+        self.status = self.current_status
+
     def get_json(self):
             return {
                 "id": self.id,
@@ -102,5 +145,5 @@ class Shift(db.Model):
                 "end_time": self.end_time.isoformat(),
                 "clock_in": self.clock_in.isoformat() if self.clock_in else None,
                 "clock_out": self.clock_out.isoformat() if self.clock_out else None,
-                "status": self.status.value
+                "status": self.current_status.value
             } 
\ No newline at end of file
@@ -1,13 +1,15 @@
-from werkzeug.security import check_password_hash, generate_password_hash
 from App.database import db
 from datetime import datetime
+from App.services.passwords import hash_password, verify_password, needs_rehash
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(20), nullable=False, unique=True)
     password = db.Column(db.String(256), nullable=False)
-    role = db.Column(db.String(10), nullable=False)
+    role = db.Column(db.String(10), nullable=False, index=True)
     active_token = db.Column(db.String, nullable=True)
+    # bumped when role or username change so older token claims are not trusted
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     __mapper_args__ = {
         "polymorphic_identity": "user",
@@ -27,9 +29,12 @@ class User(db.Model):
         }
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password)
 
 
@@ -0,0 +1,16 @@
+from App.database import db
+
+
+class WorkerLease(db.Model):
+    # A named lease held by one worker process until `expires_at`; the holder
+    # renews it while alive, and any worker may take it over once it lapses.
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def get_json(self):
+        return {
+            "name": self.name,
+            "holder": self.holder,
+            "expires_at": self.expires_at.isoformat(),
+        }
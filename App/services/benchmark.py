@@ -0,0 +1,403 @@
+import multiprocessing, os, platform, statistics, subprocess, tempfile, time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import OperationalError
+from App.database import db
+from App.models import User, Schedule, Shift
+from App.services import passwords
+from App.services.passwords import hash_password
+from App.services.scheduler import Scheduler, iter_shift_batches, insert_shift_batch
+from App.services.strategies.even_scheduler import EvenScheduler
+from App.services.strategies.minimum_scheduler import MinimumScheduler
+from App.services.strategies.day_night_scheduler import DayNightScheduler
+from App.services.report_cache import report_cache
+from App.controllers.auth import login
+from App.controllers.identity import forget_identity, get_identities
+from App.controllers.report import get_summary
+from App.controllers.rollup import mark_rollup_days, rebuild_rollup
+from App.controllers.schedule import generate_report
+from App.controllers.staff import view_schedule, view_schedule_page, clock_in, clock_out
+
+BENCH_PASSWORD = "benchpass"
+BENCH_START = datetime(2025, 1, 6)
+DEFAULT_THRESHOLD = 0.2     # slower by more than 20% counts as a regression
+STALL_PROBE_SECONDS = 0.005  # how often the login benchmark checks the event loop is responsive
+
+
+class QueryCounter():
+    # Counts statements sent to the database while active
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self.record)
+
+
+@contextmanager
+def bench_app(overrides):
+    """
+    A separate app for a benchmark database, active only inside the block, so
+    a long-lived process (`flask session`) goes back to its own database
+    afterwards. The process-wide report and identity caches are cleared on
+    the way out; they would otherwise carry benchmark rows across apps.
+    """
+    from App.main import create_app     # App.main imports the views, which import this module
+    app = create_app(overrides, profile="cli", push_context=False)
+    try:
+        with app.app_context():
+            try:
+                yield app
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        report_cache.clear()
+        forget_identity()
+
+
+def seed_dataset(staff_count, days):
+    """
+    Admin, staff_count staff and one schedule of `days` days with a shift per
+    staff member per day, written with bulk INSERTs. All users share one
+    password hash so seeding is not dominated by hashing.
+    """
+    password = hash_password(BENCH_PASSWORD)
+    db.session.execute(insert(User.__table__), [{"username": "bench_admin", "password": password, "role": "admin", "token_version": 0}])
+    db.session.execute(insert(User.__table__), [
+        {"username": f"bench_staff{i}", "password": password, "role": "staff", "token_version": 0}
+        for i in range(staff_count)
+    ])
+    admin_id = db.session.scalar(select(User.id).where(User.username == "bench_admin"))
+    staff_ids = db.session.scalars(select(User.id).where(User.role == "staff", User.username.like("bench_staff%")).order_by(User.id)).all()
+
+    schedule = Schedule(BENCH_START, BENCH_START + timedelta(days=days - 1), admin_id)
+    db.session.add(schedule)
+    db.session.flush()
+    rows = (
+        (staff_id, BENCH_START + timedelta(days=day, hours=9), BENCH_START + timedelta(days=day, hours=17))
+        for day in range(days) for staff_id in staff_ids
+    )
+    shifts = 0
+    for batch in iter_shift_batches(schedule.id, rows):
+        insert_shift_batch(batch)
+        shifts += len(batch)
+
+    db.session.commit()
+    rebuild_rollup(schedule.id)
+    return {
+        "admin_id": admin_id,
+        "staff_ids": staff_ids,
+        "schedule_id": schedule.id,
+        "staff": staff_count,
+        "days": days,
+        "shifts": shifts,
+    }
+
+
+# Each case takes (dataset, repetition), does any untimed preparation and
+# returns the zero-argument callable that is timed.
+
+def fill_schedule_case(strategy_class):
+    def case(dataset, repetition):
+        staff_list = list(get_identities(dataset["staff_ids"]).values())
+        start = BENCH_START + timedelta(days=dataset["days"] * (repetition + 1))
+        schedule = Schedule(start, start + timedelta(days=dataset["days"] - 1), dataset["admin_id"])
+        db.session.add(schedule)
+        db.session.commit()
+
+        def run():
+            days = set()
+            Scheduler(strategy_class()).bulk_fill_schedule(
+                staff_list, schedule, on_batch=lambda batch: days.update(row["start_time"] for row in batch)
+            )
+            mark_rollup_days(schedule.id, days)
+            db.session.commit()
+        return run
+    return case
+
+
+def get_summary_case(dataset, repetition):
+    return lambda: get_summary(dataset["schedule_id"])
+
+
+def rollup_report_case(dataset, repetition):
+    report_cache.clear()
+    return lambda: generate_report(dataset["schedule_id"], dataset["admin_id"])
+
+
+def cached_report_case(dataset, repetition):
+    generate_report(dataset["schedule_id"], dataset["admin_id"])
+    return lambda: generate_report(dataset["schedule_id"], dataset["admin_id"])
+
+
+def view_schedule_case(dataset, repetition):
+    return lambda: view_schedule(dataset["staff_ids"][0], dataset["schedule_id"])
+
+
+def view_schedule_page_case(dataset, repetition):
+    return lambda: view_schedule_page(dataset["staff_ids"][0], dataset["schedule_id"])
+
+
+def clock_in_case(dataset, repetition):
+    staff_id = dataset["staff_ids"][0]
+    shift_ids = db.session.scalars(
+        select(Shift.id).where(Shift.schedule_id == dataset["schedule_id"], Shift.staff_id == staff_id).order_by(Shift.id)
+    ).all()
+    shift_id = shift_ids[repetition % len(shift_ids)]
+    db.session.execute(update(Shift).where(Shift.id == shift_id).values(clock_in=None, clock_out=None))
+    db.session.commit()
+    return lambda: clock_in(staff_id, shift_id)
+
+
+def login_case(dataset, repetition):
+    return lambda: login("bench_staff0", BENCH_PASSWORD)
+
+
+BENCH_CASES = {
+    "fill_schedule.even": fill_schedule_case(EvenScheduler),
+    "fill_schedule.minimum": fill_schedule_case(MinimumScheduler),
+    "fill_schedule.daynight": fill_schedule_case(DayNightScheduler),
+    "get_summary": get_summary_case,
+    "report.rollup": rollup_report_case,
+    "report.cached": cached_report_case,
+    "view_schedule": view_schedule_case,
+    "view_schedule_page": view_schedule_page_case,
+    "clock_in": clock_in_case,
+    "login": login_case,
+}
+
+
+def run_case(name, dataset, repeat):
+    case = BENCH_CASES[name]
+    timings, queries = [], []
+    for repetition in range(repeat):
+        run = case(dataset, repetition)
+        with QueryCounter(db.engine) as counter:
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        queries.append(counter.count)
+    return {
+        "name": name,
+        "repeat": repeat,
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+        "queries": max(queries),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(staff_count=50, days=28, repeat=5, cases=None, on_case=None):
+    """
+    Seed a synthetic dataset into the current (empty) database and time each
+    case. Returns a JSON-serialisable dict; compare two of them with
+    compare_results() to catch regressions between commits.
+    """
+    names = list(cases or BENCH_CASES)
+    unknown = [name for name in names if name not in BENCH_CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(unknown)}")
+    if staff_count < 2 or days < 1 or repeat < 1:
+        raise ValueError("Benchmarks need at least 2 staff, 1 day and 1 repetition")
+
+    dataset = seed_dataset(staff_count, days)
+    results = []
+    for name in names:
+        results.append(run_case(name, dataset, repeat))
+        if on_case:
+            on_case(results[-1])
+
+    return {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": db.engine.dialect.name,
+        "dataset": {key: dataset[key] for key in ("staff", "days", "shifts")},
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Cases whose median time grew by more than `threshold` (a fraction), or
+    that now run more queries. Returns one dict per case present in both.
+    """
+    before = {result["name"]: result for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+        comparisons.append({
+            "name": result["name"],
+            "baseline_ms": old["median_ms"],
+            "current_ms": result["median_ms"],
+            "ratio": round(ratio, 3),
+            "baseline_queries": old["queries"],
+            "current_queries": result["queries"],
+            "regression": ratio > 1 + threshold or result["queries"] > old["queries"],
+        })
+    return comparisons
+
+
+# Concurrent SQLite writes: separate processes, like gunicorn workers,
+# clocking in and out of their own shifts in one database file
+
+def write_overrides(database_uri, tuned):
+    # the untuned run is the pre-WAL setup: rollback journal and no lock retries
+    overrides = {"SQLALCHEMY_DATABASE_URI": database_uri, "SQLITE_TUNING": tuned, "QUERY_STATS": False}
+    if not tuned:
+        overrides["DB_LOCK_RETRIES"] = 0
+    return overrides
+
+
+def clock_writer(database_uri, tuned, staff_id, shift_ids, ready, go, results):
+    from App.main import create_app
+    create_app(write_overrides(database_uri, tuned), profile="cli")     # a fresh process; its context stays pushed
+    ready.put(os.getpid())
+    go.wait()
+    events = failed = 0
+    for shift_id in shift_ids:
+        for clock in (clock_in, clock_out):
+            try:
+                clock(staff_id, shift_id)
+                events += 1
+            except OperationalError:
+                db.session.rollback()
+                failed += 1
+    results.put({"events": events, "failed": failed})
+
+
+def run_write_benchmark(path, workers=4, shifts=100, tuned=True):
+    """
+    Seed `shifts` shifts per worker into a new SQLite file at path, then
+    start `workers` processes that clock in and out of all of them at once.
+    Returns committed events per second and the events that failed with
+    "database is locked".
+    """
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    database_uri = f"sqlite:///{path}"
+    with bench_app(write_overrides(database_uri, tuned)):
+        db.create_all()
+        dataset = seed_dataset(workers, shifts)
+        work = [
+            (staff_id, db.session.scalars(select(Shift.id).where(Shift.staff_id == staff_id).order_by(Shift.id)).all())
+            for staff_id in dataset["staff_ids"]
+        ]
+
+    context = multiprocessing.get_context("spawn")
+    ready, results, go = context.Queue(), context.Queue(), context.Event()
+    processes = [
+        context.Process(target=clock_writer, args=(database_uri, tuned, staff_id, shift_ids, ready, go, results))
+        for staff_id, shift_ids in work
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        ready.get()
+    started = time.perf_counter()
+    go.set()
+    totals = [results.get() for process in processes]
+    seconds = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    events = sum(total["events"] for total in totals)
+    return {
+        "mode": "tuned" if tuned else "baseline",
+        "workers": workers,
+        "events": events,
+        "failed": sum(total["failed"] for total in totals),
+        "seconds": round(seconds, 3),
+        "events_per_second": round(events / seconds, 1),
+    }
+
+
+# Concurrent logins in one gevent worker: password hashing inline on the
+# event loop versus on the native thread pool of App.services.passwords
+
+def run_login_benchmark(logins=64, threads=4, method=None, path=None):
+    """
+    Start `logins` greenlets that each log in at once, as concurrent requests
+    in one gevent worker do. threads=0 hashes inline on the event loop.
+    Returns logins per second and the longest the loop went unresponsive,
+    measured by a greenlet that asks to wake every STALL_PROBE_SECONDS.
+    """
+    import gevent
+    path = path or os.path.join(tempfile.mkdtemp(), "bench-logins.db")
+    overrides = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "SQLITE_TUNING": True,
+        "PASSWORD_HASH_THREADS": threads, "QUERY_STATS": False,
+        # each login holds its connection while hashing; without monkey-patching a pool wait would block the loop
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": logins, "max_overflow": 0},
+    }
+    if method:
+        overrides["PASSWORD_HASH_METHOD"] = method
+
+    with bench_app(overrides) as app:
+        db.drop_all()
+        db.create_all()
+        seed_dataset(1, 1)
+        db.session.remove()
+
+        def attempt():
+            # each greenlet is a request: its own app context and session
+            with app.app_context():
+                try:
+                    return login("bench_staff0", BENCH_PASSWORD) is not None
+                finally:
+                    db.session.remove()
+
+        stalls = [0.0]
+        done = gevent.event.Event()
+        def probe():
+            last = time.perf_counter()
+            while not done.is_set():
+                gevent.sleep(STALL_PROBE_SECONDS)
+                now = time.perf_counter()
+                stalls.append(now - last - STALL_PROBE_SECONDS)
+                last = now
+
+        prober = gevent.spawn(probe)
+        gevent.sleep(0)
+        started = time.perf_counter()
+        greenlets = [gevent.spawn(attempt) for _ in range(logins)]
+        gevent.joinall(greenlets)
+        seconds = time.perf_counter() - started
+        done.set()
+        prober.join()
+
+    if passwords.hash_pool is not None:
+        # the pool is sized once per process; the next run may ask for another size
+        passwords.hash_pool.kill()
+        passwords.hash_pool = None
+    return {
+        "mode": "offloaded" if threads > 0 else "inline",
+        "logins": logins,
+        "threads": threads,
+        "succeeded": sum(1 for greenlet in greenlets if greenlet.value),
+        "seconds": round(seconds, 3),
+        "logins_per_second": round(logins / seconds, 1),
+        "max_stall_ms": round(max(stalls) * 1000, 1),
+    }
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from App.database import db
+from App.models import WorkerLease
+
+
+def acquire_lease(name, holder, seconds, now=None):
+    """
+    Take or renew the named lease for `holder`. Succeeds if nobody holds it,
+    `holder` already does, or the current holder let it expire. One UPDATE
+    (or INSERT the first time), so it works the same on SQLite and PostgreSQL.
+    """
+    now = now or datetime.now()
+    expires_at = now + timedelta(seconds=seconds)
+    taken = db.session.execute(
+        update(WorkerLease)
+        .where(WorkerLease.name == name, or_(WorkerLease.holder == holder, WorkerLease.expires_at < now))
+        .values(holder=holder, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if taken:
+        db.session.commit()
+        return True
+    if db.session.get(WorkerLease, name) is not None:
+        db.session.rollback()
+        return False
+    try:
+        db.session.add(WorkerLease(name=name, holder=holder, expires_at=expires_at))
+        db.session.commit()
+        return True
+    except IntegrityError:      # another worker inserted it first
+        db.session.rollback()
+        return False
+
+
+def release_lease(name, holder):
+    db.session.execute(delete(WorkerLease).where(WorkerLease.name == name, WorkerLease.holder == holder))
+    db.session.commit()
@@ -0,0 +1,113 @@
+import os, time
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from sqlalchemy import event
+from App.services.replicas import app_engines
+
+# With gunicorn, PROMETHEUS_MULTIPROC_DIR is set in gunicorn_config.py before
+# workers fork; each worker then writes its samples to files in that directory
+# and /metrics sums them, so any worker can answer a scrape.
+
+REQUEST_LATENCY = Histogram(
+    "rostrapp_request_duration_seconds",
+    "Request latency by blueprint and endpoint",
+    ["blueprint", "endpoint", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "rostrapp_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+DB_CHECKOUTS = Counter(
+    "rostrapp_db_pool_checkouts",
+    "Connections checked out of the database pool",
+)
+DB_CONNECTIONS_IN_USE = Gauge(
+    "rostrapp_db_connections_in_use",
+    "Database connections currently checked out",
+    multiprocess_mode="livesum",
+)
+SCHEDULER_RUN = Histogram(
+    "rostrapp_scheduler_run_seconds",
+    "Time to generate and insert a schedule's shifts",
+    ["strategy"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SHIFTS_GENERATED = Counter(
+    "rostrapp_shifts_generated",
+    "Shifts written by scheduling strategies",
+    ["strategy"],
+)
+
+SHIFT_TRANSITIONS = Counter(
+    "rostrapp_shift_transitions",
+    "Shifts moved to Late or Missed by the status worker",
+    ["status"],
+)
+
+
+def record_scheduler_run(strategy, seconds, shifts):
+    name = type(strategy).__name__
+    SCHEDULER_RUN.labels(name).observe(seconds)
+    SHIFTS_GENERATED.labels(name).inc(shifts)
+
+
+def instrument_pool(engine):
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_CHECKOUTS.inc()
+        DB_CONNECTIONS_IN_USE.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_CONNECTIONS_IN_USE.dec()
+
+
+def collect_metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def setup_metrics(app, db):
+    """
+    Record request latency and in-flight requests, count pool checkouts and
+    serve everything at /metrics in the Prometheus text format.
+    """
+    if not app.config.get("METRICS", True):
+        return
+
+    for engine in app_engines(app, db):
+        instrument_pool(engine)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get("metrics_started")
+        if started is not None:
+            REQUEST_LATENCY.labels(
+                request.blueprint or "app",
+                request.endpoint or "unmatched",   # keeps 404 paths out of the labels
+                request.method,
+                response.status_code,
+            ).observe(time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        if g.pop("metrics_started", None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(collect_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,79 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = "scrypt"      # werkzeug's default
+DEFAULT_HASH_THREADS = 4
+
+hash_pool = None
+pool_lock = Lock()
+
+
+def hash_method():
+    # e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1"; cost is part of the method
+    if not has_app_context():
+        return DEFAULT_HASH_METHOD
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD)
+
+
+def hash_threads():
+    if not has_app_context():
+        return DEFAULT_HASH_THREADS
+    return int(current_app.config.get("PASSWORD_HASH_THREADS", DEFAULT_HASH_THREADS))
+
+
+def in_gevent_greenlet():
+    # True inside a gevent worker's request greenlet; plain threads and the CLI run inline
+    gevent = sys.modules.get("gevent")
+    return gevent is not None and isinstance(gevent.getcurrent(), gevent.Greenlet)
+
+
+def get_hash_pool():
+    """
+    Bounded pool of native threads for hashing. PBKDF2/scrypt release the GIL,
+    so the hub keeps serving other greenlets while a hash is computed.
+    """
+    global hash_pool
+    with pool_lock:
+        if hash_pool is None:
+            from gevent.threadpool import ThreadPool
+            hash_pool = ThreadPool(max(1, hash_threads()))
+        return hash_pool
+
+
+def offload(func, *args):
+    if in_gevent_greenlet() and hash_threads() > 0:
+        return get_hash_pool().apply(func, args)
+    return func(*args)
+
+
+def hash_password(password):
+    return offload(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    return offload(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def full_method(method):
+    # werkzeug stores parameters in full ("scrypt" -> "scrypt:32768:8:1")
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    # Hashes made with another method or cost are upgraded on the next login
+    return password_hash.split("$", 1)[0] != full_method(hash_method())
+
+
+def hash_passwords(passwords):
+    # Hash a batch (bulk imports) across the pool's threads
+    method = hash_method()
+    passwords = list(passwords)
+    if in_gevent_greenlet() and hash_threads() > 0:
+        return list(get_hash_pool().imap(generate_password_hash, passwords, [method] * len(passwords)))
+    with ThreadPoolExecutor(max(1, hash_threads())) as executor:
+        return list(executor.map(generate_password_hash, passwords, [method] * len(passwords)))
@@ -0,0 +1,170 @@
+import importlib, itertools, os, sys
+from collections import Counter
+from threading import Lock
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_PROFILE_HEADER = "X-Profile"
+MAX_STACKS_PER_ENDPOINT = 5000
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def native(module, name):
+    # The unpatched primitive when gevent has monkey-patched the stdlib:
+    # the sampler must be a real OS thread to interrupt a busy greenlet
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None:
+        return monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+
+def frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame, root):
+    # "outer;...;inner" from root down, or None if the frame is not under root
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        if frame is root:
+            return ";".join(reversed(names))
+        frame = frame.f_back
+    return None
+
+
+class StackSampler():
+    """
+    Samples the stack of one OS thread every interval from a native thread.
+    Only stacks running under `root` are kept, so with gevent the other
+    greenlets sharing the thread are not attributed to this request.
+    """
+
+    def __init__(self, root, interval_ms=DEFAULT_INTERVAL_MS):
+        self.root = root
+        self.thread_id = native("_thread", "get_ident")()
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self.running = False
+        self.done = native("_thread", "allocate_lock")()
+
+    def start(self):
+        self.running = True
+        self.done.acquire()
+        native("_thread", "start_new_thread")(self.run, ())
+        return self
+
+    def run(self):
+        sleep = native("time", "sleep")
+        try:
+            while self.running:
+                frame = sys._current_frames().get(self.thread_id)
+                stack = collapse(frame, self.root) if frame is not None else None
+                if stack:
+                    self.samples[stack] += 1
+                del frame
+                sleep(self.interval)
+        finally:
+            self.done.release()
+
+    def stop(self):
+        self.running = False
+        with self.done:     # waits at most one interval for the last sample
+            return self.samples
+
+
+class ProfileStore():
+    # Collapsed stacks aggregated per endpoint for this worker process
+
+    def __init__(self):
+        self.lock = Lock()
+        self.stacks = {}
+        self.requests = Counter()
+
+    def add(self, endpoint, samples):
+        with self.lock:
+            self.requests[endpoint] += 1
+            stacks = self.stacks.setdefault(endpoint, Counter())
+            for stack, count in samples.items():
+                if stack in stacks or len(stacks) < MAX_STACKS_PER_ENDPOINT:
+                    stacks[stack] += count
+
+    def collapsed(self, endpoint=None):
+        """
+        Lines of "endpoint;frame;...;frame count", the input format of
+        flamegraph.pl and speedscope.
+        """
+        with self.lock:
+            lines = []
+            for name, stacks in sorted(self.stacks.items()):
+                if endpoint is None or name == endpoint:
+                    lines.extend(f"{name};{stack} {count}" for stack, count in stacks.most_common())
+            return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self):
+        with self.lock:
+            return {
+                name: {"requests": self.requests[name], "samples": sum(stacks.values())}
+                for name, stacks in self.stacks.items()
+            }
+
+    def clear(self):
+        with self.lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+
+profile_store = ProfileStore()
+
+
+def dispatch_frame():
+    # The frame of Flask.full_dispatch_request handling the current request
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_name != "full_dispatch_request":
+        frame = frame.f_back
+    return frame
+
+
+def requested_by_admin(header):
+    # Forced profiling is only honoured for a valid admin token
+    if not request.headers.get(header):
+        return False
+    from App.controllers.identity import get_identity     # controllers import this module
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_identity(get_jwt_identity())
+    except Exception:
+        return False
+    return identity is not None and identity.role == "admin"
+
+
+def setup_profiler(app):
+    """
+    Opt-in sampling profiler: every PROFILE_SAMPLE_RATE-th request (0 = off),
+    plus requests sending the PROFILE_HEADER header with an admin token, are
+    sampled every PROFILE_INTERVAL_MS and aggregated per endpoint.
+    """
+    rate = int(app.config.get("PROFILE_SAMPLE_RATE", 0))
+    interval_ms = float(app.config.get("PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+    header = app.config.get("PROFILE_HEADER", DEFAULT_PROFILE_HEADER)
+    counter = itertools.count(1)
+
+    @app.before_request
+    def start_profiling():
+        sampled = rate > 0 and next(counter) % rate == 0
+        if not (sampled or requested_by_admin(header)):
+            return
+        root = dispatch_frame()
+        if root is not None:
+            g.profile_sampler = StackSampler(root, interval_ms).start()
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        sampler = g.pop("profile_sampler", None)
+        if sampler is not None:
+            profile_store.add(request.endpoint or "unmatched", sampler.stop())
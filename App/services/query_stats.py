@@ -0,0 +1,117 @@
+import json, logging, time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from App.services.replicas import app_engines
+
+logger = logging.getLogger("App.queries")
+
+DEFAULT_SLOW_QUERY_MS = 200
+DEFAULT_REPEAT_THRESHOLD = 5    # identical statements per request that suggest an N+1
+MAX_LOGGED_SQL = 500
+
+
+def request_stats():
+    # Per-request counters on flask.g; None outside a request (CLI, tests)
+    if not has_request_context():
+        return None
+    if "query_stats" not in g:
+        g.query_stats = {"count": 0, "seconds": 0.0, "statements": Counter()}
+    return g.query_stats
+
+
+def instrument_engine(engine, slow_query_ms):
+    """
+    Time every statement on an engine. Statements slower than slow_query_ms
+    are logged; inside a request they are also counted for the response.
+    """
+    # the start time lives on the statement's execution context, so a statement
+    # that raises (after_cursor_execute never runs) leaves nothing behind
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats = request_stats()
+        if stats is not None:
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+            if not executemany:
+                stats["statements"][statement] += 1
+        if elapsed * 1000 >= slow_query_ms:
+            logger.warning(json.dumps({
+                "event": "slow_query",
+                "ms": round(elapsed * 1000, 1),
+                "path": request.path if has_request_context() else None,
+                "sql": " ".join(statement.split())[:MAX_LOGGED_SQL],
+            }))
+
+
+def repeated_statements(stats, threshold):
+    return [(statement, count) for statement, count in stats["statements"].most_common() if count >= threshold]
+
+
+def setup_query_stats(app, db):
+    """
+    Count queries and database time per request. In debug mode (or with
+    QUERY_STATS_HEADERS) the totals are sent as X-Query-* response headers;
+    every request also logs them as one JSON line on the App.queries logger:
+    a WARNING when a statement repeats REPEATED_QUERY_THRESHOLD times (a
+    likely N+1), INFO when its database time reaches SLOW_QUERY_MS and
+    DEBUG otherwise.
+    """
+    if not app.config.get("QUERY_STATS", True):
+        return
+    slow_query_ms = float(app.config.get("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS))
+    threshold = int(app.config.get("REPEATED_QUERY_THRESHOLD", DEFAULT_REPEAT_THRESHOLD))
+    headers = app.config.get("QUERY_STATS_HEADERS")
+    if headers is None:
+        headers = app.debug
+
+    for engine in app_engines(app, db):
+        instrument_engine(engine, slow_query_ms)
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop("query_stats", None)
+        if stats is None:
+            return response
+        repeated = repeated_statements(stats, threshold)
+        db_ms = round(stats["seconds"] * 1000, 1)
+
+        if headers:
+            response.headers["X-Query-Count"] = str(stats["count"])
+            response.headers["X-Query-Time-Ms"] = str(db_ms)
+            if repeated:
+                response.headers["X-Query-Repeated"] = str(max(count for _, count in repeated))
+
+        fields = {
+            "event": "request_queries",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats["count"],
+            "db_ms": db_ms,
+        }
+        if repeated:
+            fields["repeated"] = [
+                {"count": count, "sql": " ".join(statement.split())[:MAX_LOGGED_SQL]}
+                for statement, count in repeated
+            ]
+            logger.warning(json.dumps(fields))
+        elif db_ms >= slow_query_ms:
+            logger.info(json.dumps(fields))
+        else:
+            logger.debug(json.dumps(fields))
+        return response
+
+    @app.teardown_request
+    def clear_query_stats(exc):
+        # requests that failed before after_request must not leak into the next one
+        g.pop("query_stats", None)
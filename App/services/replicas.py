@@ -0,0 +1,142 @@
+import itertools, logging, time
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, create_engine, text
+
+logger = logging.getLogger("App.replicas")
+
+DEFAULT_MAX_LAG_SECONDS = 5
+DEFAULT_LAG_CHECK_SECONDS = 5
+REPLICA_NAME_PREFIX = "replica"
+
+# Replay lag of a PostgreSQL standby; 0 when it has replayed everything it
+# received, so an idle primary does not make the replica look behind
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_uris(uris):
+    # REPLICA_DATABASE_URIS by name; accepts a list or a comma separated string
+    if isinstance(uris, str):
+        uris = [uri.strip() for uri in uris.split(",") if uri.strip()]
+    return {f"{REPLICA_NAME_PREFIX}{number}": uri for number, uri in enumerate(uris or [], 1)}
+
+
+def measure_lag(engine):
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(POSTGRES_LAG_SQL).scalar())
+
+
+class ReplicaSet():
+    """
+    The replica engines of an app, used round robin. Each replica's lag is
+    checked at most every lag_check_seconds; replicas further behind than
+    max_lag_seconds, or failing the check, are skipped until the next check.
+    The engines are kept out of SQLALCHEMY_BINDS so create_all and migrations
+    never target a replica.
+    """
+
+    def __init__(self, engines, max_lag_seconds=DEFAULT_MAX_LAG_SECONDS, lag_check_seconds=DEFAULT_LAG_CHECK_SECONDS):
+        self.engines = engines
+        self.keys = sorted(engines)
+        self.max_lag = max_lag_seconds
+        self.lag_check = lag_check_seconds
+        self.lags = {}      # key -> (checked_at, lag seconds)
+        self.turn = itertools.count()
+
+    def lag(self, key, engine):
+        checked = self.lags.get(key)
+        now = time.monotonic()
+        if checked is not None and now - checked[0] < self.lag_check:
+            return checked[1]
+        try:
+            lag = measure_lag(engine)
+        except Exception as e:
+            logger.warning("Replica %s unavailable: %s", key, e)
+            lag = float("inf")
+        self.lags[key] = (now, lag)
+        return lag
+
+    def choose(self):
+        # A replica within the lag tolerance, or None to read from the primary
+        start = next(self.turn)
+        for offset in range(len(self.keys)):
+            key = self.keys[(start + offset) % len(self.keys)]
+            if self.lag(key, self.engines[key]) <= self.max_lag:
+                return self.engines[key]
+        return None
+
+
+def reads_from_replica():
+    return has_app_context() and g.get("replica_reads", False) and not g.get("replica_wrote", False)
+
+
+def is_read(clause):
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs made inside replica_reads to a replica. Writes, locking
+    reads and everything after the first write in the same replica_reads block
+    go to the primary, so a view reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and reads_from_replica():
+            if is_read(clause) and not self._flushing:
+                replicas = current_app.extensions.get("replicas")
+                engine = replicas.choose() if replicas else None
+                if engine is not None:
+                    return engine
+            else:
+                g.replica_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(func):
+    # Let the reads of a view or controller go to a replica when one is configured
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if g.get("replica_reads", False):
+            return func(*args, **kwargs)    # nested: the outer block keeps its write state
+        g.replica_reads, g.replica_wrote = True, False
+        try:
+            return func(*args, **kwargs)
+        finally:
+            g.pop("replica_reads", None)
+            g.pop("replica_wrote", None)
+    return wrapper
+
+
+def use_primary():
+    # Send the rest of the current replica_reads block to the primary (read-modify-write)
+    if has_app_context() and g.get("replica_reads", False):
+        g.replica_wrote = True
+
+
+def app_engines(app, db):
+    # The app's engines, replicas included, for per-engine instrumentation
+    with app.app_context():
+        engines = list(db.engines.values())
+    replicas = app.extensions.get("replicas")
+    return engines + (list(replicas.engines.values()) if replicas else [])
+
+
+def setup_replicas(app):
+    uris = replica_uris(app.config.get("REPLICA_DATABASE_URIS"))
+    if not uris:
+        return None
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    replicas = ReplicaSet(
+        {name: create_engine(uri, **options) for name, uri in uris.items()},
+        float(app.config.get("REPLICA_MAX_LAG_SECONDS", DEFAULT_MAX_LAG_SECONDS)),
+        float(app.config.get("REPLICA_LAG_CHECK_SECONDS", DEFAULT_LAG_CHECK_SECONDS)),
+    )
+    app.extensions["replicas"] = replicas
+    return replicas
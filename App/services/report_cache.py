@@ -0,0 +1,136 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from App.models.shift import Shift
+
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_CACHE_TTL = 30      # seconds; bounds staleness across gunicorn workers
+
+
+class ReportCache():
+    # Bounded LRU of report summaries keyed by schedule id
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize, ttl):
+        with self.lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, schedule_id):
+        with self.lock:
+            entry = self.entries.get(schedule_id)
+            if entry is not None and (not self.ttl or entry[0] > time.monotonic()):
+                self.entries.move_to_end(schedule_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[schedule_id]
+            self.misses += 1
+            return None
+
+    def set(self, schedule_id, summary):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[schedule_id] = (expires, summary)
+            self.entries.move_to_end(schedule_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, schedule_id):
+        with self.lock:
+            if self.entries.pop(schedule_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+report_cache = ReportCache()
+
+
+def configure_report_cache(app):
+    report_cache.configure(
+        maxsize=int(app.config.get("REPORT_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+        ttl=float(app.config.get("REPORT_CACHE_TTL", DEFAULT_CACHE_TTL)),
+    )
+
+
+def mark_schedule_changed(session, schedule_id):
+    """
+    Record that shifts of a schedule changed in this session. The cached
+    report is dropped now and again once the transaction commits, so a
+    reader racing the commit cannot leave a stale entry behind.
+    """
+    if schedule_id is None:
+        return
+    session.info.setdefault("changed_schedules", set()).add(schedule_id)
+    report_cache.invalidate(schedule_id)
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_flushed_shifts(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Shift):
+            continue
+        mark_schedule_changed(session, obj.schedule_id)
+        # a shift moved between schedules invalidates the old one too
+        for old_id in inspect(obj).attrs.schedule_id.history.deleted:
+            mark_schedule_changed(session, old_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def invalidate_bulk_shift_writes(orm_execute_state):
+    # Core INSERTs from the bulk scheduler path bypass the flush
+    if not orm_execute_state.is_insert:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None or table.name != Shift.__tablename__:
+        return
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params or {}]
+    for schedule_id in {row.get("schedule_id") for row in rows}:
+        mark_schedule_changed(orm_execute_state.session, schedule_id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_schedules(session):
+    for schedule_id in session.info.pop("changed_schedules", ()):
+        report_cache.invalidate(schedule_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_rolled_back_schedules(session):
+    session.info.pop("changed_schedules", None)
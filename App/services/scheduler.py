@@ -1,4 +1,14 @@
+import time
+from itertools import islice
+from sqlalchemy import insert
+from App.database import db
+from App.models.shift import Shift, ShiftStatus
 from App.services import scheduling_strategy
+from App.services.metrics import record_scheduler_run
+
+# Rows per multi-row INSERT. SQLAlchemy's insertmanyvalues batches these
+# further to stay under the driver's bound-parameter limit.
+SHIFT_INSERT_BATCH_SIZE = 5000
 
 class Scheduler():
     # class diagram uses composition so I assume Scheduler class should be 
@@ -10,4 +20,61 @@ class Scheduler():
         self.strategy = strategy
     
     def fill_schedule(self, staff_list, schedule):
-        self.strategy.fill_schedule(staff_list, schedule)
\ No newline at end of file
+        self.strategy.fill_schedule(staff_list, schedule)
+
+    def bulk_fill_schedule(self, staff_list, schedule, batch_size=SHIFT_INSERT_BATCH_SIZE, on_batch=None, with_ids=False):
+        """
+        Persist the strategy's shifts with Core bulk INSERTs instead of one ORM
+        object per shift. Falls back to the ORM path when the schedule has no id
+        yet. Returns the number of shifts written.
+        on_batch, if given, is called with each list of inserted row dicts;
+        with_ids adds each row's new "id" (INSERT ... RETURNING).
+
+        Target: a 100k-shift schedule inserts in well under 5 seconds on SQLite.
+        """
+        if schedule.id is None:
+            self.fill_schedule(staff_list, schedule)
+            return len(schedule.shifts)
+
+        started = time.perf_counter()
+        rows = self.strategy.generate_shifts(staff_list, schedule)
+        count = 0
+        for batch in iter_shift_batches(schedule.id, rows, batch_size):
+            insert_shift_batch(batch, with_ids)
+            count += len(batch)
+            if on_batch:
+                on_batch(batch)
+
+        # the relationship collection no longer matches the table
+        db.session.expire(schedule, ["shifts"])
+        record_scheduler_run(self.strategy, time.perf_counter() - started, count)
+        return count
+
+
+def iter_shift_batches(schedule_id, rows, batch_size=SHIFT_INSERT_BATCH_SIZE):
+    # Turn (staff_id, start_time, end_time) tuples into lists of parameter dicts
+    rows = iter(rows)
+    while True:
+        batch = [
+            {
+                "staff_id": staff_id,
+                "schedule_id": schedule_id,
+                "start_time": start_time,
+                "end_time": end_time,
+                "status": ShiftStatus.SCHEDULED,
+            }
+            for staff_id, start_time, end_time in islice(rows, batch_size)
+        ]
+        if not batch:
+            return
+        yield batch
+
+
+def insert_shift_batch(batch, with_ids=False):
+    # executemany of a Core INSERT; rendered as multi-row VALUES where supported
+    if not with_ids:
+        db.session.execute(insert(Shift.__table__), batch)
+        return
+    stmt = insert(Shift.__table__).returning(Shift.__table__.c.id, sort_by_parameter_order=True)
+    for row, shift_id in zip(batch, db.session.scalars(stmt, batch)):
+        row["id"] = shift_id
@@ -6,6 +6,24 @@ class SchedulingStrategy(ABC):
         super().__init__()    
 
     @abstractmethod
+    def generate_shifts(self, staff_list, schedule):
+        """
+        Yield one (staff_id, start_time, end_time) tuple per shift between
+        schedule.start_date and schedule.end_date.
+        Plain tuples are used so the Scheduler can batch them straight into a
+        bulk INSERT without building an ORM Shift per row.
+        """
+        pass
+
     def fill_schedule(self, staff_list, schedule):
-        #return Schedule object in concrete classes
-        pass
\ No newline at end of file
+        # ORM fallback: append a Shift per generated row to the schedule.
+        # Used when the schedule has not been persisted yet (no schedule.id).
+        from App.models.shift import Shift
+
+        for staff_id, start_time, end_time in self.generate_shifts(staff_list, schedule):
+            schedule.shifts.append(Shift(
+                staff_id=staff_id,
+                schedule_id=schedule.id,
+                start_time=start_time,
+                end_time=end_time
+            ))
@@ -0,0 +1,291 @@
+import json, logging, os, socket, threading
+from collections import deque
+from datetime import datetime, time, timedelta
+from sqlalchemy import bindparam, event, inspect, select, union, update
+from sqlalchemy.orm import Session
+from App.database import db
+from App.models import Shift
+from App.models.shift import ShiftStatus
+from App.services.leases import acquire_lease, release_lease
+from App.services.metrics import SHIFT_TRANSITIONS
+from App.services.timer_wheel import TimerWheel
+
+logger = logging.getLogger("App.status")
+
+LEASE_NAME = "shift-status-worker"
+TRANSITION_BATCH_SIZE = 500     # shift ids per UPDATE ... WHERE id IN (...)
+DEFAULT_TICK_SECONDS = 1
+DEFAULT_HORIZON_SECONDS = 3600
+DEFAULT_RELOAD_SECONDS = 30
+DEFAULT_LEASE_SECONDS = 30
+
+active_worker = None    # the StatusWorker running in this process, if any
+
+
+def pending(*statuses):
+    # Inlined so the planner can match the partial ix_shift_pending_* indexes
+    statuses = statuses or (ShiftStatus.SCHEDULED, ShiftStatus.LATE)
+    return (
+        Shift.clock_in.is_(None),
+        Shift.status.in_(bindparam("pending", list(statuses), expanding=True, literal_execute=True)),
+    )
+
+
+def late_due(now):
+    # Started, not ended, still Scheduled; the full pending() predicate keeps the partial index usable
+    return (*pending(), Shift.status != ShiftStatus.LATE, Shift.start_time <= now, Shift.end_time > now)
+
+
+def missed_due(now):
+    return (*pending(), Shift.end_time <= now)
+
+
+def as_datetime(value):
+    # Shift times may be assigned as plain dates before they are reloaded
+    return value if isinstance(value, datetime) else datetime.combine(value, time.min)
+
+
+def transition(status, *criteria):
+    return db.session.execute(
+        update(Shift)
+        .where(*criteria)
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def catch_up_transitions(now):
+    """
+    Apply every transition that is already due: pending shifts that started
+    (Late) or ended (Missed) before now. Two range UPDATEs on the partial
+    indexes; used when a worker takes over and on every reload.
+    """
+    missed = transition(ShiftStatus.MISSED, *missed_due(now))
+    late = transition(ShiftStatus.LATE, *late_due(now))
+    db.session.commit()
+    return {"late": late, "missed": missed}
+
+
+def apply_transitions(late_ids, missed_ids, now):
+    """
+    Move the given shifts to Late / Missed in batched UPDATEs. The time and
+    clock-in conditions are re-checked in SQL, so a shift that was clocked in
+    to or rescheduled after its timer was set is left alone.
+    """
+    counts = {"late": 0, "missed": 0}
+    for start in range(0, len(missed_ids), TRANSITION_BATCH_SIZE):
+        batch = missed_ids[start:start + TRANSITION_BATCH_SIZE]
+        counts["missed"] += transition(ShiftStatus.MISSED, Shift.id.in_(batch), *missed_due(now))
+    for start in range(0, len(late_ids), TRANSITION_BATCH_SIZE):
+        batch = late_ids[start:start + TRANSITION_BATCH_SIZE]
+        counts["late"] += transition(ShiftStatus.LATE, Shift.id.in_(batch), *late_due(now))
+    db.session.commit()
+    return counts
+
+
+def upcoming_query(now, until):
+    """
+    Pending shifts that start or end in (now, until]. One range per partial
+    index, combined with UNION, so neither side reads shifts outside the
+    horizon (an OR of the two ranges scans every pending shift).
+    """
+    columns = (Shift.id, Shift.start_time, Shift.end_time)
+    return union(
+        select(*columns).where(*pending(), Shift.start_time > now, Shift.start_time <= until),
+        select(*columns).where(*pending(), Shift.end_time > now, Shift.end_time <= until),
+    )
+
+
+def upcoming_shifts(now, until):
+    return db.session.execute(upcoming_query(now, until)).all()
+
+
+class StatusWorker():
+    """
+    Moves shifts to Late the moment they start and to Missed the moment they
+    end without a clock-in. Upcoming transitions within `horizon` seconds sit
+    in a TimerWheel; each tick applies the due ones in batched UPDATEs.
+    Across gunicorn workers only the holder of a DB lease does this work.
+    """
+
+    def __init__(self, app, holder=None):
+        config = app.config
+        self.app = app
+        self.tick = float(config.get("STATUS_TICK_SECONDS", DEFAULT_TICK_SECONDS))
+        self.horizon = timedelta(seconds=float(config.get("STATUS_HORIZON_SECONDS", DEFAULT_HORIZON_SECONDS)))
+        self.reload_every = timedelta(seconds=float(config.get("STATUS_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS)))
+        self.lease_seconds = float(config.get("STATUS_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.leader = False
+        self.lease_checked = None
+        self.wheel = None
+        self.deadlines = {}             # (shift_id, status) -> tick it is due
+        self.loaded_until = None
+        self.next_reload = None
+        self.changes = deque()          # (shift_id, start_time, end_time) committed in this process
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def notify(self, shifts):
+        # Called after a commit in this process; picked up on the next tick
+        self.changes.extend(shifts)
+
+    def add_timer(self, shift_id, status, when):
+        key = (shift_id, status)
+        tick = self.wheel.tick_of(when.timestamp())
+        if self.deadlines.get(key) == tick:
+            return
+        self.deadlines[key] = tick
+        self.wheel.schedule(when.timestamp(), (shift_id, status, tick))
+
+    def add_shift(self, shift_id, start_time, end_time, now):
+        # Timers already due fire on the next advance; far-off ones wait for a later reload
+        start_time, end_time = as_datetime(start_time), as_datetime(end_time)
+        if end_time > now and start_time <= self.loaded_until:
+            self.add_timer(shift_id, ShiftStatus.LATE, start_time)
+        if end_time <= self.loaded_until:
+            self.add_timer(shift_id, ShiftStatus.MISSED, end_time)
+
+    def reload(self, now):
+        """
+        Apply anything overdue, then add timers for pending shifts in the
+        horizon. Only timers that are new or moved are added, so this also
+        picks up shifts written by other processes.
+        """
+        if self.wheel is None:
+            self.wheel = TimerWheel(now.timestamp(), self.tick)
+            self.deadlines.clear()
+        caught_up = catch_up_transitions(now)
+        self.record(caught_up, "catch_up")
+        self.loaded_until = now + self.horizon
+        for shift_id, start_time, end_time in upcoming_shifts(now, self.loaded_until):
+            self.add_shift(shift_id, start_time, end_time, now)
+        self.next_reload = now + self.reload_every
+
+    def hold_lease(self, now):
+        # Renew (or try to take) the lease a few times per lease period
+        if self.lease_checked is None or now - self.lease_checked >= timedelta(seconds=self.lease_seconds / 3):
+            self.lease_checked = now
+            leader = acquire_lease(LEASE_NAME, self.holder, self.lease_seconds, now)
+            if leader != self.leader:
+                logger.info(json.dumps({"event": "status_worker_lease", "holder": self.holder, "leader": leader}))
+            if not leader:
+                self.wheel = None       # whoever leads next reloads from the database
+            self.leader = leader
+        return self.leader
+
+    def run_once(self, now=None):
+        """
+        One tick: keep the lease, (re)load when due, schedule changes made in
+        this process and apply the transitions that came due.
+        """
+        now = now or datetime.now()
+        if not self.hold_lease(now):
+            self.changes.clear()
+            return None
+        if self.wheel is None or now >= self.next_reload:
+            self.reload(now)
+        while self.changes:
+            self.add_shift(*self.changes.popleft(), now)
+
+        late, missed = [], []
+        for shift_id, status, tick in self.wheel.advance(now.timestamp()):
+            if self.deadlines.get((shift_id, status)) != tick:
+                continue        # rescheduled since this timer was set
+            del self.deadlines[(shift_id, status)]
+            (late if status == ShiftStatus.LATE else missed).append(shift_id)
+        if not late and not missed:
+            return {"late": 0, "missed": 0}
+        counts = apply_transitions(late, missed, now)
+        self.record(counts, "timer")
+        return counts
+
+    def record(self, counts, source):
+        if counts["late"]:
+            SHIFT_TRANSITIONS.labels(ShiftStatus.LATE.value).inc(counts["late"])
+        if counts["missed"]:
+            SHIFT_TRANSITIONS.labels(ShiftStatus.MISSED.value).inc(counts["missed"])
+        if counts["late"] or counts["missed"]:
+            logger.info(json.dumps({"event": "shift_transitions", "source": source, **counts}))
+
+    def run(self):
+        with self.app.app_context():
+            try:
+                while not self.stopping.is_set():
+                    try:
+                        self.run_once()
+                    except Exception:
+                        logger.exception("Status worker tick failed")
+                        db.session.rollback()
+                        self.wheel = None   # rebuild from the database next tick
+                    finally:
+                        db.session.remove()
+                    self.stopping.wait(self.tick)
+            finally:
+                # also on Ctrl+C, so another worker need not wait out the lease
+                if self.leader:
+                    self.leader = False
+                    release_lease(LEASE_NAME, self.holder)
+                    db.session.remove()
+
+    def start(self):
+        # A thread, or a greenlet under gevent's monkey-patching
+        self.thread = threading.Thread(target=self.run, name="shift-status-worker", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+def start_status_worker(app):
+    global active_worker
+    if not app.config.get("STATUS_WORKER", True) or active_worker is not None:
+        return active_worker
+    active_worker = StatusWorker(app).start()
+    return active_worker
+
+
+# Shifts created or rescheduled in this process reach the worker right after
+# commit; other processes' writes are found by its periodic reload
+
+@event.listens_for(Session, "after_flush")
+def collect_timed_shifts(session, flush_context):
+    if active_worker is None:
+        return
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Shift):
+            continue
+        attrs = inspect(obj).attrs
+        if obj in session.new or attrs.start_time.history.has_changes() or attrs.end_time.history.has_changes():
+            session.info.setdefault("timed_shifts", []).append((obj.id, obj.start_time, obj.end_time))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_shift_inserts(orm_execute_state):
+    # Bulk INSERTs carry no ids; ask the worker for an early reload instead
+    if active_worker is None or not orm_execute_state.is_insert:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name == Shift.__tablename__:
+        orm_execute_state.session.info["reload_timers"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def notify_status_worker(session):
+    shifts = session.info.pop("timed_shifts", None)
+    reload = session.info.pop("reload_timers", False)
+    if active_worker is None:
+        return
+    if shifts:
+        active_worker.notify(shifts)
+    if reload:
+        active_worker.next_reload = datetime.min
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_timed_shifts(session):
+    session.info.pop("timed_shifts", None)
+    session.info.pop("reload_timers", None)
@@ -1,33 +1,27 @@
 from App.services.scheduling_strategy import SchedulingStrategy
-from App.models.shift import Shift
 from datetime import timedelta
 
 class DayNightScheduler(SchedulingStrategy):
-    def fill_schedule(self, staff_list, schedule):
+    def generate_shifts(self, staff_list, schedule):
         """
         Generate shifts between schedule.startDate and schedule.endDate,
-        assign day shifts to staff_list[0], night shifts to staff_list[1],
-        and append them to the schedule.
+        assign day shifts to staff_list[0] and night shifts to staff_list[1].
         """
 
         current_day = schedule.start_date
         end_day = schedule.end_date
+        day_staff_id = staff_list[0].id
+        night_staff_id = staff_list[1].id
 
         while current_day <= end_day:
-            day_shift = Shift(
-                start_time=current_day.replace(hour=8, minute=0),
-                end_time=current_day.replace(hour=16, minute=0),
-                staff_id=staff_list[0].id,
-                schedule_id=schedule.id
+            yield (
+                day_staff_id,
+                current_day.replace(hour=8, minute=0),
+                current_day.replace(hour=16, minute=0)
             )
-            schedule.shifts.append(day_shift)
-
-            night_shift = Shift(
-                start_time=current_day.replace(hour=18, minute=0),
-                end_time=(current_day + timedelta(days=1)).replace(hour=0, minute=0),
-                staff_id=staff_list[1].id,
-                schedule_id=schedule.id
+            yield (
+                night_staff_id,
+                current_day.replace(hour=18, minute=0),
+                (current_day + timedelta(days=1)).replace(hour=0, minute=0)
             )
-            schedule.shifts.append(night_shift)
-
-            current_day += timedelta(days=1)
\ No newline at end of file
+            current_day += timedelta(days=1)
@@ -0,0 +1,74 @@
+import math
+
+
+class TimerWheel():
+    """
+    Hierarchical timing wheel. Level 0 has `slots` buckets of one tick each;
+    every bucket of level n spans a whole turn of level n - 1. Scheduling is
+    O(1) and a timer is moved down at most `levels - 1` times before it fires,
+    so advancing costs O(timers due) rather than O(timers pending).
+    With the defaults (1 s ticks, 64 slots, 4 levels) timers reach ~194 days.
+    """
+
+    def __init__(self, start, tick=1.0, slots=64, levels=4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = math.floor(start / tick)
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.ready = []         # timers already due when scheduled
+        self.overflow = []      # timers beyond the top level, re-placed every top-level turn
+        self.size = 0
+
+    def tick_of(self, deadline):
+        return math.ceil(deadline / self.tick)
+
+    def schedule(self, deadline, item):
+        # Fire `item` from the first advance() at or after `deadline` (seconds, same clock as start)
+        self.place(self.tick_of(deadline), item)
+        self.size += 1
+
+    def place(self, expires, item):
+        delta = expires - self.current
+        if delta <= 0:
+            self.ready.append(item)
+            return
+        for level in range(self.levels):
+            if delta < self.slots ** (level + 1):
+                slot = (expires // self.slots ** level) % self.slots
+                self.wheels[level][slot].append((expires, item))
+                return
+        self.overflow.append((expires, item))
+
+    def cascade(self, level):
+        slot = (self.current // self.slots ** level) % self.slots
+        timers, self.wheels[level][slot] = self.wheels[level][slot], []
+        for expires, item in timers:
+            self.place(expires, item)
+
+    def advance(self, now):
+        """
+        Move the wheel to `now` and return the items that came due, in
+        deadline order (items sharing a tick in scheduling order).
+        """
+        due, self.ready = self.ready, []
+        target = math.floor(now / self.tick)
+        while self.current < target:
+            self.current += 1
+            if self.overflow and self.current % self.slots ** self.levels == 0:
+                overflow, self.overflow = self.overflow, []
+                for expires, item in overflow:
+                    self.place(expires, item)
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % self.slots ** level == 0:
+                    self.cascade(level)
+            slot = self.current % self.slots
+            timers, self.wheels[0][slot] = self.wheels[0][slot], []
+            due.extend(item for expires, item in timers)
+            due.extend(self.ready)
+            self.ready = []
+        self.size -= len(due)
+        return due
+
+    def __len__(self):
+        return self.size
@@ -1,4 +1,5 @@
 import os, tempfile, pytest, logging, unittest, datetime, time
+from sqlalchemy import event, func, select, text, update
 from datetime import datetime, timedelta, date
 from App.main import create_app
 from App.database import db, create_db
@@ -6,6 +7,7 @@ from App.models import User, Schedule, Shift
 from App.services.strategies.even_scheduler import EvenScheduler
 from App.services.strategies.minimum_scheduler import MinimumScheduler
 from App.services.strategies.day_night_scheduler import DayNightScheduler
+from App.services.scheduler import Scheduler
 from App.controllers import (
     create_user,
     update_user, 
@@ -22,8 +24,45 @@ from App.controllers import (
     clock_in, 
     clock_out,
     get_summary, 
-    loginCLI
+    loginCLI,
+    view_shifts_page,
+    view_schedule_page,
+    view_report,
+    rebuild_rollup,
+    ingest_clock_events,
+    read_clock_events,
+    login,
+    get_identities,
+    UserIdentity
 )
+from flask import current_app, request
+from flask_jwt_extended import decode_token
+from App.models import AttendanceRollup
+from App.models.shift import ShiftStatus
+from App.services.report_cache import ReportCache, report_cache
+from werkzeug.security import generate_password_hash
+from App.services.passwords import verify_password
+from App.controllers.bulk_import import import_records, read_records
+from App.controllers.bulk_export import export_records
+from App.services.benchmark import bench_app, run_benchmarks, run_login_benchmark, compare_results
+from App.services.query_stats import instrument_engine
+from prometheus_client import REGISTRY
+from App.services.profiler import profile_store
+from App.controllers.rollup import get_rollup_summary, materialize_status
+from sqlalchemy.exc import SQLAlchemyError
+from App.config import pool_options
+from App.database import gevent_wait_callback, make_psycopg2_cooperative, retry_on_locked, upgrade_db
+from sqlalchemy.exc import OperationalError
+from App.services.replicas import replica_uris, replica_reads
+from unittest import mock
+from App.services import status_worker
+from App.services.status_worker import StatusWorker
+from App.services.leases import acquire_lease
+from App.services.timer_wheel import TimerWheel
+from App.controllers.jobs import submit_job, cancel_job, claim_job, run_job, run_worker, fail_stale_jobs, JobProgress
+from functools import partialmethod
+from App.models import Job
+import json, csv
 
 '''
     Integration Tests
@@ -228,11 +267,81 @@ class StaffIntegrationTests(unittest.TestCase):
         self.assertLess(updated_shift.clock_in, updated_shift.clock_out)
         self.assertEquals(updated_shift.status.value, "Completed")
 
+    def test_clock_in_is_one_conditional_update(self):
+        shift = schedule_shift(self.schedule.id, self.start_time, self.end_time, self.staff1.id, self.admin.id)
+        staff_id, shift_id = self.staff1.id, shift.id
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            clock_in(staff_id, shift_id)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        self.assertEqual(statements[0], "UPDATE")
+        self.assertNotIn("SELECT", statements)
+
+    def test_clock_event_errors(self):
+        shift = schedule_shift(self.schedule.id, self.start_time, self.end_time, self.staff1.id, self.admin.id)
+        with self.assertRaises(ValueError):
+            clock_out(self.staff1.id, shift.id)
+        with self.assertRaises(ValueError):
+            clock_in(self.staff2.id, shift.id)
+        with self.assertRaises(PermissionError):
+            clock_in(self.admin.id, shift.id)
+
+        clock_in(self.staff1.id, shift.id)
+        with self.assertRaises(ValueError):
+            clock_in(self.staff1.id, shift.id)
+        clock_out(self.staff1.id, shift.id)
+        with self.assertRaises(ValueError):
+            clock_out(self.staff1.id, shift.id)
+
+    def test_clock_in_accepts_role_in_any_case(self):
+        staff_id = self.staff1.id
+        shift_id = schedule_shift(self.schedule.id, self.start_time, self.end_time, staff_id, self.admin.id).id
+        db.session.execute(update(User).where(User.id == staff_id).values(role="Staff"))    # e.g. an older import
+        db.session.commit()
+        self.assertEqual(clock_in(staff_id, shift_id).status, ShiftStatus.ONGOING)
+
     def test_permission_restrictions(self):
         with self.assertRaises(PermissionError):
             view_shifts(self.admin.id, self.schedule.id)
         with self.assertRaises(PermissionError):
             view_schedule(self.admin.id, self.schedule.id)
+        with self.assertRaises(PermissionError):
+            view_shifts_page(self.admin.id, self.schedule.id)
+
+    def test_view_schedule_page_walks_all_shifts(self):
+        ids = []
+        for i in range(5):
+            ids.append(schedule_shift(self.schedule.id, self.start_time, self.end_time, self.staff1.id, self.admin.id).id)
+        ids.append(schedule_shift(self.schedule.id, self.start_time - timedelta(days=1), self.end_time, self.staff2.id, self.admin.id).id)
+
+        seen = []
+        cursor = None
+        while True:
+            page = view_schedule_page(self.staff1.id, self.schedule.id, limit=2, cursor=cursor)
+            seen.extend(s["id"] for s in page["shifts"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [ids[-1]] + ids[:-1])
+
+    def test_view_shifts_page_filters_staff(self):
+        schedule_shift(self.schedule.id, self.start_time, self.end_time, self.staff1.id, self.admin.id)
+        schedule_shift(self.schedule.id, self.start_time, self.end_time, self.staff2.id, self.admin.id)
+
+        page = view_shifts_page(self.staff1.id, self.schedule.id, limit=10)
+        self.assertEqual([s["staff_id"] for s in page["shifts"]], [self.staff1.id])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_view_schedule_page_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            view_schedule_page(self.staff1.id, self.schedule.id, cursor="not-a-cursor")
+        with self.assertRaises(ValueError):
+            view_schedule_page(self.staff1.id, self.schedule.id, limit=0)
 
 
 
@@ -509,3 +618,1167 @@ class ReportIntegrationTests(unittest.TestCase):
         summary = get_summary(self.schedule.id)
         day_data = summary["days"][self.start_time.strftime("%Y-%m-%d")]
         assert self.staff.username in day_data["ongoing"]
+
+    def test_get_summary_groups_days_and_staff(self):
+        other = create_user("other", "otherpass", "staff")
+        day1 = datetime(2025, 12, 1, 9)
+        day2 = datetime(2025, 12, 2, 9)
+        schedule_shift(self.schedule.id, day1, day1 + timedelta(hours=4), self.staff.id, self.admin.id)
+        schedule_shift(self.schedule.id, day1 + timedelta(hours=5), day1 + timedelta(hours=8), self.staff.id, self.admin.id)
+        schedule_shift(self.schedule.id, day1, day1 + timedelta(hours=8), other.id, self.admin.id)
+        shift = schedule_shift(self.schedule.id, day2, day2 + timedelta(hours=8), other.id, self.admin.id)
+        shift.clock_in = day2
+        shift.clock_out = day2 + timedelta(hours=8)
+        shift.updateStatus()
+        db.session.commit()
+
+        summary = get_summary(self.schedule.id)
+        self.assertEqual(summary["schedule_id"], self.schedule.id)
+        self.assertEqual(sorted(summary["days"]), ["2025-12-01", "2025-12-02"])
+        self.assertEqual(summary["days"]["2025-12-01"]["scheduled"], ["other", "staff"])
+        self.assertEqual(summary["days"]["2025-12-02"]["scheduled"], ["other"])
+        self.assertEqual(summary["days"]["2025-12-02"]["completed"], ["other"])
+
+    def test_get_summary_invalid_schedule(self):
+        with self.assertRaises(ValueError):
+            get_summary(999)
+
+
+class BulkSchedulerIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.admin = User(username="admin", password="pass", role="admin")
+        self.staff1 = User(username="s1", password="pass", role="staff")
+        self.staff2 = User(username="s2", password="pass", role="staff")
+        db.session.add_all([self.admin, self.staff1, self.staff2])
+        db.session.commit()
+
+        self.schedule = Schedule(
+            start_date=datetime(2025, 12, 1),
+            end_date=datetime(2025, 12, 31),
+            admin_id=self.admin.id
+        )
+        db.session.add(self.schedule)
+        db.session.commit()
+
+    def test_generate_shifts_yields_tuples(self):
+        rows = list(DayNightScheduler().generate_shifts([self.staff1, self.staff2], self.schedule))
+        self.assertEqual(len(rows), 62)
+        self.assertEqual(rows[0], (self.staff1.id, datetime(2025, 12, 1, 8), datetime(2025, 12, 1, 16)))
+        self.assertEqual(rows[1][0], self.staff2.id)
+
+    def test_bulk_fill_schedule_inserts_all_rows(self):
+        count = Scheduler(EvenScheduler()).bulk_fill_schedule([self.staff1, self.staff2], self.schedule, batch_size=7)
+        db.session.commit()
+
+        shifts = Shift.query.filter_by(schedule_id=self.schedule.id).order_by(Shift.start_time).all()
+        self.assertEqual(count, 31)
+        self.assertEqual(len(shifts), 31)
+        self.assertEqual(len(self.schedule.shifts), 31)
+        self.assertTrue(all(s.status.value == "Scheduled" for s in shifts))
+        self.assertEqual([s.staff_id for s in shifts[:2]], [self.staff1.id, self.staff2.id])
+
+    def test_bulk_fill_schedule_falls_back_to_orm(self):
+        schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 3), self.admin.id)
+        count = Scheduler(MinimumScheduler()).bulk_fill_schedule([self.staff1], schedule)
+        db.session.add(schedule)
+        db.session.commit()
+
+        self.assertEqual(count, 3)
+        self.assertEqual(Shift.query.filter_by(schedule_id=schedule.id).count(), 3)
+
+
+class RollupIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        report_cache.clear()
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        self.start = datetime.now() - timedelta(hours=1)
+
+    def test_schedule_shift_marks_day_stale(self):
+        schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff.id, self.admin.id)
+        rollup = AttendanceRollup.query.filter_by(schedule_id=self.schedule.id).one()
+        self.assertEqual(rollup.day, self.start.date())
+        self.assertTrue(rollup.is_stale())
+
+    def test_view_report_matches_get_summary(self):
+        shift = schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff.id, self.admin.id)
+        schedule_week(EvenScheduler(), self.schedule.id, [self.staff.id], self.admin.id)
+        clock_in(self.staff.id, shift.id)
+
+        report = view_report(self.schedule.id, self.admin.id)
+        self.assertEqual(report.summary, get_summary(self.schedule.id))
+        self.assertIn("staff", report.summary["days"][self.start.strftime("%Y-%m-%d")]["ongoing"])
+        self.assertFalse(any(r.is_stale() for r in AttendanceRollup.query.all()))
+
+    def test_clock_out_updates_rollup(self):
+        shift = schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff.id, self.admin.id)
+        clock_in(self.staff.id, shift.id)
+        view_report(self.schedule.id, self.admin.id)
+        clock_out(self.staff.id, shift.id)
+
+        days = view_report(self.schedule.id, self.admin.id).summary["days"]
+        day = days[self.start.strftime("%Y-%m-%d")]
+        self.assertEqual(day["completed"], ["staff"])
+        self.assertEqual(day["ongoing"], [])
+
+    def test_rebuild_rollup(self):
+        schedule_week(MinimumScheduler(), self.schedule.id, [self.staff.id], self.admin.id)
+        AttendanceRollup.query.delete()
+        db.session.commit()
+
+        self.assertEqual(rebuild_rollup(self.schedule.id), 7)
+        report = view_report(self.schedule.id, self.admin.id)
+        self.assertEqual(report.summary, get_summary(self.schedule.id))
+
+
+class ReportCacheUnitTests(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = ReportCache(maxsize=2, ttl=0)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), "a")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 1))
+
+    def test_ttl_expiry(self):
+        cache = ReportCache(maxsize=2, ttl=0.01)
+        cache.set(1, "a")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(1))
+
+
+class ReportCacheIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        report_cache.clear()
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        self.other = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add_all([self.schedule, self.other])
+        db.session.commit()
+        self.start = datetime.now() - timedelta(hours=1)
+        self.shift = schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff.id, self.admin.id)
+
+    def test_repeated_reports_hit_cache(self):
+        first = view_report(self.schedule.id, self.admin.id)
+        hits = report_cache.stats()["hits"]
+        second = view_report(self.schedule.id, self.admin.id)
+        self.assertEqual(first.summary, second.summary)
+        self.assertEqual(report_cache.stats()["hits"], hits + 1)
+
+    def test_shift_mutation_invalidates_only_its_schedule(self):
+        view_report(self.schedule.id, self.admin.id)
+        view_report(self.other.id, self.admin.id)
+
+        clock_in(self.staff.id, self.shift.id)
+        self.assertIsNone(report_cache.get(self.schedule.id))
+        self.assertIsNotNone(report_cache.get(self.other.id))
+
+        day = view_report(self.schedule.id, self.admin.id).summary["days"][self.start.strftime("%Y-%m-%d")]
+        self.assertEqual(day["ongoing"], ["staff"])
+
+    def test_bulk_fill_invalidates_cache(self):
+        view_report(self.other.id, self.admin.id)
+        schedule_week(EvenScheduler(), self.other.id, [self.staff.id], self.admin.id)
+        self.assertIsNone(report_cache.get(self.other.id))
+        self.assertEqual(len(view_report(self.other.id, self.admin.id).summary["days"]), 7)
+
+    def test_materialize_status_invalidates_cache(self):
+        view_report(self.schedule.id, self.admin.id)
+        view_report(self.other.id, self.admin.id)
+        self.assertEqual(materialize_status(), 1)
+        self.assertIsNone(report_cache.get(self.schedule.id))
+        self.assertIsNotNone(report_cache.get(self.other.id))
+
+
+class UpgradeDbTests(unittest.TestCase):
+
+    def test_adds_missing_tables_columns_and_indexes(self):
+        db.session.remove()
+        with db.engine.begin() as conn:
+            conn.execute(db.text("DROP TABLE job"))
+            conn.execute(db.text("ALTER TABLE attendance_rollup DROP COLUMN valid_until"))
+            conn.execute(db.text('ALTER TABLE "user" DROP COLUMN token_version'))
+            conn.execute(db.text("DROP INDEX ix_shift_pending_start"))
+
+        added = upgrade_db()
+        self.assertEqual(sorted(added), ["column attendance_rollup.valid_until", "column user.token_version",
+                                         "index ix_shift_pending_start", "table job"])
+        self.assertEqual(upgrade_db(), [])
+        create_user("bob", "bobpass", "staff")
+        self.assertEqual(get_user_by_username("bob").token_version, 0)
+
+
+class QueryPlanTests(unittest.TestCase):
+
+    def query_plan(self, query):
+        return self.statement_plan(query.statement)
+
+    def statement_plan(self, statement):
+        sql = str(statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        rows = db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql)).all()
+        return " | ".join(row[-1] for row in rows)
+
+    def test_view_shifts_uses_staff_schedule_index(self):
+        plan = self.query_plan(Shift.query.filter_by(staff_id=1, schedule_id=1).order_by(Shift.start_time))
+        self.assertIn("ix_shift_staff_schedule_start", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_view_schedule_uses_schedule_index(self):
+        plan = self.query_plan(Shift.query.filter_by(schedule_id=1).order_by(Shift.start_time))
+        self.assertIn("ix_shift_schedule_start", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_users_by_role_uses_role_index(self):
+        plan = self.query_plan(User.query.filter_by(role="staff"))
+        self.assertIn("ix_user_role", plan)
+
+    def test_status_worker_uses_pending_indexes(self):
+        now = datetime(2025, 12, 1, 9)
+        late = self.statement_plan(update(Shift).where(*status_worker.late_due(now)).values(status=ShiftStatus.LATE))
+        self.assertIn("SEARCH shift USING INDEX ix_shift_pending_", late)
+        missed = self.statement_plan(update(Shift).where(*status_worker.missed_due(now)).values(status=ShiftStatus.MISSED))
+        self.assertIn("SEARCH shift USING INDEX ix_shift_pending_end", missed)
+
+        upcoming = self.statement_plan(status_worker.upcoming_query(now, now + timedelta(hours=1)))
+        self.assertIn("SEARCH shift USING INDEX ix_shift_pending_start (start_time>? AND start_time<?)", upcoming)
+        self.assertIn("SEARCH shift USING INDEX ix_shift_pending_end (end_time>? AND end_time<?)", upcoming)
+        self.assertNotIn("SCAN shift", upcoming)
+
+
+class ClockEventIngestionTests(unittest.TestCase):
+
+    def setUp(self):
+        report_cache.clear()
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff1 = create_user("staff1", "staffpass", "staff")
+        self.staff2 = create_user("staff2", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        self.start = datetime(2025, 12, 1, 9)
+        self.shift1 = schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff1.id, self.admin.id)
+        self.shift2 = schedule_shift(self.schedule.id, self.start, self.start + timedelta(hours=8), self.staff2.id, self.admin.id)
+
+    def test_ingest_applies_events_in_timestamp_order(self):
+        events = read_clock_events([
+            '{"shift_id": %d, "staff_id": %d, "action": "clock_out", "timestamp": "2025-12-01T17:05:00"}' % (self.shift1.id, self.staff1.id),
+            '',
+            '{"shift_id": %d, "staff_id": %d, "action": "clock_in", "timestamp": "2025-12-01T08:55:00"}' % (self.shift1.id, self.staff1.id),
+            '{"shift_id": %d, "staff_id": %d, "action": "clock_in", "timestamp": "2025-12-01T09:10:00"}' % (self.shift2.id, self.staff2.id),
+        ])
+        results = ingest_clock_events(events, self.admin.id)
+
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual([r["status"] for r in results], ["Completed", "Ongoing", "Ongoing"])
+        shift1 = db.session.get(Shift, self.shift1.id)
+        self.assertEqual(shift1.clock_in, datetime(2025, 12, 1, 8, 55))
+        self.assertEqual(shift1.clock_out, datetime(2025, 12, 1, 17, 5))
+        self.assertEqual(db.session.get(Shift, self.shift2.id).status.value, "Ongoing")
+        day = view_report(self.schedule.id, self.admin.id).summary["days"]["2025-12-01"]
+        self.assertEqual((day["completed"], day["ongoing"]), (["staff1"], ["staff2"]))
+
+    def test_ingest_reports_per_event_errors(self):
+        results = ingest_clock_events([
+            {"shift_id": self.shift1.id, "staff_id": self.staff1.id, "action": "clock_in"},
+            {"shift_id": self.shift1.id, "staff_id": self.staff1.id, "action": "clock_in"},
+            {"shift_id": self.shift2.id, "staff_id": self.staff1.id, "action": "clock_in"},
+            {"shift_id": self.shift2.id, "staff_id": self.staff2.id, "action": "clock_out"},
+            {"shift_id": self.shift2.id, "action": "clock_in"},
+            {"shift_id": self.shift2.id, "staff_id": self.staff2.id, "action": "nap"},
+        ], self.admin.id)
+
+        self.assertEqual([r["ok"] for r in results], [True, False, False, False, False, False])
+        self.assertIn("already clocked in", results[1]["error"])
+        self.assertEqual(results[2]["error"], "Invalid shift for staff")
+        self.assertEqual(results[3]["error"], "Cannot clock out before clocking in")
+        self.assertEqual(results[4]["error"], '"staff_id" is required')
+        self.assertIsNone(db.session.get(Shift, self.shift2.id).clock_in)
+
+    def test_ingest_accepts_role_in_any_case(self):
+        staff_id, shift_id = self.staff1.id, self.shift1.id
+        db.session.execute(update(User).where(User.id == staff_id).values(role="Staff"))
+        db.session.commit()
+        results = ingest_clock_events([{"shift_id": shift_id, "staff_id": staff_id, "action": "clock_in"}], self.admin.id)
+        self.assertTrue(results[0]["ok"], results[0].get("error"))
+
+    def test_ingest_requires_admin(self):
+        with self.assertRaises(PermissionError):
+            ingest_clock_events([], self.staff1.id)
+        with self.assertRaises(ValueError):
+            read_clock_events(["{not json"])
+
+
+class IdentityCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        self.shift = schedule_shift(self.schedule.id, datetime(2025, 12, 1, 9), datetime(2025, 12, 1, 17), self.staff.id, self.admin.id)
+        self.client = current_app.test_client()
+
+    def count_user_queries(self, send):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM user" in statement:
+                statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = send()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return response, len(statements)
+
+    def test_request_loads_user_once(self):
+        token = login("staff", "staffpass")
+        headers = {"Authorization": f"Bearer {token}"}
+        response, queries = self.count_user_queries(
+            lambda: self.client.get(f"/staff/shifts/{self.schedule.id}", headers=headers))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(queries, 1)
+
+    def test_role_claims_skip_user_queries(self):
+        token = login("admin", "adminpass")
+        claims = decode_token(token)
+        self.assertEqual((claims["role"], claims["username"], claims["ver"]), ("admin", "admin", 0))
+
+        headers = {"Authorization": f"Bearer {token}"}
+        self.client.get(f"/viewReport/{self.schedule.id}", headers=headers)     # learns the token version
+        response, queries = self.count_user_queries(
+            lambda: self.client.get(f"/viewReport/{self.schedule.id}", headers=headers))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_stale_claims_fall_back_to_database(self):
+        token = login("staff", "staffpass")
+        update_user(self.staff.id, "renamed")
+        response = self.client.get("/api/identify", headers={"Authorization": f"Bearer {token}"})
+        self.assertIn("renamed", response.json["message"])
+
+    def test_get_identities_batches_lookup(self):
+        identities = get_identities([self.admin.id, self.staff.id, 999])
+        self.assertEqual(identities[self.staff.id], UserIdentity(self.staff.id, "staff", "staff"))
+        self.assertNotIn(999, identities)
+
+
+def load_wsgi():
+    # wsgi builds its app at import; give it its own database and leave this module's context alone
+    import App.main
+    real_create_app = App.main.create_app
+    def cli_app():
+        return real_create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'},
+                               profile="cli", push_context=False)
+    with mock.patch.object(App.main, "create_app", cli_app):
+        import wsgi
+    return wsgi
+
+
+class CliSessionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.wsgi = load_wsgi()
+        self.wsgi.cli_logins.clear()
+        self.ctx = self.wsgi.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        create_user("admin", "adminpass", "admin")
+        create_user("staff", "staffpass", "staff")
+        self.runner = self.wsgi.app.test_cli_runner()
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp())      # active_token.txt
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_session_runs_script(self):
+        script = "\n".join([
+            "# comment",
+            "auth login staff staffpass",
+            "user list",
+            "no-such-command",
+            "user create amy amypass staff",
+            "session",
+        ])
+        result = self.runner.invoke(self.wsgi.app.cli, ["session"], input=script)
+        self.assertIn("Login successful", result.output)
+        self.assertIn("amy created!", result.output)
+        self.assertIn("Already in a session", result.output)
+        self.assertRegex(result.output, r"Ran 4 command\(s\) in [\d.]+s \(2 failed\)")
+
+    def test_require_login_reuses_decoded_token(self):
+        self.runner.invoke(self.wsgi.app.cli, ["auth", "login", "staff", "staffpass"])
+        with mock.patch("flask_jwt_extended.decode_token", wraps=decode_token) as decode:
+            first = self.wsgi.require_staff_login()
+            second = self.wsgi.require_staff_login()
+        self.assertEqual(decode.call_count, 1)
+        self.assertIs(first, second)
+
+    def test_role_mismatch_reports_role(self):
+        self.runner.invoke(self.wsgi.app.cli, ["auth", "login", "staff", "staffpass"])
+        with self.assertRaisesRegex(PermissionError, "Only an admin"):
+            self.wsgi.require_admin_login()
+
+    def test_permission_error_drops_cached_login(self):
+        self.runner.invoke(self.wsgi.app.cli, ["auth", "login", "staff", "staffpass"])
+        self.wsgi.require_staff_login()
+        self.assertEqual(len(self.wsgi.cli_logins), 1)
+        result = self.runner.invoke(self.wsgi.app.cli, ["session"], input="schedule list\n")
+        self.assertIn("Only an admin", result.output)
+        self.assertIn("(1 failed)", result.output)
+        self.assertEqual(self.wsgi.cli_logins, {})
+
+
+
+class PasswordHashingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.user = create_user("bob", "bobpass", "staff")
+
+    def test_login_upgrades_old_hash(self):
+        self.user.password = generate_password_hash("bobpass", "pbkdf2:sha256:1000")
+        db.session.commit()
+        assert self.user.password_needs_rehash()
+
+        assert login("bob", "bobpass") is not None
+        assert not self.user.password_needs_rehash()
+        assert self.user.password.startswith("scrypt:")
+        assert login("bob", "bobpass") is not None
+
+    def test_wrong_password_keeps_hash(self):
+        old_hash = generate_password_hash("bobpass", "pbkdf2:sha256:1000")
+        self.user.password = old_hash
+        db.session.commit()
+        assert login("bob", "wrongpass") is None
+        assert self.user.password == old_hash
+
+    def test_hashing_does_not_block_greenlets(self):
+        import gevent
+        password_hash = self.user.password
+        ticks = []
+        def ticker():
+            while True:
+                ticks.append(1)
+                gevent.sleep(0.001)
+        background = gevent.spawn(ticker)
+        try:
+            check = gevent.spawn(verify_password, password_hash, "bobpass")
+            check.join()
+        finally:
+            background.kill()
+        assert check.value is True
+        # the hub kept scheduling the ticker while the hash ran on a native thread
+        assert len(ticks) > 1
+
+
+class AppProfileTests(unittest.TestCase):
+
+    def test_cli_profile_skips_web_extensions(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}, profile="cli")
+        assert app.extensions["startup"]["profile"] == "cli"
+        assert "admin" not in app.blueprints
+        assert "staff_views" not in app.blueprints
+        assert app.test_client().get("/healthcheck").status_code == 200
+
+    def test_web_profile_registers_views(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}, profile="web")
+        assert "staff_views" in app.blueprints
+        assert "total" in app.extensions["startup"]["timings"]
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            create_app({'TESTING': True}, profile="kiosk")
+
+
+class BulkImportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+
+    def test_import_users_from_csv(self):
+        lines = ["username,password,role", "amy,amypass,staff", "ben,benpass,admin", "cat,catpass,ceo", "staff,dup,staff", "amy,again,staff"]
+        result = import_records("users", read_records(lines, "csv"), self.admin.id, chunk_size=2)
+        assert result["done"]
+        self.assertEqual((result["processed"], result["imported"], result["rejected"]), (5, 2, 3))
+        self.assertEqual([e["row"] for e in result["errors"]], [2, 3, 4])
+        amy = get_user_by_username("amy")
+        assert amy.role == "staff" and amy.check_password("amypass")
+        assert login("ben", "benpass") is not None
+
+    def test_import_schedules_and_shifts_from_ndjson(self):
+        result = import_records("schedules", read_records(['{"start_date": "2025-12-01", "end_date": "2025-12-07"}'], "ndjson"), self.admin.id)
+        schedule_id = result["schedule_ids"][0]
+        lines = [
+            json.dumps({"schedule_id": schedule_id, "username": "staff", "start_time": "2025-12-01T09:00", "end_time": "2025-12-01T17:00"}),
+            json.dumps({"schedule_id": schedule_id, "staff_id": self.staff.id, "start_time": "2025-12-02T09:00", "end_time": "2025-12-02T17:00"}),
+            json.dumps({"schedule_id": schedule_id, "staff_id": self.admin.id, "start_time": "2025-12-02T09:00", "end_time": "2025-12-02T17:00"}),
+            json.dumps({"schedule_id": schedule_id, "staff_id": self.staff.id, "start_time": "2025-12-02T17:00", "end_time": "2025-12-02T09:00"}),
+            "not json",
+        ]
+        result = import_records("shifts", read_records(lines, "ndjson"), self.admin.id)
+        self.assertEqual((result["imported"], result["rejected"]), (2, 3))
+        assert db.session.query(Shift).filter_by(schedule_id=schedule_id).count() == 2
+        self.assertEqual(sorted(get_rollup_summary(schedule_id)["days"]), ["2025-12-01", "2025-12-02"])
+
+    def test_import_resumes_after_failure(self):
+        lines = ["username,password"] + [f"user{i},pass{i}" for i in range(5)]
+        def failing_records():
+            for i, record in enumerate(read_records(lines, "csv")):
+                if i == 4:
+                    raise SQLAlchemyError("connection lost")
+                yield record
+        result = import_records("users", failing_records(), self.admin.id, chunk_size=2)
+        assert not result["done"]
+        self.assertEqual((result["imported"], result["resume_from"]), (4, 4))
+
+        result = import_records("users", read_records(lines, "csv"), self.admin.id, start=result["resume_from"], chunk_size=2)
+        assert result["done"]
+        self.assertEqual((result["processed"], result["imported"]), (1, 1))
+        assert get_user_by_username("user4") is not None
+
+    def test_import_rejects_bad_chunk_size_and_start(self):
+        lines = ["username,password", "amy,amypass"]
+        with self.assertRaisesRegex(ValueError, "chunk_size"):
+            import_records("users", read_records(lines, "csv"), self.admin.id, chunk_size=0)
+        with self.assertRaisesRegex(ValueError, "start"):
+            import_records("users", read_records(lines, "csv"), self.admin.id, start=-1)
+
+    def test_import_shifts_accepts_role_in_any_case(self):
+        db.session.execute(update(User).where(User.id == self.staff.id).values(role="Staff"))
+        db.session.commit()
+        result = import_records("schedules", read_records(['{"start_date": "2025-12-01", "end_date": "2025-12-07"}'], "ndjson"), self.admin.id)
+        line = json.dumps({"schedule_id": result["schedule_ids"][0], "username": "staff", "start_time": "2025-12-01T09:00", "end_time": "2025-12-01T17:00"})
+        result = import_records("shifts", read_records([line], "ndjson"), self.admin.id)
+        self.assertEqual((result["imported"], result["rejected"]), (1, 0))
+
+    def test_import_requires_admin(self):
+        with self.assertRaises(PermissionError):
+            import_records("users", [], self.staff.id)
+        with self.assertRaises(ValueError):
+            import_records("rooms", [], self.admin.id)
+
+
+class BulkExportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        for day in (1, 2):
+            schedule_shift(self.schedule.id, datetime(2025, 12, day, 9), datetime(2025, 12, day, 17), self.staff.id, self.admin.id)
+
+    def test_export_shifts_csv(self):
+        lines = "".join(export_records("shifts", self.admin.id, "csv", self.schedule.id)).splitlines()
+        self.assertEqual(lines[0], "id,schedule_id,staff_id,username,start_time,end_time,clock_in,clock_out,status")
+        assert len(lines) == 3
+        assert lines[1].endswith(",staff,2025-12-01T09:00:00,2025-12-01T17:00:00,,,Missed")    # past and never clocked in
+
+    def test_export_round_trips_through_import(self):
+        text = "".join(export_records("schedules", self.admin.id, "ndjson"))
+        records = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(records, [{"id": self.schedule.id, "start_date": "2025-12-01T00:00:00", "end_date": "2025-12-07T00:00:00", "admin_id": self.admin.id}])
+        result = import_records("schedules", read_records(text.splitlines(), "ndjson"), self.admin.id)
+        assert result["imported"] == 1
+
+    def test_export_attendance(self):
+        rows = list(csv.DictReader("".join(export_records("attendance", self.admin.id, "csv", self.schedule.id)).splitlines()))
+        self.assertEqual([(r["day"], r["status"], r["username"]) for r in rows], [("2025-12-01", "Missed", "staff"), ("2025-12-02", "Missed", "staff")])
+        with self.assertRaises(ValueError):
+            export_records("attendance", self.admin.id, "csv")
+
+    def test_export_checks_before_streaming(self):
+        with self.assertRaises(PermissionError):
+            export_records("shifts", self.staff.id)
+        with self.assertRaises(ValueError):
+            export_records("shifts", self.admin.id, "xml")
+
+    def test_export_endpoint_streams(self):
+        client = current_app.test_client()
+        headers = {"Authorization": f"Bearer {login('admin', 'adminpass')}"}
+        response = client.get("/exportData/shifts?format=ndjson", headers=headers)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == "application/x-ndjson"
+        assert len(response.get_data(as_text=True).splitlines()) == 2
+        staff_headers = {"Authorization": f"Bearer {login('staff', 'staffpass')}"}
+        assert client.get("/exportData/shifts", headers=staff_headers).status_code == 403
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_hot_paths_stay_within_query_budgets(self):
+        budgets = {"fill_schedule.even": 3, "get_summary": 2, "report.rollup": 3, "report.cached": 1,
+                   "view_schedule_page": 2, "clock_in": 2}
+        results = run_benchmarks(staff_count=5, days=7, repeat=2, cases=list(budgets))
+        self.assertEqual(results["dataset"], {"staff": 5, "days": 7, "shifts": 35})
+        for result in results["results"]:
+            assert result["queries"] <= budgets[result["name"]], result
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": [{"name": "get_summary", "median_ms": 10.0, "queries": 2},
+                                {"name": "clock_in", "median_ms": 2.0, "queries": 2}]}
+        current = {"results": [{"name": "get_summary", "median_ms": 11.0, "queries": 2},
+                               {"name": "clock_in", "median_ms": 2.0, "queries": 3},
+                               {"name": "login", "median_ms": 100.0, "queries": 1}]}
+        comparisons = {c["name"]: c for c in compare_results(baseline, current, threshold=0.2)}
+        assert not comparisons["get_summary"]["regression"]
+        assert comparisons["clock_in"]["regression"]
+        assert "login" not in comparisons
+
+    def test_unknown_case(self):
+        with self.assertRaises(ValueError):
+            run_benchmarks(cases=["teleport"])
+
+    def test_concurrent_login_benchmark(self):
+        for threads in (0, 2):
+            result = run_login_benchmark(logins=4, threads=threads, method="pbkdf2:sha256:1000")
+            self.assertEqual((result["mode"], result["succeeded"]), ("offloaded" if threads else "inline", 4))
+            assert result["logins_per_second"] > 0
+
+    def test_bench_app_leaves_the_calling_app_alone(self):
+        app = current_app._get_current_object()
+        create_user("outer", "outerpass", "staff")
+        with bench_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}):
+            assert current_app._get_current_object() is not app
+            db.create_all()
+            run_benchmarks(staff_count=2, days=1, repeat=1, cases=["report.cached"])
+            self.assertEqual(report_cache.stats()["size"], 1)
+        assert current_app._get_current_object() is app
+        self.assertEqual([user.username for user in get_all_users()], ["outer"])
+        self.assertEqual(report_cache.stats()["size"], 0)
+
+
+class QueryStatsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                               'QUERY_STATS_HEADERS': True, 'REPEATED_QUERY_THRESHOLD': 3, 'SLOW_QUERY_MS': 10000})
+        create_db()
+        for name in ("amy", "ben", "cat", "dan"):
+            create_user(name, "pass", "staff")
+
+        @self.app.route("/test/users")
+        def one_query_per_user():
+            # deliberate N+1: one SELECT per id
+            return {"users": [db.session.get(User, user_id).username for user_id in range(1, 5)]}
+
+    def test_headers_and_repeated_statements(self):
+        db.session.expunge_all()
+        with self.assertLogs("App.queries", level="INFO") as logs:
+            response = self.app.test_client().get("/test/users")
+        assert response.status_code == 200
+        self.assertEqual(response.headers["X-Query-Count"], "4")
+        self.assertEqual(response.headers["X-Query-Repeated"], "4")
+        assert float(response.headers["X-Query-Time-Ms"]) >= 0
+
+        fields = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((fields["path"], fields["queries"], fields["repeated"][0]["count"]), ("/test/users", 4, 4))
+        assert logs.records[-1].levelname == "WARNING"
+
+    def test_slow_queries_are_logged(self):
+        for engine in db.engines.values():
+            instrument_engine(engine, slow_query_ms=0)
+        with self.assertLogs("App.queries", level="WARNING") as logs:
+            get_user_by_username("amy")
+        fields = json.loads(logs.records[0].getMessage())
+        assert fields["event"] == "slow_query" and "FROM user" in fields["sql"]
+
+    def test_failed_statement_does_not_skew_timings(self):
+        for engine in db.engines.values():
+            instrument_engine(engine, slow_query_ms=0)
+        with self.assertRaises(SQLAlchemyError):
+            db.session.execute(text("SELECT * FROM no_such_table"))
+        db.session.rollback()
+        time.sleep(0.2)
+        with self.assertLogs("App.queries", level="WARNING") as logs:
+            get_user_by_username("amy")
+        fields = json.loads(logs.records[0].getMessage())
+        assert "FROM user" in fields["sql"]
+        self.assertLess(fields["ms"], 100)
+
+    def test_quiet_requests_log_at_debug(self):
+        @self.app.route("/test/one-user")
+        def one_user():
+            return {"user": db.session.get(User, 1).username}
+        with self.assertLogs("App.queries", level="DEBUG") as logs:
+            self.app.test_client().get("/test/one-user")
+        fields = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((fields["event"], logs.records[-1].levelname), ("request_queries", "DEBUG"))
+
+
+class MetricsTests(unittest.TestCase):
+
+    def test_metrics_endpoint(self):
+        client = current_app.test_client()
+        create_user("staff", "staffpass", "staff")
+        client.post("/api/login", json={"username": "staff", "password": "staffpass"})
+        client.get("/healthcheck")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain")
+        body = response.get_data(as_text=True)
+        assert 'rostrapp_request_duration_seconds_count{blueprint="app",endpoint="healthcheck",method="GET",status="200"}' in body
+        assert 'blueprint="auth_views"' in body
+        assert "rostrapp_requests_in_flight 1.0" in body     # the scrape itself
+        assert "rostrapp_db_pool_checkouts_total" in body
+
+    def test_scheduler_runs_are_counted(self):
+        admin = create_user("admin", "adminpass", "admin")
+        staff = create_user("staff", "staffpass", "staff")
+        schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), admin.id)
+        db.session.add(schedule)
+        db.session.commit()
+        before = REGISTRY.get_sample_value("rostrapp_shifts_generated_total", {"strategy": "EvenScheduler"}) or 0
+        schedule_week(EvenScheduler(), schedule.id, [staff.id], admin.id)
+        after = REGISTRY.get_sample_value("rostrapp_shifts_generated_total", {"strategy": "EvenScheduler"})
+        self.assertEqual(after - before, 7)
+        assert REGISTRY.get_sample_value("rostrapp_scheduler_run_seconds_count", {"strategy": "EvenScheduler"}) >= 1
+
+
+class ProfilerTests(unittest.TestCase):
+
+    def make_client(self, rate):
+        profile_store.clear()
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                          'PROFILE_SAMPLE_RATE': rate, 'PROFILE_INTERVAL_MS': 1})
+        create_db()
+        create_user("admin", "adminpass", "admin")
+        create_user("staff", "staffpass", "staff")
+
+        @app.route("/test/busy")
+        def busy_endpoint():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            return {"ok": True}
+        return app.test_client()
+
+    def test_one_in_n_requests_are_sampled(self):
+        client = self.make_client(rate=2)
+        for _ in range(4):
+            client.get("/test/busy")
+        self.assertEqual(profile_store.summary()["busy_endpoint"]["requests"], 2)
+        stacks = profile_store.collapsed("busy_endpoint")
+        assert stacks.startswith("busy_endpoint;full_dispatch_request")
+        assert "busy_endpoint (App/tests/test_integration_app.py" in stacks
+
+    def test_profile_header_needs_admin(self):
+        client = self.make_client(rate=0)
+        staff_headers = {"Authorization": f"Bearer {login('staff', 'staffpass')}"}
+        admin_headers = {"Authorization": f"Bearer {login('admin', 'adminpass')}"}
+        client.get("/test/busy")
+        client.get("/test/busy", headers={**staff_headers, "X-Profile": "1"})
+        client.get("/test/busy", headers={**admin_headers, "X-Profile": "1"})
+        self.assertEqual(profile_store.summary()["busy_endpoint"]["requests"], 1)
+
+        response = client.get("/profile?endpoint=busy_endpoint", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).startswith("busy_endpoint;")
+        assert client.get("/profile", headers=staff_headers).status_code == 403
+        assert client.delete("/profile", headers=admin_headers).get_json()["busy_endpoint"]["requests"] == 1
+        assert profile_store.collapsed() == ""
+
+
+class DatabasePoolTests(unittest.TestCase):
+
+    def test_pool_options_for_postgres(self):
+        options = pool_options({"SQLALCHEMY_DATABASE_URI": "postgresql://db/rostr", "DB_POOL_SIZE": "5"})
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 20)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(pool_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///test.db"}), {})
+
+    def test_wait_callback_polls_until_ready(self):
+        from psycopg2 import extensions
+        class FakeConnection():
+            states = [extensions.POLL_WRITE, extensions.POLL_READ, extensions.POLL_OK]
+            def __init__(self):
+                self.read, self.write = os.pipe()
+            def poll(self):
+                return self.states.pop(0)
+            def fileno(self):
+                return self.write if self.states and self.states[0] == extensions.POLL_READ else self.read
+        conn = FakeConnection()
+        os.write(conn.write, b"x")
+        gevent_wait_callback(conn, timeout=1)
+        self.assertEqual(conn.states, [])
+
+    def test_cooperative_only_for_postgres_under_gevent(self):
+        from types import SimpleNamespace
+        sqlite_app = SimpleNamespace(config={"SQLALCHEMY_DATABASE_URI": "sqlite:///test.db"})
+        postgres_app = SimpleNamespace(config={"SQLALCHEMY_DATABASE_URI": "postgresql://db/rostr"})
+        self.assertFalse(make_psycopg2_cooperative(sqlite_app))
+        self.assertFalse(make_psycopg2_cooperative(postgres_app))   # tests run without monkey-patching
+
+
+class ReplicaRoutingTests(unittest.TestCase):
+
+    def make_client(self, max_lag=5):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                          'REPLICA_DATABASE_URIS': ['sqlite:///:memory:'], 'REPLICA_MAX_LAG_SECONDS': max_lag})
+        create_db()
+        replica = app.extensions["replicas"].engines["replica1"]
+        db.metadata.create_all(replica)
+        create_user("primary", "primarypass", "staff")
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert().values(username="replica", password="x", role="staff"))
+
+        @app.route("/test/usernames", methods=["GET", "POST"])
+        @replica_reads
+        def usernames():
+            if request.method == "POST":
+                create_user("written", "writtenpass", "staff")
+            return {"usernames": db.session.scalars(db.select(User.username).order_by(User.username)).all()}
+        return app.test_client()
+
+    def test_reads_go_to_replica(self):
+        client = self.make_client()
+        self.assertEqual(client.get("/test/usernames").get_json()["usernames"], ["replica"])
+        self.assertEqual(db.session.scalars(db.select(User.username)).all(), ["primary"])
+
+    def test_read_after_write_uses_primary(self):
+        client = self.make_client()
+        self.assertEqual(client.post("/test/usernames").get_json()["usernames"], ["primary", "written"])
+        self.assertEqual(client.get("/test/usernames").get_json()["usernames"], ["replica"])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        client = self.make_client(max_lag=5)
+        with mock.patch("App.services.replicas.measure_lag", return_value=60):
+            self.assertEqual(client.get("/test/usernames").get_json()["usernames"], ["primary"])
+
+    def test_replica_uris_from_string(self):
+        self.assertEqual(replica_uris("postgresql://r1/db, postgresql://r2/db"),
+                         {"replica1": "postgresql://r1/db", "replica2": "postgresql://r2/db"})
+
+
+class SQLiteProfileTests(unittest.TestCase):
+
+    def pragmas(self, overrides, *names):
+        app = create_app({'TESTING': True, **overrides}, profile="cli", push_context=False)
+        with app.app_context():
+            values = [db.session.execute(db.text(f"PRAGMA {name}")).scalar() for name in names]
+            db.session.remove()
+            db.engine.dispose()
+        return values
+
+    def test_pragmas_on_every_connection(self):
+        values = self.pragmas({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'SQLITE_TUNING': True},
+                              "synchronous", "cache_size", "busy_timeout")
+        self.assertEqual(values, [1, -65536, 5000])     # NORMAL
+
+    def test_tuning_is_off_by_default(self):
+        path = os.path.join(tempfile.mkdtemp(), "plain.db")
+        values = self.pragmas({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'}, "journal_mode", "synchronous", "busy_timeout")
+        self.assertEqual(values, ["delete", 2, 5000])   # FULL
+
+    def test_file_database_uses_wal(self):
+        path = os.path.join(tempfile.mkdtemp(), "wal.db")
+        values = self.pragmas({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SQLITE_TUNING': True}, "journal_mode")
+        self.assertEqual(values, ["wal"])
+
+    def test_retry_on_locked(self):
+        calls = []
+        @retry_on_locked
+        def commit(error):
+            calls.append(error)
+            if len(calls) == 1:
+                raise OperationalError("UPDATE shift", {}, Exception(error))
+            return "done"
+
+        self.assertEqual(commit("database is locked"), "done")
+        self.assertEqual(len(calls), 2)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            commit("no such table: shift")
+        self.assertEqual(len(calls), 1)
+
+
+class ShiftStatusTests(unittest.TestCase):
+
+    def setUp(self):
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.now = datetime(2025, 12, 1, 12)
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        hours = [(-10, -6), (-2, 2), (2, 6), (-3, 1)]   # ended, running, upcoming, running but clocked in
+        self.shifts = [
+            schedule_shift(self.schedule.id, self.now + timedelta(hours=start), self.now + timedelta(hours=end), self.staff.id, self.admin.id)
+            for start, end in hours
+        ]
+        self.shifts[3].clock_in = self.now - timedelta(hours=3)
+        db.session.commit()
+
+    def test_sql_matches_python(self):
+        expected = [ShiftStatus.MISSED, ShiftStatus.LATE, ShiftStatus.SCHEDULED, ShiftStatus.ONGOING]
+        self.assertEqual([shift.status_at(self.now) for shift in self.shifts], expected)
+        rows = db.session.execute(
+            select(Shift.id, Shift.status_expression(self.now)).order_by(Shift.id)
+        ).all()
+        self.assertEqual([status for _, status in rows], expected)
+        late = db.session.scalars(select(Shift.id).where(Shift.status_expression(self.now) == ShiftStatus.LATE)).all()
+        self.assertEqual(late, [self.shifts[1].id])
+
+    def test_untouched_shifts_are_not_scheduled_forever(self):
+        # all four are in the past now
+        self.assertEqual(self.shifts[0].get_json()["status"], "Missed")
+        day = get_summary(self.schedule.id)["days"]["2025-12-01"]
+        self.assertEqual(day["missed"], ["staff"])
+        self.assertEqual(day["ongoing"], ["staff"])
+        self.assertEqual(day["late"], [])
+
+    def test_rollup_day_expires_at_next_status_change(self):
+        summary = get_summary(self.schedule.id)
+        rebuild_rollup(self.schedule.id)
+        rollup = db.session.scalar(select(AttendanceRollup).where(AttendanceRollup.schedule_id == self.schedule.id))
+        self.assertIsNone(rollup.valid_until)       # every shift has already started and ended
+        self.assertEqual(get_rollup_summary(self.schedule.id), summary)
+
+        upcoming = datetime.now() + timedelta(hours=1)
+        schedule_shift(self.schedule.id, upcoming, upcoming + timedelta(hours=4), self.staff.id, self.admin.id)
+        get_rollup_summary(self.schedule.id)
+        rollup = db.session.scalar(select(AttendanceRollup).where(AttendanceRollup.day == upcoming.date()))
+        self.assertEqual(rollup.valid_until, upcoming)
+        assert not rollup.is_stale()
+        assert rollup.is_stale(upcoming)
+
+    def test_materialize_status(self):
+        self.assertEqual(materialize_status(self.schedule.id, self.now), 3)     # the upcoming shift is already Scheduled
+        statuses = db.session.scalars(select(Shift.status).order_by(Shift.id)).all()
+        self.assertEqual(statuses, [ShiftStatus.MISSED, ShiftStatus.LATE, ShiftStatus.SCHEDULED, ShiftStatus.ONGOING])
+        self.assertEqual(materialize_status(self.schedule.id, self.now), 0)
+
+
+class StatusWorkerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.admin = create_user("admin", "adminpass", "admin")
+        self.staff = create_user("staff", "staffpass", "staff")
+        self.schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin.id)
+        db.session.add(self.schedule)
+        db.session.commit()
+        self.now = datetime.now().replace(microsecond=0)
+        self.worker = StatusWorker(current_app, holder="test")
+
+    def tearDown(self):
+        status_worker.active_worker = None
+
+    def add_shift(self, start, end):
+        return schedule_shift(self.schedule.id, self.now + timedelta(seconds=start), self.now + timedelta(seconds=end),
+                              self.staff.id, self.admin.id).id
+
+    def status(self, shift_id):
+        return db.session.scalar(select(Shift.status).where(Shift.id == shift_id))
+
+    def test_timer_wheel_fires_on_time_across_levels(self):
+        wheel = TimerWheel(start=100, tick=1, slots=4, levels=2)
+        for deadline in (99, 101.5, 103, 110, 150):
+            wheel.schedule(deadline, deadline)
+        self.assertEqual(wheel.advance(100), [99])
+        self.assertEqual(wheel.advance(101), [])
+        self.assertEqual(wheel.advance(105), [101.5, 103])
+        self.assertEqual(wheel.advance(149), [110])
+        self.assertEqual(wheel.advance(150), [150])
+        self.assertEqual(len(wheel), 0)
+
+    def test_one_leader_until_lease_lapses(self):
+        assert acquire_lease("job", "a", 30, self.now)
+        assert not acquire_lease("job", "b", 30, self.now)
+        assert acquire_lease("job", "a", 30, self.now + timedelta(seconds=20))
+        assert not acquire_lease("job", "b", 30, self.now + timedelta(seconds=40))
+        assert acquire_lease("job", "b", 30, self.now + timedelta(seconds=60))
+
+    def test_lease_released_when_interrupted(self):
+        def interrupt(now=None):
+            self.worker.leader = acquire_lease(status_worker.LEASE_NAME, "test", 30)
+            raise KeyboardInterrupt()
+        with mock.patch.object(self.worker, "run_once", side_effect=interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.worker.run()
+        assert acquire_lease(status_worker.LEASE_NAME, "other", 30)
+
+    def test_transitions_at_start_and_end(self):
+        upcoming = self.add_shift(10, 20)
+        started = self.add_shift(-10, 3600)
+        ended = self.add_shift(-20, -10)
+        clocked_in = self.add_shift(5, 3600)
+
+        self.assertEqual(self.worker.run_once(self.now), {"late": 0, "missed": 0})
+        self.assertEqual([self.status(started), self.status(ended)], [ShiftStatus.LATE, ShiftStatus.MISSED])   # caught up
+        self.assertEqual(self.status(upcoming), ShiftStatus.SCHEDULED)
+
+        clock_in(self.staff.id, clocked_in)
+        self.assertEqual(self.worker.run_once(self.now + timedelta(seconds=10)), {"late": 1, "missed": 0})
+        self.assertEqual(self.status(upcoming), ShiftStatus.LATE)
+        self.assertEqual(self.status(clocked_in), ShiftStatus.ONGOING)
+        self.assertEqual(self.worker.run_once(self.now + timedelta(seconds=20)), {"late": 0, "missed": 1})
+        self.assertEqual(self.status(upcoming), ShiftStatus.MISSED)
+
+    def test_shifts_written_in_process_are_scheduled_without_reload(self):
+        status_worker.active_worker = self.worker
+        self.worker.run_once(self.now)
+        moved = self.add_shift(100, 200)
+        shift = db.session.get(Shift, moved)
+        shift.start_time = self.now + timedelta(seconds=5)
+        db.session.commit()
+
+        with mock.patch("App.services.status_worker.upcoming_shifts") as reload:
+            self.assertEqual(self.worker.run_once(self.now + timedelta(seconds=5)), {"late": 1, "missed": 0})
+            reload.assert_not_called()
+        self.assertEqual(self.status(moved), ShiftStatus.LATE)
+        self.assertEqual(self.worker.run_once(self.now + timedelta(seconds=100)), {"late": 0, "missed": 0})    # old timer dropped
+
+
+class JobQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+        create_db()
+        create_user("admin", "adminpass", "admin")
+        create_user("staff", "staffpass", "staff")
+        self.admin_id = get_user_by_username("admin").id
+        schedule = Schedule(datetime(2025, 12, 1), datetime(2025, 12, 7), self.admin_id)
+        db.session.add(schedule)
+        db.session.commit()
+        self.schedule_id = schedule.id
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {login('admin', 'adminpass')}"}
+
+    def shift_count(self):
+        return db.session.scalar(select(func.count(Shift.id)).where(Shift.schedule_id == self.schedule_id))
+
+    def test_schedule_week_job_runs_in_worker(self):
+        response = self.client.post("/scheduleWeek?async=1", headers=self.headers,
+                                    json={"strategy": "even_scheduler", "scheduleId": self.schedule_id})
+        assert response.status_code == 202
+        job_url = response.headers["Location"]
+        self.assertEqual(job_url, response.get_json()["status_url"])
+        self.assertEqual(self.client.get(job_url, headers=self.headers).get_json()["status"], "queued")
+        assert self.client.get(f"{job_url}/result", headers=self.headers).status_code == 409
+        self.assertEqual(self.shift_count(), 0)
+
+        self.assertEqual(run_worker(self.app, burst=True), 1)
+        job = self.client.get(job_url, headers=self.headers).get_json()
+        self.assertEqual(job["status"], "succeeded")
+        result = self.client.get(f"{job_url}/result", headers=self.headers).get_json()
+        self.assertEqual(result["shifts"], self.shift_count())
+        self.assertEqual(job["progress"], result["shifts"])
+        assert result["shifts"] > 0
+
+    def test_report_job(self):
+        response = self.client.get(f"/viewReport/{self.schedule_id}?async=1", headers=self.headers)
+        assert response.status_code == 202
+        run_worker(self.app, burst=True)
+        result = self.client.get(f"/jobs/{response.get_json()['job_id']}/result", headers=self.headers)
+        assert result.status_code == 200
+        self.assertEqual(result.get_json()["summary"]["schedule_id"], self.schedule_id)
+
+    def test_submit_checks_request(self):
+        response = self.client.post("/scheduleWeek?async=1", headers=self.headers,
+                                    json={"strategy": "bogus", "scheduleId": self.schedule_id})
+        assert response.status_code == 400
+        staff_headers = {"Authorization": f"Bearer {login('staff', 'staffpass')}"}
+        assert self.client.get(f"/viewReport/{self.schedule_id}?async=1", headers=staff_headers).status_code == 403
+        assert self.client.get("/jobs/999", headers=self.headers).status_code == 404
+        with self.assertRaises(ValueError):
+            submit_job("report", {"schedule_id": 999}, self.admin_id)
+        self.assertEqual(db.session.scalar(select(func.count(Job.id))), 0)
+
+    def test_cancel_queued_job(self):
+        job_id = submit_job("report", {"schedule_id": self.schedule_id}, self.admin_id).id
+        response = self.client.delete(f"/jobs/{job_id}", headers=self.headers)
+        self.assertEqual(response.get_json()["status"], "cancelled")
+        assert self.client.delete(f"/jobs/{job_id}", headers=self.headers).status_code == 409
+        self.assertEqual(run_worker(self.app, burst=True), 0)
+
+    def test_cancelled_running_job_removes_only_its_shifts(self):
+        staff_id = get_user_by_username("staff").id
+        kept = [schedule_shift(self.schedule_id, datetime(2025, 12, 1, 9), datetime(2025, 12, 1, 17), staff_id, self.admin_id).id]
+        job_id = submit_job("schedule_week", {"strategy": "even_scheduler", "schedule_id": self.schedule_id}, self.admin_id).id
+        job = claim_job("test")
+        self.assertEqual(job.status, "running")
+
+        update = JobProgress.update
+        def interleave(progress, done, total=None, checkpoint=None):
+            # another admin schedules a shift between the job's batches, then the job is cancelled
+            kept.append(schedule_shift(self.schedule_id, datetime(2025, 12, 2, 9), datetime(2025, 12, 2, 17), staff_id, self.admin_id).id)
+            if len(kept) == 3:
+                self.assertEqual(cancel_job(job_id, self.admin_id).cancel_requested, True)
+            return update(progress, done, total, checkpoint)
+        with mock.patch.object(Scheduler, "bulk_fill_schedule", partialmethod(Scheduler.bulk_fill_schedule, batch_size=2)), \
+                mock.patch.object(JobProgress, "update", interleave):
+            job = run_job(job)
+        self.assertEqual(job.status, "cancelled")
+        self.assertEqual(job.checkpoint["shift_ids"], [[2, 3], [5, 6]])
+        self.assertEqual(db.session.scalars(select(Shift.id).where(Shift.schedule_id == self.schedule_id)).all(), kept)
+
+    def test_stale_sweep_while_job_runs(self):
+        submit_job("schedule_week", {"strategy": "even_scheduler", "schedule_id": self.schedule_id}, self.admin_id)
+        job = claim_job("slow")
+        sweeps = []
+        update = JobProgress.update
+        def heartbeat_lapses(progress, done, total=None, checkpoint=None):
+            update(progress, done, total, checkpoint)
+            if not sweeps:
+                # another worker's sweep, run as if the heartbeat had lapsed; a second sweep finds nothing
+                later = datetime.now() + timedelta(hours=1)
+                sweeps.extend([fail_stale_jobs(300, later), fail_stale_jobs(300, later)])
+        with mock.patch.object(Scheduler, "bulk_fill_schedule", partialmethod(Scheduler.bulk_fill_schedule, batch_size=2)), \
+                mock.patch.object(JobProgress, "update", heartbeat_lapses):
+            job = run_job(job)
+
+        self.assertEqual(sweeps, [1, 0])
+        self.assertEqual((job.status, job.error), ("failed", "Worker stopped responding"))     # not overwritten
+        self.assertEqual(self.shift_count(), 0)
+
+    def test_worker_survives_poll_errors(self):
+        self.app.config["JOB_POLL_SECONDS"] = 0
+        job_id = submit_job("report", {"schedule_id": self.schedule_id}, self.admin_id).id
+        errors = [OperationalError("UPDATE job", {}, Exception("database is locked"))]
+        def locked_once(worker):
+            if errors:
+                raise errors.pop()
+            return claim_job(worker)
+        with mock.patch("App.controllers.jobs.claim_job", side_effect=locked_once):
+            self.assertEqual(run_worker(self.app, burst=True), 1)
+        self.assertEqual(db.session.get(Job, job_id, populate_existing=True).status, "succeeded")
+
+    def test_failed_and_stale_jobs(self):
+        job_id = submit_job("schedule_week", {"strategy": "even_scheduler", "schedule_id": self.schedule_id}, self.admin_id).id
+        update = JobProgress.update
+        def commit_then_fail(progress, done, total=None, checkpoint=None):
+            update(progress, done, total, checkpoint)
+            raise RuntimeError("boom")
+        with mock.patch.object(JobProgress, "update", commit_then_fail):
+            job = run_job(claim_job("test"))
+        self.assertEqual((job.status, job.error), ("failed", "RuntimeError: boom"))
+        self.assertEqual(self.shift_count(), 0)
+
+        job_id = submit_job("report", {"schedule_id": self.schedule_id}, self.admin_id).id
+        claim_job("lost", now=datetime.now() - timedelta(hours=1))
+        self.assertEqual(fail_stale_jobs(300), 1)
+        job = db.session.get(Job, job_id, populate_existing=True)
+        self.assertEqual((job.status, job.error), ("failed", "Worker stopped responding"))
@@ -1,13 +1,12 @@
 # app/views/staff_views.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
 from datetime import datetime, timedelta, date
-from App.controllers import staff, auth, admin
+import io
+from App.controllers import staff, auth, admin, kiosk, bulk_import, bulk_export, jobs
 from App.controllers.user import get_all_users_by_role
-from App.services.strategies.day_night_scheduler import DayNightScheduler
-from App.services.strategies.even_scheduler import EvenScheduler
-from App.services.strategies.minimum_scheduler import MinimumScheduler
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
+from App.services.replicas import replica_reads
 
 admin_view = Blueprint('admin_views', __name__, template_folder='../templates')
 
@@ -25,6 +24,17 @@ admin_view = Blueprint('admin_views', __name__, template_folder='../templates')
 # 1. Create Schedule
 # 2. Get Schedule Report
 
+def wants_async():
+    # ?async=1 or "Prefer: respond-async" queues the work as a background job
+    return (request.args.get("async", "").lower() in ("1", "true", "yes")
+            or "respond-async" in request.headers.get("Prefer", ""))
+
+def job_accepted(job):
+    status_url = url_for("admin_views.viewJob", job_id=job.id)
+    response = jsonify({"job_id": job.id, "status": job.status, "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
 @admin_view.route('/createSchedule', methods=['POST'])
 @jwt_required()
 def createSchedule():
@@ -75,16 +85,13 @@ def scheduleWeek():
         '''
        
         strategy_string = data["strategy"] # will throw KeyError for bad request body
-        if strategy_string == "day_night_scheduler":
-            strategy = DayNightScheduler()
-        elif strategy_string == "even_scheduler":
-            strategy = EvenScheduler()
-        elif strategy_string == "minimum_scheduler":
-            strategy = MinimumScheduler()
-        else:
-            raise ValueError("Invalid strategy type")
-        
+        strategy = jobs.get_strategy(strategy_string)
         schedule_id = int(data["scheduleId"])
+
+        if wants_async():
+            job = jobs.submit_job("schedule_week", {"strategy": strategy_string, "schedule_id": schedule_id}, admin_id)
+            return job_accepted(job)
+
         schedule = admin.schedule_week(strategy, schedule_id, staff_list, admin_id)  
         return jsonify({
         "shifts": [
@@ -148,9 +155,12 @@ def scheduleShift():
 
 @admin_view.route('/viewReport/<int:schedule_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def viewReport(schedule_id):
     try:
         admin_id = get_jwt_identity()
+        if wants_async():
+            return job_accepted(jobs.submit_job("report", {"schedule_id": schedule_id}, admin_id))
         report = admin.view_report(schedule_id, admin_id) 
         return report.get_json(), 200
     except (PermissionError, ValueError) as e:
@@ -158,4 +168,176 @@ def viewReport(schedule_id):
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
     except KeyError as e:
-        return jsonify({"error": f'"{e}" is required to view report'}), 400
\ No newline at end of file
+        return jsonify({"error": f'"{e}" is required to view report'}), 400
+
+@admin_view.route('/clockEvents', methods=['POST'])
+@jwt_required()
+def clockEvents():
+    try:
+        admin_id = get_jwt_identity()
+
+        '''
+        body of request is either NDJSON (Content-Type: application/x-ndjson),
+        one event per line, or JSON in the format
+        {
+            "events": [
+                {"shift_id": 1, "staff_id": 2, "action": "clock_in", "timestamp": "2025-12-04T08:58:00"}
+            ]
+        }
+        '''
+
+        if request.mimetype == "application/x-ndjson":
+            events = kiosk.read_clock_events(request.get_data(as_text=True).splitlines())
+        else:
+            events = request.get_json()["events"]
+        results = kiosk.ingest_clock_events(events, admin_id)
+        return jsonify({
+            "applied": sum(1 for r in results if r["ok"]),
+            "rejected": sum(1 for r in results if not r["ok"]),
+            "results": results
+        }), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except (KeyError, TypeError):
+        return jsonify({"error": '"events" is required for clock event ingestion'}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/reportCache', methods=['GET'])
+@jwt_required()
+def reportCacheStats():
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(admin.view_report_cache_stats(admin_id)), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+
+@admin_view.route('/importData/<kind>', methods=['POST'])
+@jwt_required()
+def importData(kind):
+    try:
+        admin_id = get_jwt_identity()
+
+        '''
+        body of request is CSV with a header row (Content-Type: text/csv) or
+        NDJSON (Content-Type: application/x-ndjson), one row per line.
+        kind is users, schedules or shifts; ?start=<row> resumes a failed import
+        '''
+
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+        start = request.args.get("start", 0, type=int)
+        # read the body as a stream so large files are never buffered whole
+        lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        result = bulk_import.import_records(kind, bulk_import.read_records(lines, fmt), admin_id, start)
+        return jsonify(result), 200 if result["done"] else 500
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@admin_view.route('/exportData/<kind>', methods=['GET'])
+@jwt_required()
+def exportData(kind):
+    try:
+        admin_id = get_jwt_identity()
+
+        '''
+        kind is schedules, shifts or attendance; query parameters:
+        ?format=csv|ndjson (default csv)&schedule_id=<id> (required for attendance)
+        '''
+
+        fmt = request.args.get("format", "csv")
+        schedule_id = request.args.get("schedule_id", type=int)
+        chunks = bulk_export.export_records(kind, admin_id, fmt, schedule_id)
+        # sent with chunked transfer encoding as rows are read
+        return Response(
+            stream_with_context(chunks),
+            mimetype=bulk_export.EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+        )
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@admin_view.route('/profile', methods=['GET'])
+@jwt_required()
+def viewProfile():
+    try:
+        admin_id = get_jwt_identity()
+
+        '''
+        collapsed stacks ("endpoint;frame;...;frame count" per line) of the
+        requests this worker has sampled; ?endpoint=<name> filters to one.
+        Feed to flamegraph.pl or load into speedscope.
+        '''
+
+        stacks = admin.view_profiles(admin_id, request.args.get("endpoint"))
+        return Response(stacks, mimetype="text/plain")
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+
+@admin_view.route('/profile', methods=['DELETE'])
+@jwt_required()
+def clearProfile():
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(admin.clear_profiles(admin_id)), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+
+@admin_view.route('/jobs', methods=['GET'])
+@jwt_required()
+def listJobs():
+    try:
+        admin_id = get_jwt_identity()
+        limit = request.args.get("limit", 20, type=int)
+        return jsonify([job.get_json() for job in jobs.list_jobs(admin_id, limit)]), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+
+@admin_view.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def viewJob(job_id):
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(jobs.get_job(job_id, admin_id).get_json()), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+@admin_view.route('/jobs/<int:job_id>/result', methods=['GET'])
+@jwt_required()
+def viewJobResult(job_id):
+    try:
+        admin_id = get_jwt_identity()
+
+        '''
+        the job's result once it has succeeded; 409 with the job while it is
+        queued, running, failed or cancelled
+        '''
+
+        job = jobs.get_job(job_id, admin_id)
+        if job.status != "succeeded":
+            return jsonify({"error": f"Job is {job.status}", "job": job.get_json()}), 409
+        return jsonify(job.result), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+@admin_view.route('/jobs/<int:job_id>', methods=['DELETE'])
+@jwt_required()
+def cancelJob(job_id):
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(jobs.cancel_job(job_id, admin_id).get_json()), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
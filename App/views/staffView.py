@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from App.controllers import staff
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
+from App.services.replicas import replica_reads
 
 staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 
@@ -10,38 +11,48 @@ staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 
 staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 
-# Staff view schedule roster route (calls view_schedule)
-# GET /staff/schedule/<schedule_id>
+# Staff view schedule roster route (calls view_schedule_page)
+# GET /staff/schedule/<schedule_id>?limit=100&cursor=<next_cursor>
 
 @staff_views.route('/staff/schedule/<int:schedule_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def view_schedule(schedule_id):
     try:
         staff_id = int(get_jwt_identity())
-        roster = staff.viewSchedule(staff_id, schedule_id)
-        if(schedule_id is None or len(roster) == 0):
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit", staff.DEFAULT_PAGE_SIZE, type=int)
+        page = staff.view_schedule_page(staff_id, schedule_id, limit, cursor)
+        if not cursor and len(page["shifts"]) == 0:
             return jsonify({"error": "Schedule not found"}), 404
-        return jsonify(roster), 200
+        return jsonify(page), 200
     except PermissionError as e:
         return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
 
-# Staff view shifts for a schedule route (calls view_shifts)
-# GET /staff/shifts/<schedule_id>
+# Staff view shifts for a schedule route (calls view_shifts_page)
+# GET /staff/shifts/<schedule_id>?limit=100&cursor=<next_cursor>
 
 @staff_views.route('/staff/shifts/<int:schedule_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def view_shifts(schedule_id):
     try:
         staff_id = int(get_jwt_identity())
-        shifts = staff.viewShifts(staff_id, schedule_id)
-        if(schedule_id is None or len(shifts) == 0):
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit", staff.DEFAULT_PAGE_SIZE, type=int)
+        page = staff.view_shifts_page(staff_id, schedule_id, limit, cursor)
+        if not cursor and len(page["shifts"]) == 0:
             return jsonify({"error": "No shifts found for this schedule"}), 404
-        return jsonify(shifts), 200
+        return jsonify(page), 200
     except PermissionError as e:
         return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
@@ -51,6 +62,7 @@ def view_shifts(schedule_id):
 
 @staff_views.route('/staff/shift/<int:shift_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def view_shift(shift_id):
     try:
         shift = staff.Shift.get_shift(shift_id)
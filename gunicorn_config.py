@@ -1,5 +1,6 @@
 # gunicorn_config.py
 import multiprocessing
+import os, shutil, tempfile
 
 # The socket to bind.
 # "0.0.0.0" to bind to all interfaces. 8000 is the port number.
@@ -16,4 +17,24 @@ loglevel = 'info'
 
 # Where to log to
 accesslog = '-'  # '-' means log to stdout
-errorlog = '-'  # '-' means log to stderr
\ No newline at end of file
+errorlog = '-'  # '-' means log to stderr
+
+# Prometheus metrics are shared between workers through files in this
+# directory; it must be set before the app (and prometheus_client) is imported
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rostrapp-metrics")
+)
+
+def on_starting(server):
+    # samples from a previous run would be added to this one's
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def post_worker_init(worker):
+    # every worker runs a status worker; a DB lease lets only one of them act
+    from App.services.status_worker import start_status_worker
+    start_status_worker(worker.wsgi)
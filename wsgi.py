@@ -1,40 +1,74 @@
-import click, pytest, sys, os
+import click, sys, os, subprocess
 from flask.cli import with_appcontext, AppGroup
 from datetime import datetime
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from datetime import datetime
 
-from App.database import db, get_migrate
-from App.models import User
+# controllers are imported inside the commands that use them, so `--help`
+# and unrelated commands do not pay for loading every one
+from App.database import db, get_migrate, create_indexes, upgrade_db
 from App.main import create_app 
-from App.controllers import (
-    create_user, get_all_users_json, get_all_users, initialize, clock_in, clock_out, view_report, login,loginCLI
-)
-from App.controllers.admin import schedule_shift
-from App.models.schedule import Schedule
-from App.models.shift import Shift
-from App.controllers.user import get_all_users_by_role
-from App.services.strategies.even_scheduler import EvenScheduler
-from App.services.strategies.minimum_scheduler import MinimumScheduler
-from App.services.strategies.day_night_scheduler import DayNightScheduler
-from App.controllers.schedule import generate_report
 
 
 app = create_app()
-migrate = get_migrate(app)
+if app.extensions["startup"]["profile"] == "web":
+    # `flask db` needs the web profile; the CLI profile skips alembic
+    migrate = get_migrate(app)
 
 
 @app.cli.command("init", help="Creates and initializes the database")
 def init():
+    from App.controllers.initialize import initialize
     initialize()
     print('database intialized')
 
+@app.cli.command("create-indexes", help="Adds missing indexes to an existing database")
+def create_indexes_command():
+    for name in create_indexes():
+        print(f"✅ {name}")
+
+@app.cli.command("upgrade-db", help="Adds missing tables, columns and indexes to an existing database")
+def upgrade_db_command():
+    try:
+        added = upgrade_db()
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    for name in added:
+        print(f"✅ {name}")
+    if not added:
+        print("Database is up to date")
+
+@app.cli.command("startup-report", help="Shows where CLI start-up time goes")
+@click.option("--top", type=int, default=15, help="Slowest imports to list")
+def startup_report_command(top):
+    startup = app.extensions["startup"]
+    print(f"Profile: {startup['profile']}")
+    for name, seconds in startup["timings"].items():
+        print(f"  create_app {name}: {seconds * 1000:.0f} ms")
+
+    # a fresh interpreter gives the cold import cost of this module
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import wsgi"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and "." not in name.strip():
+            imports.append((int(cumulative), name.strip()))
+    imports.sort(reverse=True)
+    print("Top-level imports (cumulative):")
+    for micros, name in imports[:top]:
+        print(f"  {name}: {micros / 1000:.0f} ms")
+
 auth_cli = AppGroup('auth', help='Authentication commands')
 
 @auth_cli.command("login", help="Login and get JWT token")
 @click.argument("username")
 @click.argument("password")
 def login_command(username, password):
+    from App.controllers.auth import loginCLI
     result = loginCLI(username, password)
     if result["message"] == "Login successful":
         token = result["token"]
@@ -63,17 +97,68 @@ user_cli = AppGroup('user', help='User object commands')
 @click.argument("password", default="robpass")
 @click.argument("role", default="staff")
 def create_user_command(username, password, role):
+    from App.controllers.user import create_user
     create_user(username, password, role)
     print(f'{username} created!')
 
 @user_cli.command("list", help="Lists users in the database")
 @click.argument("format", default="string")
 def list_user_command(format):
+    from App.controllers.user import get_all_users, get_all_users_json
     if format == 'string':
         print(get_all_users())
     else:
         print(get_all_users_json())
 
+def run_import(kind, data_file, start, chunk_size):
+    from App.controllers.bulk_import import read_records, import_records
+    admin = require_admin_login()
+    fmt = "csv" if data_file.name.lower().endswith(".csv") else "ndjson"
+    def progress(result):
+        print(f"… {result['processed']} row(s), {result['imported']} imported", end="\r")
+    try:
+        result = import_records(kind, read_records(data_file, fmt), admin.id, start, chunk_size, on_chunk=progress)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+
+    print(f"✅ Imported {result['imported']} of {result['processed']} {kind} row(s) "
+          f"in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+    for error in result["errors"]:
+        print(f"- Row {error['row']}: {error['error']}")
+    if result["rejected"] > len(result["errors"]):
+        print(f"- ... and {result['rejected'] - len(result['errors'])} more rejected row(s)")
+    if not result["done"]:
+        print(f"❌ Import stopped: {result['failure']}")
+        print(f"➡️ Resume with: --start {result['resume_from']}")
+
+def import_options(command):
+    command = click.argument("data_file", type=click.File("r", encoding="utf-8"))(command)
+    command = click.option("--start", type=click.IntRange(min=0), default=0, help="Row to resume from (resume_from of a failed import)")(command)
+    command = click.option("--chunk-size", type=click.IntRange(min=1), default=1000, help="Rows per commit")(command)
+    return command
+
+def run_export(kind, output, fmt, schedule_id=None):
+    from App.controllers.bulk_export import export_records
+    admin = require_admin_login()
+    try:
+        chunks = export_records(kind, admin.id, fmt, schedule_id)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    for chunk in chunks:
+        output.write(chunk)
+
+def export_options(command):
+    command = click.option("--output", "-o", type=click.File("w", encoding="utf-8"), default="-", help="File to write (default stdout)")(command)
+    command = click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv")(command)
+    return command
+
+@user_cli.command("import", help="Admin imports users from a .csv or .ndjson file")
+@import_options
+def import_users_command(data_file, start, chunk_size):
+    run_import("users", data_file, start, chunk_size)
+
 app.cli.add_command(user_cli)
 
 
@@ -89,9 +174,12 @@ def schedule_shift_command(mode, args):
     from App.models.schedule import Schedule
     from App.models.shift import Shift
     from App.controllers.user import get_all_users_by_role
+    from App.controllers.admin import schedule_shift
     from App.services.strategies.even_scheduler import EvenScheduler
     from App.services.strategies.minimum_scheduler import MinimumScheduler
     from App.services.strategies.day_night_scheduler import DayNightScheduler
+    from App.services.scheduler import Scheduler
+    from App.controllers.rollup import mark_rollup_days
 
     admin = require_admin_login()
 
@@ -141,10 +229,17 @@ def schedule_shift_command(mode, args):
             print("❌ Invalid strategy. Use: even, minimum, daynight")
             return
 
-        # fill schedule using strategy
-        strategy.fill_schedule(staff_list, schedule)
-
+        # persist the schedule first so the strategy can bulk insert its shifts
         db.session.add(schedule)
+        db.session.flush()
+
+        # fill schedule using strategy
+        filled_days = set()
+        Scheduler(strategy).bulk_fill_schedule(
+            staff_list, schedule,
+            on_batch=lambda batch: filled_days.update(row["start_time"] for row in batch)
+        )
+        mark_rollup_days(schedule.id, filled_days)
         db.session.commit()
 
         print(f"✅ Schedule created with {strategy_name} strategy by {admin.username}")
@@ -152,17 +247,26 @@ def schedule_shift_command(mode, args):
 
 @shift_cli.command("roster", help="Staff views combined roster")
 @click.argument("schedule_id", type=int)
-def roster_command(schedule_id):
+@click.option("--limit", type=int, default=100, help="Shifts per page")
+@click.option("--cursor", default=None, help="next_cursor from the previous page")
+def roster_command(schedule_id, limit, cursor):
     staff = require_staff_login()
-    from App.controllers import view_schedule
+    from App.controllers import view_schedule_page
 
-    roster = view_schedule(staff.id, schedule_id)
+    try:
+        page = view_schedule_page(staff.id, schedule_id, limit, cursor)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
     print(f"📋 Roster for Schedule {schedule_id}:")
-    print(roster)
+    print(page["shifts"])
+    if page["next_cursor"]:
+        print(f"➡️ More shifts: --cursor {page['next_cursor']}")
 
 @shift_cli.command("clockin", help="Staff clocks in")
 @click.argument("shift_id", type=int)
 def clockin_command(shift_id):
+    from App.controllers.staff import clock_in
     staff = require_staff_login()
     try:
         shift = clock_in(staff.id, shift_id)
@@ -177,6 +281,7 @@ def clockin_command(shift_id):
 @shift_cli.command("clockout", help="Staff clocks out")
 @click.argument("shift_id", type=int)
 def clockout_command(shift_id):
+    from App.controllers.staff import clock_out
     staff = require_staff_login()
     try:
         shift = clock_out(staff.id, shift_id)
@@ -184,9 +289,44 @@ def clockout_command(shift_id):
     except Exception as e:
         print(f"⚠️ Unexpected error: {e}")
 
+@shift_cli.command("ingest", help="Admin applies a file of NDJSON clock events")
+@click.argument("events_file", type=click.File("r"))
+def ingest_command(events_file):
+    from App.controllers.kiosk import read_clock_events, ingest_clock_events
+    admin = require_admin_login()
+    try:
+        results = ingest_clock_events(read_clock_events(events_file), admin.id)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+
+    applied = sum(1 for r in results if r["ok"])
+    print(f"✅ Applied {applied} of {len(results)} clock event(s)")
+    for r in results:
+        if not r["ok"]:
+            print(f"- Event {r['index']}: {r['error']}")
+
+@shift_cli.command("import", help="Admin imports shifts from a .csv or .ndjson file")
+@import_options
+def import_shifts_command(data_file, start, chunk_size):
+    run_import("shifts", data_file, start, chunk_size)
+
+@shift_cli.command("export", help="Admin exports shifts as CSV or NDJSON")
+@click.option("--schedule", "schedule_id", type=int, default=None, help="Only this schedule's shifts")
+@export_options
+def export_shifts_command(schedule_id, output, fmt):
+    run_export("shifts", output, fmt, schedule_id)
+
+@shift_cli.command("export-report", help="Admin exports a schedule's attendance (day, status, staff)")
+@click.argument("schedule_id", type=int)
+@export_options
+def export_report_command(schedule_id, output, fmt):
+    run_export("attendance", output, fmt, schedule_id)
+
 @shift_cli.command("report", help="Admin views shift report summary")
 @click.argument("schedule_id", type=int)
 def report_command(schedule_id):
+    from App.controllers.schedule import generate_report
     admin = require_admin_login()
     try:
         report = generate_report(schedule_id, admin.id)
@@ -196,13 +336,52 @@ def report_command(schedule_id):
         print(f"❌ Report could not be viewed: {e}")
 
 
+@shift_cli.command("rebuild-report", help="Admin rebuilds report rollups from shifts")
+@click.argument("schedule_id", type=int, required=False)
+def rebuild_report_command(schedule_id):
+    from App.controllers.rollup import rebuild_rollup
+    admin = require_admin_login()
+    days = rebuild_rollup(schedule_id)
+    target = f"schedule {schedule_id}" if schedule_id else "all schedules"
+    print(f"✅ Rebuilt {days} report day(s) for {target}")
+
+
+@shift_cli.command("materialize-status", help="Admin writes each shift's current status to the status column")
+@click.argument("schedule_id", type=int, required=False)
+def materialize_status_command(schedule_id):
+    from App.controllers.rollup import materialize_status
+    admin = require_admin_login()
+    changed = materialize_status(schedule_id)
+    target = f"schedule {schedule_id}" if schedule_id else "all schedules"
+    print(f"✅ Updated the status of {changed} shift(s) in {target}")
+
+
+@shift_cli.command("status-worker", help="Runs the late/missed status worker in the foreground")
+def status_worker_command():
+    from App.services.status_worker import StatusWorker
+    worker = StatusWorker(app)
+    print(f"Status worker {worker.holder} running (Ctrl+C to stop)")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stopping.set()
+        print("Stopped")
+
+
 @shift_cli.command("view", help="Staff views their shifts for a schedule")
 @click.argument("schedule_id", type=int)
-def view_shifts_command(schedule_id):
+@click.option("--limit", type=int, default=100, help="Shifts per page")
+@click.option("--cursor", default=None, help="next_cursor from the previous page")
+def view_shifts_command(schedule_id, limit, cursor):
     staff = require_staff_login()
-    from App.controllers import view_shifts
+    from App.controllers import view_shifts_page
 
-    shifts = view_shifts(staff.id, schedule_id)
+    try:
+        page = view_shifts_page(staff.id, schedule_id, limit, cursor)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    shifts = page["shifts"]
     print(f"📋 Shifts for {staff.username} in Schedule {schedule_id}:")
     
     if not shifts:
@@ -216,6 +395,9 @@ def view_shifts_command(schedule_id):
         print(f"  Clock In: {s['clock_in']}")
         print(f"  Clock Out: {s['clock_out']}")
         print("")
+
+    if page["next_cursor"]:
+        print(f"➡️ More shifts: --cursor {page['next_cursor']}")
         
 
 app.cli.add_command(shift_cli)
@@ -230,7 +412,7 @@ schedule_cli = AppGroup('schedule', help='Schedule management commands')
 @click.argument("staff_id", type=int)
 def assign_shift_command(shift_id, staff_id):
     from App.models.shift import Shift
-    from App.controllers import get_user
+    from App.controllers import get_user, mark_shift_rollup
     admin = require_admin_login()
     
     shift = Shift.get_shift(shift_id)
@@ -247,6 +429,7 @@ def assign_shift_command(shift_id, staff_id):
     try:
         shift.assignStaff(staff)
         shift.updateStatus()  
+        mark_shift_rollup(shift)
         db.session.commit()
         print(f"✅ {staff.username} assigned to shift {shift.id} by {admin.username}.")
     except Exception as e:
@@ -274,52 +457,290 @@ def view_schedule_command(schedule_id):
         print(f"✅ Viewing schedule {schedule_id}:")
         print(schedule.get_json())
 
+@schedule_cli.command("export", help="Admin exports schedules as CSV or NDJSON")
+@export_options
+def export_schedules_command(output, fmt):
+    run_export("schedules", output, fmt)
+
+@schedule_cli.command("import", help="Admin imports schedules from a .csv or .ndjson file")
+@import_options
+def import_schedules_command(data_file, start, chunk_size):
+    run_import("schedules", data_file, start, chunk_size)
+
 app.cli.add_command(schedule_cli)
 
 
-def require_admin_login():
-    import os
-    from flask_jwt_extended import decode_token
-    from App.controllers import get_user
+# token -> (expires, UserIdentity); lets a `flask session` skip decoding and
+# the user query for every command after the first
+cli_logins = {}
 
+def read_active_token():
     if not os.path.exists("active_token.txt"):
         raise PermissionError("⚠️ No active session. Please login first.")
 
     with open("active_token.txt", "r") as f:
-        token = f.read().strip()
+        return f.read().strip()
 
-    try:
-        decoded = decode_token(token)
-        user_id = decoded["sub"]
-        user = get_user(user_id)
-        if not user or user.role != "admin":
-            raise PermissionError("🚫 Only an admin can use this command.")
-        return user
-    except Exception as e:
-        raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+def require_login(role, message):
+    import time
+    from flask_jwt_extended import decode_token
+    from App.controllers import get_identity
+
+    token = read_active_token()
+    cached = cli_logins.get(token)
+    if cached and cached[0] > time.time():
+        user = cached[1]
+    else:
+        try:
+            decoded = decode_token(token)
+            user = get_identity(decoded["sub"])
+        except Exception as e:
+            raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+        if user:
+            cli_logins[token] = (decoded["exp"], user)
+
+    if not user or user.role != role:
+        raise PermissionError(message)
+    return user
+
+def require_admin_login():
+    return require_login("admin", "🚫 Only an admin can use this command.")
 
 def require_staff_login():
-    import os
-    from flask_jwt_extended import decode_token
-    from App.controllers import get_user
+    return require_login("staff", "🚫 Only staff can use this command.")
+
+
+@app.cli.command("session", help="Runs many commands in one warm process")
+@click.argument("script", type=click.File("r"), default="-")
+@click.option("--echo", is_flag=True, help="Print each command before running it")
+def session_command(script, echo):
+    """
+    Reads one command per line (without the leading `flask`), e.g.
+    `shift clockin 5`, from SCRIPT or stdin. The app, connection pool and
+    decoded login stay loaded between commands. Blank lines and lines
+    starting with # are skipped; `exit` ends an interactive session.
+    """
+    import shlex, time
+    interactive = script.isatty()
+    started = time.perf_counter()
+    ran = failed = 0
+
+    while True:
+        if interactive:
+            try:
+                line = input("rostrapp> ")
+            except EOFError:
+                break
+        else:
+            line = script.readline()
+            if not line:
+                break
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("exit", "quit"):
+            break
+        if echo:
+            print(f"> {line}")
+
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            print(f"❌ {e}")
+            failed += 1
+            continue
+        if args[0] == "session":
+            print("❌ Already in a session.")
+            failed += 1
+            continue
+
+        ran += 1
+        try:
+            app.cli.main(args, prog_name="flask", standalone_mode=False)
+        except click.ClickException as e:
+            e.show()
+            failed += 1
+        except (click.exceptions.Exit, click.Abort, SystemExit):
+            pass
+        except PermissionError as e:
+            # the cached login may be stale (role changed, logged out); decode it again next time
+            cli_logins.clear()
+            db.session.rollback()
+            print(f"❌ {e}")
+            failed += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ {e}")
+            failed += 1
+
+    elapsed = time.perf_counter() - started
+    if not interactive or ran:
+        print(f"✅ Ran {ran} command(s) in {elapsed:.2f}s ({failed} failed)")
 
-    if not os.path.exists("active_token.txt"):
-        raise PermissionError("⚠️ No active session. Please login first.")
+    
+@app.cli.command("profile", help="Runs another CLI command under the sampling profiler",
+                 context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False})
+@click.option("--interval", type=float, default=1.0, help="Milliseconds between samples")
+@click.option("--output", "-o", type=click.File("w"), default=None, help="Write collapsed stacks here (flamegraph.pl / speedscope)")
+@click.option("--top", type=int, default=15, help="Hottest functions to list")
+@click.argument("command", nargs=-1, type=click.UNPROCESSED, required=True)
+def profile_command(interval, output, top, command):
+    from collections import Counter
+    from App.services.profiler import StackSampler, ProfileStore
+
+    sampler = StackSampler(sys._getframe(), interval).start()
+    try:
+        app.cli.main(list(command), prog_name="flask", standalone_mode=False)
+    except click.ClickException as e:
+        e.show()
+    except (click.exceptions.Exit, SystemExit):
+        pass
+    finally:
+        samples = sampler.stop()
+
+    total = sum(samples.values())
+    if not total:
+        print("⚠️ No samples; the command finished too quickly (try a smaller --interval)")
+        return
+    if output:
+        store = ProfileStore()
+        store.add(" ".join(command[:2]), samples)
+        output.write(store.collapsed())
+        print(f"✅ {total} samples written to {output.name}")
+
+    # self time: the innermost frame of each sample
+    hot = Counter()
+    for stack, count in samples.items():
+        hot[stack.rsplit(";", 1)[-1]] += count
+    print(f"Hottest functions ({total} samples, {interval} ms apart):")
+    for name, count in hot.most_common(top):
+        print(f"  {count / total:6.1%}  {name}")
+
+jobs_cli = AppGroup('jobs', help='Background job commands')
+
+@jobs_cli.command("worker", help="Runs queued schedule and report jobs (Ctrl+C to stop)")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty")
+def jobs_worker_command(burst):
+    import logging
+    from App.controllers.jobs import run_worker
+    logging.basicConfig(level=logging.INFO)
+    print("Job worker running" + (" until the queue is empty" if burst else " (Ctrl+C to stop)"))
+    try:
+        ran = run_worker(app, burst=burst)
+        print(f"✅ Ran {ran} job(s)")
+    except KeyboardInterrupt:
+        print("Stopped")
+
+@jobs_cli.command("list", help="Admin lists recent jobs")
+@click.option("--limit", type=int, default=20, help="Jobs to list")
+def jobs_list_command(limit):
+    from App.controllers.jobs import list_jobs
+    admin = require_admin_login()
+    for job in list_jobs(admin.id, limit):
+        total = f"/{job.total}" if job.total is not None else ""
+        print(f"{job.id:>6} {job.kind:<14} {job.status:<10} {job.progress}{total}  {job.error or ''}")
+
+@jobs_cli.command("status", help="Admin views a job and its result")
+@click.argument("job_id", type=int)
+def jobs_status_command(job_id):
+    from App.controllers.jobs import get_job
+    admin = require_admin_login()
+    try:
+        job = get_job(job_id, admin.id)
+    except LookupError as e:
+        print(f"❌ Error: {e}")
+        return
+    print(job.get_json())
+    if job.status == "succeeded":
+        print(job.result)
+
+@jobs_cli.command("cancel", help="Admin cancels a queued or running job")
+@click.argument("job_id", type=int)
+def jobs_cancel_command(job_id):
+    from App.controllers.jobs import cancel_job
+    admin = require_admin_login()
+    try:
+        job = cancel_job(job_id, admin.id)
+        print(f"🛑 Job {job.id} is {job.status}" + (" (stopping)" if job.status == "running" else ""))
+    except (LookupError, ValueError) as e:
+        print(f"❌ Error: {e}")
 
-    with open("active_token.txt", "r") as f:
-        token = f.read().strip()
+app.cli.add_command(jobs_cli)
+
+bench_cli = AppGroup('bench', help='Performance benchmarks')
+
+@bench_cli.command("run", help="Times hot paths on a synthetic dataset and writes JSON results")
+@click.option("--staff", "staff_count", type=int, default=50, help="Staff members to seed")
+@click.option("--days", type=int, default=28, help="Days of shifts to seed")
+@click.option("--repeat", type=int, default=5, help="Runs per case")
+@click.option("--case", "cases", multiple=True, help="Only these cases (repeatable)")
+@click.option("--database-uri", default="sqlite:///:memory:", help="Empty database to seed (default in-memory SQLite)")
+@click.option("--output", "-o", type=click.File("w"), default=None, help="Write results JSON here")
+def bench_run_command(staff_count, days, repeat, cases, database_uri, output):
+    import json
+    from App.services.benchmark import bench_app, run_benchmarks
 
+    def show(result):
+        print(f"{result['name']:<24} {result['median_ms']:>10.2f} ms  {result['queries']:>4} queries")
     try:
-        decoded = decode_token(token)
-        user_id = decoded["sub"]
-        user = get_user(user_id)
-        if not user or user.role != "staff":
-            raise PermissionError("🚫 Only staff can use this command.")
-        return user
-    except Exception as e:
-        raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+        # a separate app so the benchmark never touches the configured database
+        with bench_app({"SQLALCHEMY_DATABASE_URI": database_uri, "SQLITE_TUNING": True}):
+            db.create_all()
+            results = run_benchmarks(staff_count, days, repeat, cases, on_case=show)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    print(f"Dataset: {results['dataset']}")
+    if output:
+        json.dump(results, output, indent=2)
+        print(f"✅ Results written to {output.name}")
+
+@bench_cli.command("compare", help="Compares two results files and fails on regressions")
+@click.argument("baseline", type=click.File("r"))
+@click.argument("current", type=click.File("r"))
+@click.option("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction (0.2 = 20%)")
+def bench_compare_command(baseline, current, threshold):
+    import json
+    from App.services.benchmark import compare_results
+
+    comparisons = compare_results(json.load(baseline), json.load(current), threshold)
+    for c in comparisons:
+        flag = "❌" if c["regression"] else "✅"
+        print(f"{flag} {c['name']:<24} {c['baseline_ms']:>10.2f} -> {c['current_ms']:>10.2f} ms "
+              f"(x{c['ratio']}), queries {c['baseline_queries']} -> {c['current_queries']}")
+    if any(c["regression"] for c in comparisons):
+        sys.exit(1)
+
+@bench_cli.command("writes", help="Concurrent clock-in/out throughput on SQLite, without and with the WAL profile")
+@click.option("--workers", type=int, default=4, help="Writer processes")
+@click.option("--shifts", type=int, default=100, help="Shifts each worker clocks in and out of")
+@click.option("--database", "path", default=None, help="SQLite file to create (default a temporary file)")
+def bench_writes_command(workers, shifts, path):
+    import tempfile
+    from App.services.benchmark import run_write_benchmark
+
+    path = path or os.path.join(tempfile.mkdtemp(), "bench-writes.db")
+    for tuned in (False, True):
+        result = run_write_benchmark(path, workers, shifts, tuned)
+        print(f"{result['mode']:<9} {result['events']:>6} events in {result['seconds']:>7.2f} s "
+              f"= {result['events_per_second']:>8.1f}/s, {result['failed']} failed (database is locked)")
+
+@bench_cli.command("logins", help="Concurrent login throughput in one gevent worker, hashing inline and on the thread pool")
+@click.option("--logins", type=int, default=64, help="Concurrent logins")
+@click.option("--threads", type=int, default=4, help="Hashing threads for the offloaded run")
+@click.option("--method", default=None, help="Password hash method (default PASSWORD_HASH_METHOD)")
+def bench_logins_command(logins, threads, method):
+    from App.services.benchmark import run_login_benchmark
+
+    method = method or app.config.get("PASSWORD_HASH_METHOD")
+    for run_threads in (0, threads):
+        result = run_login_benchmark(logins, run_threads, method)
+        print(f"{result['mode']:<9} {result['succeeded']:>4}/{result['logins']} logins in {result['seconds']:>7.2f} s "
+              f"= {result['logins_per_second']:>7.1f}/s, event loop stalled up to {result['max_stall_ms']:.0f} ms")
+
+app.cli.add_command(bench_cli)
+
 
-    
 '''
 Test Commands
 '''
@@ -328,6 +749,7 @@ test = AppGroup('test', help='Testing commands')
 @test.command("user", help="Run User tests")
 @click.argument("type", default="all")
 def user_tests_command(type):
+    import pytest
     if type == "unit":
         sys.exit(pytest.main(["-k", "UserUnitTests"]))
     elif type == "int":
@@ -336,3 +758,9 @@ def user_tests_command(type):
         sys.exit(pytest.main(["-k", "App"]))
     
 app.cli.add_command(test)
+
+
+if __name__ == "__main__":
+    # `python wsgi.py <command>` runs the CLI without the flask launcher,
+    # which imports every installed plugin (alembic via Flask-Migrate) first
+    app.cli.main(prog_name="flask")